@@ -0,0 +1,270 @@
+"""
+Compares accelerated CDL-title matchers against the brute-force scan of CDL_Checker.search_cdl(), for recall and speed.
+
+- search_cdl() scores an OCRA title against every CDL-catalog title with `fuzz.ratio()`, keeping scores over 80.
+  A faster matcher (one that skips catalog titles, or narrows them with an index) must not silently drop any of those matches.
+- Each matcher in MATCHERS is run over the same catalog and corpus of titles as the brute-force scan; reported per matcher:
+    - recall -- the brute-force matches it also found
+    - precision -- its matches that brute-force also found
+    - identical -- the titles whose results (items, scores, and order) are exactly brute-force's
+    - titles per second (and the index-build time)
+- Matchers marked `lossless` must be identical on every title; the script exits 1 if one isn't.
+- The catalog and corpus are synthetic (see benchmarks/synthetic_data.py) unless given:
+    - `--catalog db` loads the catalog as search_cdl() does (via the configured `LGNT__DB_BACKEND`); `--catalog ./path.json` loads a json list of cdl_app_item rows.
+    - `--titles ./path.txt` loads a corpus of OCRA titles, one per line.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python ./benchmarks/cdl_matching.py
+    % python ./benchmarks/cdl_matching.py --catalog db --titles ./ocra_titles.txt --output ./cdl_matching.json
+"""
+
+import argparse, bisect, collections, json, logging, os, re, sys, time
+
+from fuzzywuzzy import fuzz
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+
+## additional imports -----------------------------------------------
+from benchmarks import synthetic_data
+from lib.cdl import CDL_Checker
+
+log = logging.getLogger(__name__)
+
+
+## constants --------------------------------------------------------
+## search_cdl() keeps `fuzz.ratio() > 80`; ratio is round( 100 * 2M / T ) (M matching characters, T the two lengths),
+## and round() takes 80.5 to 80, so a match needs 2M / T > 0.805, ie 400M > 161T; a bound on M that fails this can't match.
+MATCH_NUMERATOR: int = 400
+MATCH_DENOMINATOR: int = 161
+TOKEN_PATTERN = re.compile( r'\w{4,}' )
+
+
+## matchers ---------------------------------------------------------
+## Each takes the catalog (a list of cdl_app_item row-dicts, in search_cdl()'s title-order) and has search( title ) -> [ (catalog-index, score), ... ],
+## in catalog order, as search_cdl() would return them.
+
+
+class Brute_Force_Matcher(object):
+    """ The reference: CDL_Checker.search_cdl() itself. """
+
+    def __init__( self, catalog: list ):
+        self.cdl_checker = CDL_Checker()
+        self.cdl_checker.CDL_TITLES = [ dict(entry) for entry in catalog ]  # search_cdl() adds `fuzzy_score` to the entries it returns
+        self.indexes: dict = { id(entry): i for ( i, entry ) in enumerate(self.cdl_checker.CDL_TITLES) }
+
+    def search( self, search_title: str ) -> list:
+        return [ (self.indexes[id(entry)], entry['fuzzy_score']) for entry in self.cdl_checker.search_cdl(search_title) ]
+
+    ## end class Brute_Force_Matcher()
+
+
+class Length_Bound_Matcher(object):
+    """ Lossless: scores only catalog titles whose length allows a match (M is at most the shorter length). """
+
+    def __init__( self, catalog: list ):
+        self.titles: list = [ entry['title'] for entry in catalog ]
+        self.by_length: list = sorted( (len(title), i) for ( i, title ) in enumerate(self.titles) )
+        self.lengths: list = [ length for ( length, _ ) in self.by_length ]
+
+    def search( self, search_title: str ) -> list:
+        if not search_title.strip():
+            return []
+        candidates: list = sorted( [i for ( _, i ) in self.by_length[self.find_length_range(len(search_title))]] )
+        return score_candidates( search_title, self.titles, candidates )
+
+    def find_length_range( self, length: int ) -> slice:
+        ## a title of length L can match only if 400 * min(length, L) > 161 * (length + L)
+        shortest: int = length * MATCH_DENOMINATOR // ( MATCH_NUMERATOR - MATCH_DENOMINATOR )
+        longest: int = -( -length * (MATCH_NUMERATOR - MATCH_DENOMINATOR) // MATCH_DENOMINATOR )
+        return slice( bisect.bisect_left(self.lengths, shortest), bisect.bisect_right(self.lengths, longest) )
+
+    ## end class Length_Bound_Matcher()
+
+
+class Character_Bound_Matcher( Length_Bound_Matcher ):
+    """ Lossless: like Length_Bound_Matcher, then also skips titles whose shared character-counts (a tighter bound on M) rule out a match. """
+
+    def __init__( self, catalog: list ):
+        super().__init__( catalog )
+        self.character_counts: list = [ collections.Counter(title) for title in self.titles ]
+
+    def search( self, search_title: str ) -> list:
+        if not search_title.strip():
+            return []
+        search_counts = collections.Counter( search_title )
+        candidates: list = []
+        for ( length, i ) in self.by_length[self.find_length_range(len(search_title))]:
+            shared: int = sum( (search_counts & self.character_counts[i]).values() )
+            if MATCH_NUMERATOR * shared > MATCH_DENOMINATOR * ( len(search_title) + length ):
+                candidates.append( i )
+        return score_candidates( search_title, self.titles, sorted(candidates) )
+
+    ## end class Character_Bound_Matcher()
+
+
+class Token_Block_Matcher(object):
+    """ Lossy (included to show what the harness catches): scores only catalog titles sharing a lower-cased word of 4+ characters. """
+
+    def __init__( self, catalog: list ):
+        self.titles: list = [ entry['title'] for entry in catalog ]
+        self.token_index: dict = collections.defaultdict( set )
+        for ( i, title ) in enumerate( self.titles ):
+            for token in TOKEN_PATTERN.findall( title.lower() ):
+                self.token_index[token].add( i )
+
+    def search( self, search_title: str ) -> list:
+        if not search_title.strip():
+            return []
+        candidates: set = set()
+        for token in TOKEN_PATTERN.findall( search_title.lower() ):
+            candidates |= self.token_index.get( token, set() )
+        return score_candidates( search_title, self.titles, sorted(candidates) )
+
+    ## end class Token_Block_Matcher()
+
+
+MATCHERS: list = [  # ( name, class, lossless )
+    ( 'length-bound', Length_Bound_Matcher, True ),
+    ( 'character-bound', Character_Bound_Matcher, True ),
+    ( 'token-block', Token_Block_Matcher, False ),
+    ]
+
+
+def score_candidates( search_title: str, titles: list, candidates: list ) -> list:
+    """ Returns [ (catalog-index, score), ... ] for the candidates scoring over 80, as search_cdl() scores them.
+        Called by the matchers' search() """
+    results: list = []
+    for i in candidates:
+        score: int = fuzz.ratio( search_title, titles[i] )
+        if score > 80:
+            results.append( (i, score) )
+    return results
+
+
+## controller -------------------------------------------------------
+
+def main( catalog: list, search_titles: list, output_path: str ) -> int:
+    """ Runs brute-force and each matcher over the titles; prints (and optionally writes) the comparison, and returns the exit-code.
+        Called by if __name__ == '__main__' """
+    logging.disable( logging.INFO )  # search_cdl() logs per title; keep that out of the timings
+    ( brute_force_results, brute_force_stats ) = run_matcher( Brute_Force_Matcher, catalog, search_titles )
+    report: dict = {
+        'catalog_size': len( catalog ),
+        'titles': len( search_titles ),
+        'brute_force': brute_force_stats,
+        'matchers': {},
+        }
+    print( f'{"brute-force":<18} {brute_force_stats["titles_per_second"]:>10.1f} titles/s  ({brute_force_stats["matches"]} matches; {len(catalog)} catalog titles, {len(search_titles)} search titles)' )
+    failed_matchers: list = []
+    for ( name, matcher_class, lossless ) in MATCHERS:
+        ( results, stats ) = run_matcher( matcher_class, catalog, search_titles )
+        stats.update( compare_results(brute_force_results, results, search_titles) )
+        stats['lossless'] = lossless
+        stats['speedup'] = round( stats['titles_per_second'] / brute_force_stats['titles_per_second'], 1 ) if brute_force_stats['titles_per_second'] else None
+        report['matchers'][name] = stats
+        print( f'{name:<18} {stats["titles_per_second"]:>10.1f} titles/s  {stats["speedup"]:>6}x  recall {stats["recall"]:.4f}  precision {stats["precision"]:.4f}  '
+            f'identical {stats["identical_percent"]:.2f}%  (build {stats["build_seconds"]:.2f}s)' )
+        for missed in stats['missed_examples']:
+            print( f'    missed: {missed}' )
+        if lossless and stats['identical_percent'] < 100:
+            failed_matchers.append( name )
+    logging.disable( logging.NOTSET )
+    if output_path:
+        with open( output_path, 'w' ) as f:
+            f.write( json.dumps(report, sort_keys=True, indent=2) )
+    if failed_matchers:
+        print( f'FAILED: lossless matchers differing from brute-force, ``{failed_matchers}``' )
+    return 1 if failed_matchers else 0
+
+
+def run_matcher( matcher_class, catalog: list, search_titles: list ) -> tuple:
+    """ Builds the matcher and searches each title; returns ( results per title, timing-stats ).
+        Called by main() """
+    start = time.perf_counter()
+    matcher = matcher_class( catalog )
+    built = time.perf_counter()
+    results: list = [ matcher.search(search_title) for search_title in search_titles ]
+    searched = time.perf_counter()
+    stats: dict = {
+        'build_seconds': round( built - start, 3 ),
+        'search_seconds': round( searched - built, 3 ),
+        'titles_per_second': round( len(search_titles) / (searched - built), 1 ) if searched > built else 0.0,
+        'matches': sum( [len(title_results) for title_results in results] ),
+        }
+    return ( results, stats )
+
+
+def compare_results( expected_results: list, results: list, search_titles: list, max_examples: int = 5 ) -> dict:
+    """ Returns recall, precision, and identical-percent of results against the expected (brute-force) results, plus some missed matches.
+        A match is a ( catalog-index, score ) pair.
+        Called by main() """
+    ( expected_count, found_count, shared_count, identical_count ) = ( 0, 0, 0, 0 )
+    missed_examples: list = []
+    for ( search_title, expected, found ) in zip( search_titles, expected_results, results ):
+        shared: set = set( expected ) & set( found )
+        expected_count += len( expected )
+        found_count += len( found )
+        shared_count += len( shared )
+        if found == expected:
+            identical_count += 1
+        elif len( missed_examples ) < max_examples and len( shared ) < len( expected ):
+            missed_examples.append( f'``{search_title}``: {sorted(set(expected) - shared)}' )
+    return {
+        'recall': round( shared_count / expected_count, 6 ) if expected_count else 1.0,
+        'precision': round( shared_count / found_count, 6 ) if found_count else 1.0,
+        'identical_percent': round( 100 * identical_count / len(search_titles), 2 ) if search_titles else 100.0,
+        'missed_examples': missed_examples,
+        }
+
+
+## inputs -----------------------------------------------------------
+
+def load_catalog( catalog_source: str, seed: int, catalog_size: int ) -> list:
+    """ Returns the catalog rows, in title-order (as search_cdl() loads them): from the db, a json file, or synthetic.
+        Called by if __name__ == '__main__' """
+    if catalog_source == 'db':
+        catalog: list = CDL_Checker().populate_cdl_titles()
+    elif catalog_source:
+        with open( catalog_source, 'r' ) as f:
+            catalog: list = sorted( json.loads(f.read()), key=lambda entry: entry['title'] )
+    else:
+        term = synthetic_data.Synthetic_Term( seed, dict(synthetic_data.DEFAULT_CONFIG, cdl_catalog_size=catalog_size) )
+        term.make_cdl_catalog()
+        catalog: list = sorted( term.tables['cdl_app_item'], key=lambda entry: entry['title'] )
+    return catalog
+
+
+def load_search_titles( titles_path: str, catalog: list, seed: int, title_count: int ) -> list:
+    """ Returns the corpus of titles to search: from a file (one per line), or synthetic (some re-cased catalog titles, as OCRA's often are).
+        Called by if __name__ == '__main__' """
+    if titles_path:
+        with open( titles_path, 'r' ) as f:
+            return [ line.rstrip('\n') for line in f ]
+    term = synthetic_data.Synthetic_Term( seed + 1, synthetic_data.DEFAULT_CONFIG )
+    term.cdl_titles = [ entry['title'] for entry in catalog ]
+    return [ term.make_citation_title() for _ in range(title_count) ]
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='compares accelerated CDL-title matchers against search_cdl()\'s brute-force scan' )
+    parser.add_argument( '--catalog', default='', help='`db`, or a json file of cdl_app_item rows; default synthetic' )
+    parser.add_argument( '--titles', default='', help='text file of OCRA titles, one per line; default synthetic' )
+    parser.add_argument( '--catalog-size', type=int, default=2000, help='synthetic catalog size; default 2000' )
+    parser.add_argument( '--title-count', type=int, default=200, help='synthetic corpus size; default 200' )
+    parser.add_argument( '--seed', type=int, default=1, help='synthetic-data seed; default 1' )
+    parser.add_argument( '--output', default='', help='also write the report to this json file' )
+    args: dict = vars( parser.parse_args() )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    catalog: list = load_catalog( args['catalog'], args['seed'], args['catalog_size'] )
+    search_titles: list = load_search_titles( args['titles'], catalog, args['seed'], args['title_count'] )
+    exit_code: int = main( catalog, search_titles, args['output'] )
+    sys.exit( exit_code )
@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark of the instructor-check steps (10 through 50), against synthetic data and the `fake` db-backend.
+
+- For each scale (an OIT course-count), generates a synthetic term (see benchmarks/synthetic_data.py) into the work-directory,
+  then runs each step in its own process (load_source(), process(), save() -- as the step-script does), so each step's peak RSS is its own.
+- Records, per step: process() wall-time, total wall-time (including load and save), courses in and out, courses per second,
+  fake-OCRA connections and queries, and peak RSS; writes them to a results json file.
+- Compares the results against a stored baseline (a previous results file), and flags regressions:
+  a time or peak-RSS more than `--tolerance` over the baseline's, or any increase in queries (which, for a given seed, don't vary).
+  Exits 1 if there are regressions.
+- The step-processes log to the work-directory, not to `LGNT__LOG_PATH`. Other settings (eg `LGNT__FILES_URL_PATTERN`) come from the environment, as usual.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python ./benchmarks/e2e_benchmark.py --work-dir ../e2e_benchmark --scales 200,1000,5000
+    % python ./benchmarks/e2e_benchmark.py --work-dir ../e2e_benchmark --save-baseline
+    % python ./benchmarks/e2e_benchmark.py --work-dir ../e2e_benchmark --query-latency-ms 2
+"""
+
+import argparse, datetime, importlib, json, logging, os, platform, resource, subprocess, sys, time
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+sys.path.append( f'{PROJECT_CODE_DIR}/instructor_check_flow' )  # step-scripts start with a digit, so they're imported via importlib
+
+## additional imports -----------------------------------------------
+from benchmarks import synthetic_data
+
+log = logging.getLogger(__name__)
+
+
+## constants --------------------------------------------------------
+STEPS: list = [  # ( step-number, step-module ), in run order; as in run_all.STEPS
+    ( '10', '10_prepare_oit_initial_subset' ),
+    ( '15', '15_make_oit_subset_two' ),
+    ( '20', '20_make_oit_subset_two' ),
+    ( '30', '30_get_ocra_classids' ),
+    ( '35', '35_get_ocra_instructor_emails' ),
+    ( '40', '40_gather_reading_list_data' ),
+    ( '50', '50_create_reading_lists' ),
+    ]
+DEFAULT_BASELINE_PATH: str = f'{PROJECT_CODE_DIR}/benchmarks/e2e_baseline.json'
+COMPARED_METRICS: list = [ 'process_seconds', 'total_seconds', 'peak_rss_mb' ]  # flagged when over baseline * (1 + tolerance)
+MIN_COMPARED_SECONDS: float = 0.5  # shorter baseline-times are too noisy to flag
+
+
+## controller -------------------------------------------------------
+
+def main( work_dir: str, scales: list, seed: int, query_latency_ms: float, baseline_path: str, tolerance: float, save_baseline: bool ) -> int:
+    """ Runs the benchmark at each scale; writes the results, compares them against the baseline, and returns the exit-code.
+        Called by if __name__ == '__main__' """
+    results: dict = {
+        'datetime_stamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'query_latency_ms': query_latency_ms,
+        'scales': {},
+        }
+    for courses in scales:
+        results['scales'][str(courses)] = run_scale( work_dir, courses, seed, query_latency_ms )
+    results_path: str = f'{work_dir}/results_{results["datetime_stamp"].replace(":", "-")}.json'
+    write_json( results_path, results )
+    print( f'results written to, ``{results_path}``' )
+    if save_baseline:
+        write_json( baseline_path, results )
+        print( f'baseline written to, ``{baseline_path}``' )
+        return 0
+    if not os.path.exists( baseline_path ):
+        print( f'no baseline at ``{baseline_path}``; run with `--save-baseline` to store one' )
+        return 0
+    with open( baseline_path, 'r' ) as f:
+        baseline: dict = json.loads( f.read() )
+    regressions: list = find_regressions( results, baseline, tolerance )
+    for regression in regressions:
+        print( f'REGRESSION: {regression}' )
+    if not regressions:
+        print( f'no regressions against baseline, ``{baseline_path}``' )
+    return 1 if regressions else 0
+
+
+def run_scale( work_dir: str, courses: int, seed: int, query_latency_ms: float ) -> dict:
+    """ Generates the scale's synthetic term, runs each step in its own process, and returns the step-results.
+        Called by main() """
+    scale_dir: str = f'{work_dir}/scale_{courses}'
+    config: dict = dict( synthetic_data.DEFAULT_CONFIG, oit_courses=courses )
+    manifest: dict = synthetic_data.main( f'{scale_dir}/inputs', seed, config )
+    env: dict = make_step_env( scale_dir, manifest, query_latency_ms )
+    steps: dict = {}
+    for ( step_number, _ ) in STEPS:
+        step_result_path: str = f'{scale_dir}/step_{step_number}_result.json'
+        start = time.perf_counter()
+        process = subprocess.Popen( [sys.executable, os.path.abspath(__file__), '--step', step_number, '--step-result-path', step_result_path], env=env )
+        ( _, exit_status, _ ) = os.wait4( process.pid, 0 )
+        process.returncode = os.waitstatus_to_exitcode( exit_status )  # so Popen doesn't try to reap it again
+        wall_seconds: float = time.perf_counter() - start
+        if process.returncode != 0:
+            raise Exception( f'step ``{step_number}`` failed at scale ``{courses}``; see ``{env["LGNT__LOG_PATH"]}``' )
+        with open( step_result_path, 'r' ) as f:
+            step_result: dict = json.loads( f.read() )
+        step_result['wall_seconds'] = round( wall_seconds, 3 )  # includes interpreter-startup and imports
+        steps[step_number] = step_result
+        print( f'scale {courses:>6}  step {step_number}  {step_result["process_seconds"]:>9.3f}s  {step_result["courses_per_second"]:>10.1f} courses/s  '
+            f'{step_result["queries"]:>7} queries  {step_result["peak_rss_mb"]:>7.1f} MB' )
+    return { 'manifest_counts': manifest['counts'], 'steps': steps }
+
+
+def find_regressions( results: dict, baseline: dict, tolerance: float ) -> list:
+    """ Returns descriptions of the step-metrics that regressed against the baseline; scales and steps not in both are skipped.
+        Called by main() """
+    regressions: list = []
+    for ( scale, scale_results ) in results['scales'].items():
+        baseline_steps: dict = baseline['scales'].get( scale, {} ).get( 'steps', {} )
+        for ( step_number, step_result ) in scale_results['steps'].items():
+            baseline_step: dict = baseline_steps.get( step_number, None )
+            if baseline_step is None:
+                continue
+            for metric in COMPARED_METRICS:
+                ( value, baseline_value ) = ( step_result[metric], baseline_step[metric] )
+                if metric.endswith( '_seconds' ) and baseline_value < MIN_COMPARED_SECONDS:
+                    continue
+                if value > baseline_value * ( 1 + tolerance ):
+                    regressions.append( f'scale {scale}, step {step_number}: {metric} {value} vs baseline {baseline_value}' )
+            if step_result['queries'] > baseline_step['queries']:
+                regressions.append( f'scale {scale}, step {step_number}: queries {step_result["queries"]} vs baseline {baseline_step["queries"]}' )
+    return regressions
+
+
+## step-process -----------------------------------------------------
+
+def run_step( step_number: str, step_result_path: str ) -> None:
+    """ Runs one step as its script does (load, process, save), timing process(); writes the step-result.
+        Called, in a step-process, by if __name__ == '__main__' """
+    from lib import fake_ocra  # imported here, so the step-process's envars are the ones read
+    module = importlib.import_module( dict(STEPS)[step_number] )
+    start = time.perf_counter()
+    if step_number == '10':
+        data = None
+        courses_in: int = count_oit_courses( os.environ['LGNT__COURSES_FILEPATH'] )
+    else:
+        data = module.load_source()
+        courses_in: int = count_courses( data )
+    loaded = time.perf_counter()
+    fake_ocra.reset_stats()  # load_source() doesn't query, but just in case
+    if step_number == '10':
+        data = module.process()
+    else:
+        data = module.process( data )
+    processed = time.perf_counter()
+    if step_number != '50':  # step 50 writes its tsv inside process()
+        module.save( data )
+    saved = time.perf_counter()
+    process_seconds: float = processed - loaded
+    step_result: dict = {
+        'courses_in': courses_in,
+        'courses_out': count_courses( data ) if data is not None else None,
+        'process_seconds': round( process_seconds, 3 ),
+        'total_seconds': round( saved - start, 3 ),
+        'courses_per_second': round( courses_in / process_seconds, 1 ) if process_seconds else 0.0,
+        'connections': fake_ocra.STATS['connections'],
+        'queries': fake_ocra.STATS['queries'],
+        'peak_rss_mb': round( resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1 ),  # linux reports kilobytes
+        }
+    write_json( step_result_path, step_result )
+    return
+
+
+## helpers ----------------------------------------------------------
+
+def make_step_env( scale_dir: str, manifest: dict, query_latency_ms: float ) -> dict:
+    """ Returns the step-processes' envars: the current environment, pointed at the scale's inputs and output-directories.
+        Called by run_scale() """
+    for sub_dir in ( 'json', 'csv' ):
+        os.makedirs( f'{scale_dir}/{sub_dir}', exist_ok=True )
+    env: dict = dict( os.environ )
+    env.update( manifest['envars'] )
+    env.update( {
+        'LGNT__JSON_DATA_DIR_PATH': f'{scale_dir}/json',
+        'LGNT__CSV_OUTPUT_DIR_PATH': f'{scale_dir}/csv',
+        'LGNT__LOG_PATH': f'{scale_dir}/steps.log',
+        'LGNT__FAKE_OCRA_QUERY_LATENCY_MS': str( query_latency_ms ),
+        } )
+    return env
+
+
+def count_oit_courses( file_path: str ) -> int:
+    """ Returns the OIT file's course-count (its non-heading lines).
+        Called by run_step() """
+    with open( file_path, 'r' ) as f:
+        line_count: int = sum( 1 for _ in f )
+    return line_count - 1
+
+
+def count_courses( data ) -> int:
+    """ Returns the course-count of a step's data: step 10's subset-lines, or a data-holder-dict's course-keys.
+        Called by run_step() """
+    if 'subset_lines' in data:
+        return len( data['subset_lines'] )
+    return len( [key for key in data if key != '__meta__'] )
+
+
+def write_json( file_path: str, data: dict ) -> None:
+    with open( file_path, 'w' ) as f:
+        f.write( json.dumps(data, sort_keys=True, indent=2) )
+    return
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='runs the instructor-check steps against synthetic data at several scales' )
+    parser.add_argument( '--work-dir', help='directory for the synthetic inputs, step outputs, and results; required unless `--step`' )
+    parser.add_argument( '--scales', default='200,1000,5000', help='comma-separated OIT course-counts; default `200,1000,5000`' )
+    parser.add_argument( '--seed', type=int, default=1, help='synthetic-data seed; default 1' )
+    parser.add_argument( '--query-latency-ms', type=float, default=0, help='fake-OCRA latency per query; default 0' )
+    parser.add_argument( '--baseline', default=DEFAULT_BASELINE_PATH, help=f'baseline results file; default ``{DEFAULT_BASELINE_PATH}``' )
+    parser.add_argument( '--tolerance', type=float, default=0.25, help='allowed fraction over the baseline before flagging; default 0.25' )
+    parser.add_argument( '--save-baseline', action='store_true', help='store these results as the baseline, instead of comparing' )
+    parser.add_argument( '--step', help=argparse.SUPPRESS )  # internal: run one step, in a step-process
+    parser.add_argument( '--step-result-path', help=argparse.SUPPRESS )
+    args: dict = vars( parser.parse_args() )
+    if not args['step'] and not args['work_dir']:
+        parser.error( '--work-dir is required' )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    if args['step']:
+        run_step( args['step'], args['step_result_path'] )
+        sys.exit()
+    exit_code: int = main( os.path.abspath(args['work_dir']), [int(scale) for scale in args['scales'].split(',')], args['seed'],
+        args['query_latency_ms'], args['baseline'], args['tolerance'], args['save_baseline'] )
+    sys.exit( exit_code )
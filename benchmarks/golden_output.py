@@ -0,0 +1,215 @@
+"""
+Checks that step 50's optimized modes, and run_all.py, produce exactly the reading-list rows of a reference run.
+
+- The reference is one of:
+    - `--baseline-code-dir DIR`: step 50 from a checkout of the pre-optimization code (eg `git worktree add ../baseline <baseline-commit>`).
+      That code has only the MySQL backend, so this needs the live OCRA and CDL databases.
+    - `--golden-tsv PATH`: a stored reading-list tsv, eg one saved from a baseline run with `--save-golden PATH`.
+    - neither: step 50 from this code, run serially -- which only checks the modes against this code's own serial path.
+- Step 50 modes: `serial`, `jobs` (`--jobs N`), `shard-department` (`--shard-by department`), `shard-rows` (`--max-rows N`), and `delta`
+  (a first `--delta` run, which, with no previous index, exports every row). Each runs over the same source (`LGNT__JSON_DATA_DIR_PATH`'s
+  "oit_data_04.json", and the usual pdf-data and CDL settings). `serial` is skipped when the reference is this code's serial run.
+- Full-flow modes (not run by default): `scripts` runs steps 10 through 50 one script at a time, and `run-all` runs `run_all.py --force`;
+  each rebuilds its own json data from the `LGNT__` input files. `scripts` is compared against the reference (so matches it only if
+  the reference's "oit_data_04.json" came from those input files); `run-all` is compared against `scripts`.
+- build_reading_list.py isn't covered: its manage_build_reading_list() only loads settings (the pipeline is commented out), so it writes no reading-list.
+- Each run writes into its own directory under the work-directory. Only the reading-list tsvs in its term-directory are read, so other
+  tsvs (eg step 10's oit-subset) aren't. Sharded output is read in part-order; `--shard-by department` output is grouped by department,
+  so it's compared after (stably) ordering both sides by course.
+- Only row contents are compared; output file-names and the manifest and delta-index `datetime_stamp`s (the only timestamps step 50 writes) are not.
+- Prints each run's time and differences, and exits 1 if any mode differs.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python ./benchmarks/golden_output.py --work-dir ../golden_output --baseline-code-dir ../baseline --save-golden ../golden_2024_spring.tsv
+    % python ./benchmarks/golden_output.py --work-dir ../golden_output_2 --golden-tsv ../golden_2024_spring.tsv --modes jobs,delta --jobs 8
+    % python ./benchmarks/golden_output.py --work-dir ../golden_output_3 --modes scripts,run-all
+"""
+
+import argparse, csv, json, logging, os, subprocess, sys, time
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+
+log = logging.getLogger(__name__)
+
+
+## constants --------------------------------------------------------
+STEP_SCRIPTS: list = [ '10_prepare_oit_initial_subset.py', '15_make_oit_subset_two.py', '20_make_oit_subset_two.py', '30_get_ocra_classids.py',
+    '35_get_ocra_instructor_emails.py', '40_gather_reading_list_data.py', '50_create_reading_lists.py' ]
+STEP_50_SCRIPT: str = STEP_SCRIPTS[-1]
+REFERENCE_MODE: str = 'serial'
+MODES: dict = {  # mode -> ( step-50 arguments, given --jobs and --max-rows, or None for a full-flow mode; whether output keeps the course-order; the mode it's compared to, or None for the reference )
+    'serial': ( lambda jobs, max_rows: [], True, None ),
+    'jobs': ( lambda jobs, max_rows: ['--jobs', str(jobs)], True, None ),
+    'shard-department': ( lambda jobs, max_rows: ['--shard-by', 'department'], False, None ),
+    'shard-rows': ( lambda jobs, max_rows: ['--max-rows', str(max_rows)], True, None ),
+    'delta': ( lambda jobs, max_rows: ['--delta'], True, None ),
+    'scripts': ( None, True, None ),
+    'run-all': ( None, True, 'scripts' ),
+    }
+DEFAULT_MODES: list = [ mode for ( mode, ( arguments, _, _ ) ) in MODES.items() if arguments ]
+BASELINE_TERM_DIR_NAME: str = '2024-spring'  # the pre-optimization csv_maker's hard-coded output-directory
+COURSE_COLUMN: str = 'coursecode'
+
+
+## controller -------------------------------------------------------
+
+def main( work_dir: str, modes: list, jobs: int, max_rows: int, max_diffs: int, baseline_code_dir: str, golden_tsv_path: str, save_golden_path: str ) -> int:
+    """ Gets the reference rows, runs the given modes, prints the differences, and returns the exit-code.
+        Called by if __name__ == '__main__' """
+    if golden_tsv_path:
+        ( reference_headers, reference_rows ) = read_tsv( golden_tsv_path )
+        reference_name: str = f'golden tsv ``{golden_tsv_path}``'
+    elif baseline_code_dir:
+        ( reference_headers, reference_rows ) = run_commands( work_dir, 'baseline', [[f'{baseline_code_dir}/instructor_check_flow/{STEP_50_SCRIPT}']], baseline_code_dir )
+        reference_name: str = f'baseline code ``{baseline_code_dir}``'
+    else:
+        ( reference_headers, reference_rows ) = run_mode( work_dir, REFERENCE_MODE, jobs, max_rows )
+        reference_name: str = f'{REFERENCE_MODE} run of this code'
+        modes = [ mode for mode in modes if mode != REFERENCE_MODE ]
+    print( f'{"reference":<18} {len(reference_rows):>8} rows  ({reference_name})' )
+    if save_golden_path:
+        write_tsv( save_golden_path, reference_headers, reference_rows )
+        print( f'reference saved to ``{save_golden_path}``' )
+    outputs: dict = { None: (reference_headers, reference_rows) }
+    differing_modes: list = []
+    for mode in modes:
+        compared_to: str = MODES[mode][2]
+        for needed_mode in ( compared_to, mode ):
+            if needed_mode not in outputs:
+                outputs[needed_mode] = run_mode( work_dir, needed_mode, jobs, max_rows )
+        ( compared_headers, compared_rows ) = outputs[compared_to]
+        ( headers, rows ) = outputs[mode]
+        if headers != compared_headers:
+            differences: list = [ f'headers differ: ``{headers}``' ]
+        else:
+            differences: list = compare_rows( compared_headers, compared_rows, rows, keeps_order=MODES[mode][1] )
+        print( f'{mode:<18} {len(rows):>8} rows  {"IDENTICAL" if not differences else f"{len(differences)} DIFFERENCES"} (vs {compared_to or "reference"})' )
+        for difference in differences[:max_diffs]:
+            print( f'    {difference}' )
+        if differences:
+            differing_modes.append( mode )
+    return 1 if differing_modes else 0
+
+
+def run_mode( work_dir: str, mode: str, jobs: int, max_rows: int ) -> tuple:
+    """ Runs this code in the given mode; returns ( headers, rows ) of its output.
+        Called by main() """
+    step_dir_path: str = f'{PROJECT_CODE_DIR}/instructor_check_flow'
+    step_50_arguments = MODES[mode][0]
+    if step_50_arguments:
+        commands: list = [ [f'{step_dir_path}/{STEP_50_SCRIPT}'] + step_50_arguments(jobs, max_rows) ]
+    elif mode == 'scripts':
+        commands: list = [ [f'{step_dir_path}/{step_script}'] for step_script in STEP_SCRIPTS ]
+    else:
+        commands: list = [ [f'{step_dir_path}/run_all.py', '--force'] ]
+    return run_commands( work_dir, mode, commands, PROJECT_CODE_DIR )
+
+
+def run_commands( work_dir: str, run_name: str, commands: list, code_dir: str ) -> tuple:
+    """ Runs the commands (script-paths and arguments) with code_dir's code, into a fresh directory; returns ( headers, rows ) of the reading-list output.
+        Full-flow runs (any command but step 50) get their own json-directory; step 50 alone reads `LGNT__JSON_DATA_DIR_PATH`'s.
+        Called by main() and run_mode() """
+    run_dir: str = f'{work_dir}/{run_name}'
+    if os.path.exists( run_dir ):
+        raise Exception( f'``{run_dir}`` exists; use a new work-directory, so a previous run\'s output (or delta-index) isn\'t picked up' )
+    term_dir_name: str = BASELINE_TERM_DIR_NAME if run_name == 'baseline' else f'{os.environ["LGNT__YEAR"]}-{os.environ["LGNT__SEASON"]}'
+    os.makedirs( f'{run_dir}/csv/{term_dir_name}' )  # the baseline code doesn't create it
+    env: dict = dict( os.environ, LGNT__PROJECT_CODE_DIR=code_dir, PYTHONPATH=code_dir, LGNT__CSV_OUTPUT_DIR_PATH=f'{run_dir}/csv', LGNT__LOG_PATH=f'{run_dir}/run.log' )
+    if any( [not command[0].endswith(STEP_50_SCRIPT) for command in commands] ):
+        os.makedirs( f'{run_dir}/json' )
+        env['LGNT__JSON_DATA_DIR_PATH'] = f'{run_dir}/json'
+    start = time.perf_counter()
+    for command in commands:
+        subprocess.run( [sys.executable] + command, env=env, check=True )
+    log.info( f'run ``{run_name}`` took ``{time.perf_counter() - start:.1f}`` seconds' )
+    print( f'{run_name:<18} ran in {time.perf_counter() - start:.1f}s' )
+    return read_output_rows( f'{run_dir}/csv/{term_dir_name}' )
+
+
+## helpers ----------------------------------------------------------
+
+def read_output_rows( term_dir_path: str ) -> tuple:
+    """ Returns ( headers, rows ) from the reading-list tsvs under term_dir_path, in path-order (so shards are in part-order);
+        delta-runs' removed-rows files are skipped. Rows are lists of column-values.
+        Called by run_commands() """
+    tsv_paths: list = []
+    for ( dir_path, _, file_names ) in os.walk( term_dir_path ):
+        tsv_paths.extend( [f'{dir_path}/{file_name}' for file_name in file_names if file_name.endswith('.tsv') and not file_name.endswith('_removed.tsv')] )
+    if not tsv_paths:
+        raise Exception( f'no tsv output found under ``{term_dir_path}``' )
+    headers: list = []
+    rows: list = []
+    for tsv_path in sorted( tsv_paths ):
+        ( headers, tsv_rows ) = read_tsv( tsv_path )
+        rows.extend( tsv_rows )
+    return ( headers, rows )
+
+
+def read_tsv( tsv_path: str ) -> tuple:
+    """ Returns ( headers, rows ) from one tsv.
+        Called by main() and read_output_rows() """
+    with open( tsv_path, 'r', newline='' ) as f:
+        reader = csv.reader( f, delimiter='\t' )
+        headers: list = next( reader )
+        rows: list = list( reader )
+    return ( headers, rows )
+
+
+def write_tsv( tsv_path: str, headers: list, rows: list ) -> None:
+    """ Writes headers and rows to one tsv, for later use as a `--golden-tsv`.
+        Called by main() """
+    with open( tsv_path, 'w', newline='' ) as f:
+        writer = csv.writer( f, delimiter='\t' )
+        writer.writerow( headers )
+        writer.writerows( rows )
+    return
+
+
+def compare_rows( headers: list, reference_rows: list, rows: list, keeps_order: bool ) -> list:
+    """ Returns descriptions of the differences between the rows and the reference-rows; empty if they're identical.
+        Without keeps_order, both sides are first (stably) ordered by course, so only the course-order may differ.
+        Called by main() """
+    if not keeps_order:
+        course_index: int = headers.index( COURSE_COLUMN )
+        reference_rows = sorted( reference_rows, key=lambda row: row[course_index] )
+        rows = sorted( rows, key=lambda row: row[course_index] )
+    differences: list = []
+    if len( rows ) != len( reference_rows ):
+        differences.append( f'row-count {len(rows)} vs reference {len(reference_rows)}' )
+    for ( i, ( reference_row, row ) ) in enumerate( zip(reference_rows, rows) ):
+        if row == reference_row:
+            continue
+        changed: dict = { header: [reference_value, value] for ( header, reference_value, value ) in zip(headers, reference_row, row) if reference_value != value }
+        differences.append( f'row {i + 1}: {json.dumps(changed, sort_keys=True)}' )  # 1-based, after the header-line
+    return differences
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='diffs step 50\'s modes, and run_all.py, against a reference reading-list' )
+    parser.add_argument( '--work-dir', required=True, help='new directory for each run\'s output' )
+    parser.add_argument( '--modes', default=','.join(DEFAULT_MODES), help=f'comma-separated, from ``{list(MODES)}``; default ``{",".join(DEFAULT_MODES)}``' )
+    reference_group = parser.add_mutually_exclusive_group()
+    reference_group.add_argument( '--baseline-code-dir', default='', help='checkout of the pre-optimization code, whose step 50 makes the reference' )
+    reference_group.add_argument( '--golden-tsv', default='', help='stored reading-list tsv to use as the reference' )
+    parser.add_argument( '--save-golden', default='', help='path to save the reference rows to, for later `--golden-tsv` runs' )
+    parser.add_argument( '--jobs', type=int, default=4, help='worker-processes for the `jobs` mode; default 4' )
+    parser.add_argument( '--max-rows', type=int, default=500, help='rows per file for the `shard-rows` mode; default 500' )
+    parser.add_argument( '--max-diffs', type=int, default=20, help='differences to print per mode; default 20' )
+    args: dict = vars( parser.parse_args() )
+    unknown_modes: list = [ mode for mode in args['modes'].split(',') if mode not in MODES ]
+    if unknown_modes:
+        parser.error( f'unknown modes, ``{unknown_modes}``' )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    exit_code: int = main(
+        os.path.abspath(args['work_dir']), args['modes'].split(','), args['jobs'], args['max_rows'], args['max_diffs'],
+        os.path.abspath(args['baseline_code_dir']) if args['baseline_code_dir'] else '', args['golden_tsv'], args['save_golden'] )
+    sys.exit( exit_code )
@@ -0,0 +1,181 @@
+"""
+Microbenchmarks for hot per-citation functions.
+- Each benchmark runs a function over a list of representative inputs (taken from the tests.py fixtures), and reports ns per call,
+  and the peak bytes allocated per call (via tracemalloc; memory held by a warm cache isn't counted).
+- Where a pre-optimization or uncached version is available (eg benchmarks/reference_impls.py, or a cache's `__wrapped__`), it's run too, for comparison.
+- Logging below WARNING is disabled while measuring, so the numbers reflect the code rather than log-file writes.
+- Without `--number`, each timing runs enough passes over the inputs to take at least 0.2 seconds.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python ./benchmarks/microbenchmarks.py
+    % python ./benchmarks/microbenchmarks.py --number 5000 --only clean_citation_title
+"""
+
+import argparse, logging, os, sys, timeit, tracemalloc
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+
+## additional imports -----------------------------------------------
+from benchmarks import reference_impls, synthetic_data
+from lib import leganto_final_processor, openurl_parser, readings_processor
+from lib.cdl import CDL_Checker
+
+
+## inputs -----------------------------------------------------------
+## each is a list of argument-tuples
+
+TITLE_INPUTS: list = [  # from tests.py Leganto_Final_Processor_Test.test_clean_citation_title()
+    '',
+    '(EXCERPT) ',
+    '(EXCERPT) "Bharatha Natyam-What Are You?.',
+    '“Frayed Fabrications: Feminine Mobility, Surrogate Bodies and Robe Usage in Noh Drama”',
+    '"Ritual"',
+    '“Research, Countertext, Proposal: Considering the Textual Authority of the Dramaturg',
+    'Is Summer Learning Loss Real? How I lost faith in one of\neducation research‚Äôs classic results - Education Next : Education\nNext',
+    ]
+TITLE_ARGS: list = [ (title,) for title in TITLE_INPUTS ]
+
+AUTHOR_ARGS: list = [ ('Last, First',), (',Name',), ('Name,',), (', ',), (' ',) ]  # from tests.py test_clean_citation_author()
+
+OPENURL_ARGS: list = [  # from tests.py OpenUrlParserTest and MapperTest.test_map_bruknow_openurl_a()
+    ('//library.brown.edu/easyarticle/?genre=article&atitle="If I was not in prison, I would not be famous": Discipline, Choreography, and Mimicry in the Philippines&title=Theatre Journal&date=2011&volume=63&issue=4&spage=607&epage=621&issn=&doi=&aulast=J. Lorenzo&aufirst=Perillo&auinit=&__char_set=utf8',),
+    ('https://login.revproxy.brown.edu/login?url=http://sfx.brown.edu:8888/sfx_local?sid=sfx:citation&genre=article&atitle=The Plot of her Undoing&title=Feminist Art Coalition&date=2020-12-28&volume=&issue=&spage=&epage=&issn=&id=&aulast=Hartman&aufirst=Saidiya&auinit=&__char_set=utf8',),
+    ('//library.brown.edu/easyarticle/?genre=article&atitle=3, 4, 6, 14, 16&title=The Senses in Performance&date=2006-01-01&volume=&issue=&spage=&epage=&issn=&doi=&aulast=&aufirst=&auinit=&__char_set=utf8',),
+    ]
+PARSE_OPENURL_ARGS: list = OPENURL_ARGS + [ (None,) ]
+
+PDF_DATA: dict = {  # from tests.py's (commented-out) test_check_pdfs_A() fixture
+    '20190817060417pybarra': { 'articleid': 100230, 'atitle': 'Quinta Temporada, Los Vendidos, Los Dos Caras del Patroncito', 'filename': 'valdez_early.pdf', 'pdfid': 61925, 'title': 'Early Works' },
+    }
+PDF_SETTINGS: dict = { 'FILES_URL_PATTERN': 'https://library.brown.edu/reserves/pdffiles/{FILENAME}' }
+CHECK_PDFS_ARGS: list = [  # article-id match; request-id match only; no match
+    ( {'requests.requestid': '20190817060417pybarra', 'articleid': 100230}, PDF_DATA, 'TAPS1610', PDF_SETTINGS ),
+    ( {'requests.requestid': '20190817060417pybarra', 'articleid': 100231}, PDF_DATA, 'TAPS1610', PDF_SETTINGS ),
+    ( {'requests.requestid': '20190817060417zzzzzzz', 'articleid': 100232}, PDF_DATA, 'TAPS1610', PDF_SETTINGS ),
+    ]
+
+CITATION_SOURCE_ARGS: list = [  # from tests.py test_calculate_leganto_citation_source_from_*_data()
+    ( {'citation_source1': 'CDL link likely: <https://cdl.library.brown.edu/cdl/item/i168901742>', 'citation_source4': ''},),
+    ( {'citation_source1': 'Multiple possible CDL links: <https://cdl.library.brown.edu/cdl/item/23300432020006966>, <https://cdl.library.brown.edu/cdl/item/23300432030006966>', 'citation_source4': ''},),
+    ( {'citation_source1': 'no CDL link found', 'citation_source4': 'https://library.brown.edu/reserves/pdffiles/61925_france_battles_over_whether_to_cancel.pdf'},),
+    ( {'citation_source1': 'CDL link possibly: <https://cdl.library.brown.edu/cdl/item/23267522610006966>', 'citation_source4': 'no_pdf_found'},),
+    ( {'citation_source1': 'no CDL link found', 'citation_source2': 'https://brown.kanopystreaming.com/node/111103', 'citation_source4': 'no_pdf_found', 'citation_secondary_type': 'WS'},),
+    ]
+
+STAFF_NOTE_ARGS: list = [  # from tests.py test_calculate_leganto_staff_note()
+    ( 'not yet used', '', 'no openurl found', '20170126002905nf' ),
+    ( 'not yet used', 'http://josiah.brown.edu/record=b7696750~S7', 'https://bruknow.library.brown.edu/discovery/openurl?institution=01BU_INST&vid=01BU_INST:BROWN&', '20160122142047lp' ),
+    ( 'CDL link likely: <https://cdl.library.brown.edu/cdl/item/i177331252>', '', 'no openurl found', '20210119155607ra' ),
+    ( 'Multiple possible CDL links: <https://cdl.library.brown.edu/cdl/item/23300432020006966>, <https://cdl.library.brown.edu/cdl/item/23300432030006966>', '', 'no openurl found', 'test123' ),
+    ( '', '', '', 'test456', 'filename, ``1093887456432459.mp3``' ),
+    ]
+
+CDL_SEARCH_ARGS: list = [  # from tests.py CDL_Checker_Test
+    ('Critical Encounters in Secondary English: Teaching Literary Theory to Adolescents',),
+    ('Yi Kwangsu and Modern Korean Literature',),
+    ('',),
+    ]
+CDL_ROWS: list = [  # the titles tests.py CDL_Checker_Test expects to find; the rest of the catalog is synthetic
+    { 'id': 1523, 'item_id': 'b90794643', 'title': 'Critical encounters in Secondary English : teaching literary theory to adolescents' },
+    { 'id': 2058, 'item_id': '23328680100006966', 'title': 'Yi Kwang-su and modern Korean literature, Mujŏng /' },
+    { 'id': 2903, 'item_id': '23328680070006966', 'title': 'Yi Kwang-su and modern Korean literature, Mujŏng /' },
+    ]
+CDL_CATALOG_SIZE: int = 1000
+
+
+def make_cdl_checker() -> CDL_Checker:
+    """ Returns a CDL_Checker whose titles are pre-loaded (so no db is needed): the tests.py rows, in a synthetic catalog of CDL_CATALOG_SIZE.
+        Called by main() """
+    term = synthetic_data.Synthetic_Term( 1, dict(synthetic_data.DEFAULT_CONFIG, cdl_catalog_size=CDL_CATALOG_SIZE - len(CDL_ROWS)) )
+    term.make_cdl_catalog()
+    cdl_checker = CDL_Checker()
+    cdl_checker.CDL_TITLES = sorted( term.tables['cdl_app_item'] + [dict(row) for row in CDL_ROWS], key=lambda row: row['title'] )  # as populate_cdl_titles() orders them
+    return cdl_checker
+
+
+## benchmarks -------------------------------------------------------
+
+def make_benchmarks() -> list:
+    """ Returns [ ( name, variant, function, args-list ), ... ].
+        Called by main() """
+    cdl_checker: CDL_Checker = make_cdl_checker()
+    benchmarks: list = [
+        ( 'openurl_parser.parse', 'current (cache-warm)', openurl_parser.parse, PARSE_OPENURL_ARGS ),  # as get_openurl() calls it; readings_processor.parse_openurl() is only a tests.py wrapper
+        ( 'openurl_parser.parse', 'current (uncached)', openurl_parser.parse.__wrapped__, PARSE_OPENURL_ARGS ),
+        ( 'map_bruknow_openurl', 'current (cache-warm)', readings_processor.map_bruknow_openurl, OPENURL_ARGS ),
+        ( 'map_bruknow_openurl', 'make_bruknow_openurl (uncached)', openurl_parser.make_bruknow_openurl, OPENURL_ARGS ),
+        ( 'check_pdfs', 'current', readings_processor.check_pdfs, CHECK_PDFS_ARGS ),
+        ( 'clean_citation_title', 'reference', reference_impls.clean_citation_title, TITLE_ARGS ),
+        ( 'clean_citation_title', 'current (uncached)', leganto_final_processor.clean_citation_title.__wrapped__, TITLE_ARGS ),
+        ( 'clean_citation_title', 'current (cache-warm)', leganto_final_processor.clean_citation_title, TITLE_ARGS ),
+        ( 'clean_citation_author', 'current', leganto_final_processor.clean_citation_author, AUTHOR_ARGS ),
+        ( 'calculate_leganto_citation_source', 'current', leganto_final_processor.calculate_leganto_citation_source, CITATION_SOURCE_ARGS ),
+        ( 'calculate_leganto_staff_note', 'current', leganto_final_processor.calculate_leganto_staff_note, STAFF_NOTE_ARGS ),
+        ( 'search_cdl', f'current ({CDL_CATALOG_SIZE} titles)', cdl_checker.search_cdl, CDL_SEARCH_ARGS ),
+        ]
+    return benchmarks
+
+
+def run_benchmark( function, args_list: list, number: int ) -> float:
+    """ Returns the best-of-3 ns per call; `number` passes over the inputs per timing, or enough for 0.2 seconds if 0.
+        Called by main() """
+    def run_inputs():
+        for args in args_list:
+            function( *args )
+    timer = timeit.Timer( run_inputs )
+    if not number:
+        ( number, _ ) = timer.autorange()
+    best_seconds: float = min( timer.repeat(repeat=3, number=number) )
+    return best_seconds / ( number * len(args_list) ) * 1_000_000_000
+
+
+def measure_allocations( function, args_list: list ) -> float:
+    """ Returns the mean, over the inputs, of the peak bytes allocated during a call; run after run_benchmark(), so caches are warm.
+        Called by main() """
+    total_bytes: int = 0
+    tracemalloc.start()
+    try:
+        for args in args_list:
+            tracemalloc.reset_peak()
+            ( start_bytes, _ ) = tracemalloc.get_traced_memory()
+            function( *args )
+            ( _, peak_bytes ) = tracemalloc.get_traced_memory()
+            total_bytes += peak_bytes - start_bytes
+    finally:
+        tracemalloc.stop()
+    return total_bytes / len( args_list )
+
+
+def main( number: int, only: str ) -> list:
+    """ Runs the benchmarks; prints and returns the results.
+        Called by if __name__ == '__main__' """
+    logging.disable( logging.INFO )
+    results: list = []
+    for ( name, variant, function, args_list ) in make_benchmarks():
+        if only and name != only:
+            continue
+        ns_per_call: float = run_benchmark( function, args_list, number )
+        bytes_per_call: float = measure_allocations( function, args_list )
+        results.append( {'name': name, 'variant': variant, 'ns_per_call': round(ns_per_call, 1), 'bytes_per_call': round(bytes_per_call)} )
+        print( f'{name:<36} {variant:<34} {ns_per_call:>14.1f} ns/call {bytes_per_call:>10.0f} B/call' )
+    logging.disable( logging.NOTSET )
+    return results
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='runs microbenchmarks for hot per-citation functions' )
+    parser.add_argument( '--number', type=int, default=0, help='passes over the inputs per timing; default: enough for 0.2 seconds' )
+    parser.add_argument( '--only', default='', help='run only the named benchmark, eg `clean_citation_title`' )
+    args: dict = vars( parser.parse_args() )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    main( args['number'], args['only'] )
+    sys.exit()
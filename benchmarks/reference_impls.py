@@ -0,0 +1,59 @@
+""" Pre-optimization versions of hot per-citation functions, kept verbatim as the baseline for:
+    - equivalence tests (instructor_check_flow/tests_instructor_check.py)
+    - microbenchmarks (benchmarks/microbenchmarks.py)
+    Not used by the flow itself. """
+
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+def clean_citation_title( db_title: str ) -> str:
+    log.debug( f'db_title initially, ``{db_title}``' )
+    if db_title:
+        db_title = db_title.strip()
+        log.debug( f'db_title after strip, ``{db_title}``' )
+        db_title = db_title.replace( '\n', ' ' )
+        db_title = db_title.replace( '  ', ' ' )
+        if db_title == '(EXCERPT)':
+            pass
+        elif '(EXCERPT)' in db_title:
+            db_title = db_title.replace( '(EXCERPT)', '' )
+            db_title = db_title.strip()
+        if db_title[-1] == ':':
+            db_title = db_title[0:-1]
+        if db_title[-1] == '.':
+            log.debug( 'found period' )
+            db_title = db_title[0:-1]
+        if db_title[0] == '“':  # starting smart-quotes
+            ## remove initial-smart-quotes if there's only one, and only one end-smart-quotes, and it's at the end.
+            log.debug( 'found starting smart-quotes' )
+            count_start: int = db_title.count( '“' )
+            if count_start == 1:
+                count_end: int = db_title.count( '”' )
+                if count_end == 1:
+                    if db_title[-1] == '”':  # ok, remove both
+                        db_title = db_title[1:-1]
+        if db_title[0] == '“':
+            count_quotes: int = db_title.count( '“' )
+            if count_quotes == 1:
+                db_title = db_title[1:] 
+        if db_title[0] == '"':
+            ## remove initial-quotes if there are two, and the other is at the end.
+            log.debug( 'found starting simple-quotes' )
+            count_quotes: int = db_title.count( '"' )
+            if count_quotes == 2:
+                if db_title[-1] == '"':  # ok, remove both
+                    db_title = db_title[1:-1]
+        if db_title[0] == '"':
+            count_quotes: int = db_title.count( '"' )
+            if count_quotes == 1:
+                db_title = db_title[1:]
+        db_title = db_title.strip()
+    else:
+        db_title = 'no-title'
+    log.debug( f'db_title cleaned, ``{db_title}``' )
+    return db_title
+
+    ## end def clean_citation_title()
@@ -0,0 +1,385 @@
+"""
+Generates a synthetic term's worth of instructor-check-flow inputs, for load-testing; the same seed and config always give the same files.
+
+Writes, to the output-directory:
+- `oit_courses.tsv` -- the OIT course-list (the 34 columns step 10 expects); for `LGNT__COURSES_FILEPATH`.
+- `already_in_leganto.tsv` -- the already-in-Leganto list (the 12 columns step 20 expects); for `LGNT__ALREADY_IN_LEGANTO_FILEPATH`.
+- `pdf_data.json` -- the pdf-index, keyed by requestid (as lib/make_pdf_json_data.py makes it); for `LGNT__PDF_JSON_PATH`.
+- `fake_ocra.sqlite3` -- the OCRA tables and the CDL catalog (`cdl_app_item`), for the `fake` db-backend (see lib/fake_ocra.py); for `LGNT__FAKE_OCRA_PATH`.
+- `manifest.json` -- the seed, config, and row-counts.
+
+The DEFAULT_CONFIG counts and distributions can be overridden with a json file (`--config`); `--courses` sets the OIT course-count.
+Distributions are lists of [ value, weight ] pairs.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python ./benchmarks/synthetic_data.py --output-dir ../synthetic_term --courses 20000 --seed 1
+"""
+
+import argparse, datetime, json, logging, os, random, sys
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+
+## additional imports -----------------------------------------------
+from lib import fake_ocra
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_CONFIG: dict = {
+    'oit_courses': 5969,                        # Spring 2024's OIT course-count
+    'year': '2024',
+    'season': 'spring',
+    'target_term_fraction': 0.2,                # OIT rows for the target year/season; the rest are other terms (dropped by step 10)
+    'non_s01_section_fraction': 0.05,           # of target-term rows
+    'no_instructor_fraction': 0.03,             # of target-term rows
+    'instructors_per_course': [ [1, 0.85], [2, 0.12], [3, 0.03] ],
+    'instructor_pool_ratio': 0.6,               # distinct instructors per OIT course
+    'no_email_fraction': 0.1,                   # instructors with no `banner_dump` row (dropped by step 15)
+    'already_in_leganto_fraction': 0.2,         # courses already in Leganto with the same instructor (dropped by step 20)
+    'class_ids_per_course': [ [0, 0.4], [1, 0.4], [2, 0.15], [3, 0.05] ],  # 0: dropped by step 30
+    'instructor_mismatch_fraction': 0.25,       # class_ids whose OCRA instructor isn't an OIT instructor (dropped by step 35)
+    'citations_per_class': [ [0, 0.3], [3, 0.2], [10, 0.3], [25, 0.15], [60, 0.05] ],  # a course with none is dropped by step 40
+    'format_weights': [ ['article', 0.45], ['book', 0.25], ['excerpt', 0.1], ['ebook', 0.05], ['website', 0.05], ['video', 0.03], ['audio', 0.02], ['track', 0.05] ],
+    'withdrawn_article_fraction': 0.05,         # `volume on reserve` / `purchase requested` article-rows, which the queries skip
+    'openurl_fraction': 0.7,                    # article-table rows with an sfxlink
+    'pdf_fraction': 0.5,                        # articles and excerpts with a pdf-index entry
+    'cdl_catalog_size': 1000,
+    'cdl_match_fraction': 0.1,                  # citations whose title is a CDL-catalog title
+    }
+
+OIT_HEADERS: list = [
+    'COURSE_CODE', 'COURSE_TITLE', 'SECTION_ID', 'ACAD', 'PROC_DEPT', 'TERM1', 'TERM2', 'TERM3', 'TERM4', 'START_DATE', 'END_DATE',
+    'NUM_OF_PARTIICIPANTS', 'WEEKLY_HOURS', 'YEAR', 'SEARCH_ID1', 'SEARCH_ID2', 'MULTI_SEARCH_ID', 'INSTR1', 'INSTR2', 'INSTR3', 'INSTR4',
+    'INSTR5', 'INSTR6', 'INSTR7', 'INSTR8', 'INSTR9', 'INSTR10', 'ALL_INSTRUCTORS', 'OPERATION', 'OLD_COURSE_CODE', 'OLD_COURSE_SECTION',
+    'SUBMIT_LISTS_BY', 'CAMPUS_AND_PARTICIPANTS', 'READING_LIST_NAME' ]  # as validate_files.OIT_columns_are_valid() checks
+ALREADY_IN_LEGANTO_HEADERS: list = [
+    'Reading List Id', 'Reading List Owner', 'Academic Department', 'Reading List Code', 'Reading List Name', 'Course Code', 'Course Section',
+    'Course Name', 'Course Instructor', 'Course Instructor Primary Identifier', 'Course Instructor With Primary Identifier',
+    'Course Instructor Preferred Email' ]  # as validate_files.already_in_leganto_columns_valid() checks
+
+DEPARTMENTS: list = [ 'afri', 'amst', 'anth', 'arch', 'biol', 'chem', 'clas', 'csci', 'east', 'econ', 'educ', 'engl', 'envs', 'hist',
+    'hiaa', 'ital', 'mcm', 'musc', 'phil', 'phys', 'pols', 'psyc', 'reli', 'slav', 'soc', 'taps', 'urbn', 'visa' ]
+SEASON_CODES: dict = { 'spring': '20', 'summer': '30', 'fall': '10', 'winter': '15' }
+TITLE_WORDS: dict = {
+    'adjectives': [ 'Critical', 'Modern', 'Global', 'Hidden', 'Early', 'Urban', 'Sacred', 'Political', 'Unequal', 'Digital', 'Colonial', 'Social' ],
+    'nouns': [ 'Encounters', 'Histories', 'Bodies', 'Cities', 'Markets', 'Archives', 'Voices', 'Borders', 'Rituals', 'Networks', 'Theories', 'Landscapes' ],
+    'topics': [ 'Finance', 'Literature', 'Migration', 'Empire', 'Performance', 'Memory', 'Ecology', 'Religion', 'Labor', 'Science', 'Music', 'Law' ],
+    }
+NAME_SYLLABLES: list = [ 'ka', 'lo', 'mer', 'vin', 'to', 'sha', 'ru', 'del', 'ba', 'ni', 'qua', 'zen', 'or', 'pe', 'li', 'tam' ]  # for made-up place-names, so titles don't all fuzzy-match each other
+FIRST_NAMES: list = [ 'Ann', 'Bart', 'Chen', 'Dana', 'Eli', 'Fatima', 'Gil', 'Hana', 'Ivan', 'Jo', 'Kofi', 'Lena', 'Mira', 'Nils', 'Omar', 'Priya' ]
+LAST_NAMES: list = [ 'Adams', 'Baptiste', 'Cohen', 'Diaz', 'Eriksen', 'Fujita', 'Garcia', 'Hartman', 'Iyer', 'Jones', 'Kim', 'Lee', 'Mensah', 'Novak', 'Okafor', 'Perillo' ]
+
+
+## controller -------------------------------------------------------
+
+def main( output_dir: str, seed: int, config: dict ) -> dict:
+    """ Generates and writes the files; returns the manifest.
+        Called by if __name__ == '__main__' """
+    os.makedirs( output_dir, exist_ok=True )
+    term = Synthetic_Term( seed, config )
+    term.generate()
+    write_tsv( f'{output_dir}/oit_courses.tsv', OIT_HEADERS, term.oit_rows )
+    write_tsv( f'{output_dir}/already_in_leganto.tsv', ALREADY_IN_LEGANTO_HEADERS, term.already_in_leganto_rows )
+    with open( f'{output_dir}/pdf_data.json', 'w' ) as f:
+        f.write( json.dumps(term.pdf_data, sort_keys=True, indent=2) )
+    table_counts: dict = fake_ocra.build_fixture_db( f'{output_dir}/fake_ocra.sqlite3', term.tables, {'cdl_app_item': {'created': 'DATETIME', 'modified': 'DATETIME'}} )
+    manifest: dict = {
+        'seed': seed,
+        'config': config,
+        'counts': {
+            'oit_rows': len( term.oit_rows ),
+            'target_term_courses': term.target_course_count,
+            'already_in_leganto_rows': len( term.already_in_leganto_rows ),
+            'pdf_entries': len( term.pdf_data ),
+            'tables': table_counts,
+            },
+        'envars': {
+            'LGNT__COURSES_FILEPATH': f'{output_dir}/oit_courses.tsv',
+            'LGNT__ALREADY_IN_LEGANTO_FILEPATH': f'{output_dir}/already_in_leganto.tsv',
+            'LGNT__PDF_JSON_PATH': f'{output_dir}/pdf_data.json',
+            'LGNT__FAKE_OCRA_PATH': f'{output_dir}/fake_ocra.sqlite3',
+            'LGNT__DB_BACKEND': 'fake',
+            'LGNT__YEAR': config['year'],
+            'LGNT__SEASON': config['season'],
+            'LGNT__LEGIT_SECTIONS_JSON': json.dumps( ['s01'] ),
+            },
+        }
+    with open( f'{output_dir}/manifest.json', 'w' ) as f:
+        f.write( json.dumps(manifest, sort_keys=True, indent=2) )
+    log.info( f'synthetic term written to, ``{output_dir}``; counts, ``{manifest["counts"]}``' )
+    return manifest
+
+
+## generator --------------------------------------------------------
+
+
+class Synthetic_Term(object):
+    """ Holds one synthetic term's rows; generate() fills them, from a seeded random-generator. """
+
+    def __init__( self, seed: int, config: dict ):
+        self.rng = random.Random( seed )
+        self.config: dict = config
+        self.oit_rows: list = []
+        self.already_in_leganto_rows: list = []
+        self.pdf_data: dict = {}
+        self.tables: dict = { table_name: [] for table_name in (
+            'banner_courses', 'banner_dump', 'classes', 'instructors', 'requests', 'articles', 'books', 'tracks', 'tracks2classes', 'cdl_app_item') }
+        self.target_course_count: int = 0
+        self.next_ids: dict = { 'classid': 10000, 'facultyid': 500, 'articleid': 1, 'bookid': 1, 'trackid': 1, 'pdfid': 1, 'request_second': 0 }
+        self.cdl_titles: list = []
+
+    def generate( self ) -> None:
+        instructors: list = self.make_instructors()
+        self.make_cdl_catalog()
+        config: dict = self.config
+        course_keys: list = self.make_course_keys( config['oit_courses'] )
+        for ( i, ( department, number ) ) in enumerate( course_keys ):
+            in_target_term: bool = self.rng.random() < config['target_term_fraction']
+            year, season = ( config['year'], config['season'] ) if in_target_term else self.pick_other_term()
+            section: str = 's01'
+            if in_target_term and self.rng.random() < config['non_s01_section_fraction']:
+                section = self.rng.choice( ['s02', 's10', 'l01'] )
+            course_instructors: list = self.rng.sample( instructors, self.pick(config['instructors_per_course']) )
+            if in_target_term and self.rng.random() < config['no_instructor_fraction']:
+                course_instructors = []
+            course_code: str = f'brown.{department}.{number}.{year}-{season}.{section}'
+            course_title: str = self.make_title( short=True )
+            self.oit_rows.append( self.make_oit_row(course_code, course_title, year, season, course_instructors) )
+            if not ( in_target_term and section == 's01' and course_instructors ):
+                continue
+            self.target_course_count += 1
+            if self.rng.random() < config['already_in_leganto_fraction']:
+                self.already_in_leganto_rows.append( self.make_already_in_leganto_row(course_code, course_title, course_instructors[0]) )
+            for _ in range( self.pick(config['class_ids_per_course']) ):
+                ocra_instructor: dict = course_instructors[0]
+                if self.rng.random() < config['instructor_mismatch_fraction']:
+                    ocra_instructor = self.rng.choice( instructors )
+                self.make_ocra_class( department, number, year, season, ocra_instructor )
+        return
+
+    ## people and catalog -------------------------------------------
+
+    def make_instructors( self ) -> list:
+        """ Makes the instructor pool, with `instructors` rows, and `banner_dump` rows for those with an email. """
+        instructors: list = []
+        pool_size: int = max( 3, int(self.config['oit_courses'] * self.config['instructor_pool_ratio']) )
+        for i in range( pool_size ):
+            first_name, last_name = self.rng.choice( FIRST_NAMES ), self.rng.choice( LAST_NAMES )
+            bru_id: str = f'{self.rng.randint(0, 1)}{self.rng.randint(10000000, 99999999)}'  # some start with `0`, which ocra mostly drops
+            instructor: dict = {
+                'bru_id': bru_id, 'facultyid': self.next_id( 'facultyid' ),
+                'email': f'{first_name}_{last_name}_{i}@brown.edu'.lower(), 'name': f'{last_name}, {first_name}' }
+            instructors.append( instructor )
+            self.tables['instructors'].append( {'facultyid': instructor['facultyid'], 'email': instructor['email'], 'name': instructor['name']} )
+            if self.rng.random() >= self.config['no_email_fraction']:
+                ocra_bru_id: str = bru_id[1:] if bru_id[0] == '0' else bru_id
+                self.tables['banner_dump'].append( {'inst_bruid': ocra_bru_id, 'inst_email': instructor['email'], 'inst_name': instructor['name']} )
+        return instructors
+
+    def make_cdl_catalog( self ) -> None:
+        for i in range( self.config['cdl_catalog_size'] ):
+            title: str = self.make_title()
+            created = datetime.datetime( 2021, 1, 1 ) + datetime.timedelta( seconds=self.rng.randint(0, 3 * 365 * 86400) )
+            item_id: str = f'i{self.rng.randint(100000000, 999999999)}'
+            self.cdl_titles.append( title )
+            self.tables['cdl_app_item'].append( {
+                'id': i + 1, 'alma_item_pid': None, 'alma_mms_id': f'99{self.rng.randint(1000000000, 9999999999)}6966',
+                'author': self.make_author(), 'barcode': None, 'bib_id': f'b{self.rng.randint(10000000, 99999999)}',
+                'created': created, 'item_file': f'{item_id}.pdf', 'item_id': item_id,
+                'modified': created + datetime.timedelta( days=self.rng.randint(0, 60) ), 'num_copies': self.rng.randint( 1, 3 ),
+                'status': 'ready', 'title': title } )
+        return
+
+    ## ocra class and readings --------------------------------------
+
+    def make_ocra_class( self, department: str, number: str, year: str, season: str, ocra_instructor: dict ) -> None:
+        class_id: int = self.next_id( 'classid' )
+        term_code: str = f'{year}{SEASON_CODES.get(season, "00")}'
+        self.tables['banner_courses'].append( {'classid': class_id, 'subject': department.upper(), 'course': number.upper(), 'term': term_code, 'section': 'S01'} )
+        self.tables['classes'].append( {'classid': class_id, 'facultyid': ocra_instructor['facultyid'], 'department': department.upper(), 'number': number.upper()} )
+        for _ in range( self.pick(self.config['citations_per_class']) ):
+            format_name: str = self.pick( self.config['format_weights'] )
+            if format_name == 'track':
+                track_id: int = self.next_id( 'trackid' )
+                self.tables['tracks'].append( {
+                    'trackid': track_id, 'tracktitle': self.make_title(short=True), 'filename': f'track_{track_id}.mp3',
+                    'procdate': self.make_datetime(), 'timing': datetime.timedelta( seconds=self.rng.randint(30, 900) ) } )
+                self.tables['tracks2classes'].append( {'trackid': track_id, 'classid': class_id} )
+                continue
+            request_id: str = self.next_request_id()
+            request_date: datetime.datetime = self.make_datetime()
+            self.tables['requests'].append( {
+                'requestid': request_id, 'classid': class_id, 'request_date': request_date,
+                'date_printed': self.rng.choice( [None, request_date + datetime.timedelta(days=2)] ) } )
+            if format_name == 'book':
+                self.tables['books'].append( self.make_book_row(request_id) )
+            else:
+                self.tables['articles'].append( self.make_article_row(request_id, format_name) )
+        return
+
+    def make_book_row( self, request_id: str ) -> dict:
+        first_name, last_name = self.rng.choice( FIRST_NAMES ), self.rng.choice( LAST_NAMES )
+        return {
+            'bookid': self.next_id( 'bookid' ), 'requestid': request_id, 'bk_title': self.make_citation_title(),
+            'bk_author': f'{last_name}, {first_name}', 'bk_aufirst': first_name, 'bk_aulast': last_name,
+            'bk_year': self.rng.choice( [None, str(self.rng.randint(1950, 2023))] ), 'isbn': f'978{self.rng.randint(1000000000, 9999999999)}',
+            'facnotes': self.rng.choice( ['', '', 'CDL linked 11/9/2022', 'Ebook on reserve'] ), 'sfxlink': '', 'bk_updated': self.make_datetime(),
+            'needed_by': self.rng.choice( [None, self.make_datetime().date()] ) }
+
+    def make_article_row( self, request_id: str, format_name: str ) -> dict:
+        first_name, last_name = self.rng.choice( FIRST_NAMES ), self.rng.choice( LAST_NAMES )
+        article_id: int = self.next_id( 'articleid' )
+        atitle: str = self.make_citation_title()
+        journal_title: str = f'Journal of {self.rng.choice(TITLE_WORDS["topics"])}' if format_name in ( 'article', 'excerpt' ) else self.make_citation_title()
+        spage = self.rng.randint( 1, 400 )
+        status: str = 'available'
+        if self.rng.random() < self.config['withdrawn_article_fraction']:
+            status = self.rng.choice( ['volume on reserve', 'purchase requested'] )
+        sfxlink: str = ''
+        if self.rng.random() < self.config['openurl_fraction']:
+            sfxlink = ( f'https://login.revproxy.brown.edu/login?url=http://sfx.brown.edu:8888/sfx_local?sid=sfx:citation&genre=article'
+                f'&atitle={atitle}&title={journal_title}&spage={spage}&epage={spage + 20}&aulast={last_name}&aufirst={first_name}' )
+        if format_name in ( 'article', 'excerpt' ) and self.rng.random() < self.config['pdf_fraction']:
+            pdf_id: int = self.next_id( 'pdfid' )
+            self.pdf_data[request_id] = { 'articleid': article_id, 'atitle': atitle, 'filename': f'{last_name.lower()}_{pdf_id}.pdf', 'pdfid': pdf_id, 'title': journal_title }
+        return {
+            'articleid': article_id, 'requestid': request_id, 'format': format_name, 'status': status, 'atitle': atitle,
+            'title': journal_title, 'aulast': last_name, 'aufirst': first_name, 'author': f'{last_name}, {first_name}',
+            'bk_aufirst': first_name if format_name == 'ebook' else '', 'bk_aulast': last_name if format_name == 'ebook' else '',  # ebook authors are in the bk_ columns
+            'doi': self.rng.choice( ['', f' 10.{self.rng.randint(1000, 9999)}/{article_id}'] ),  # some with the leading-space the extractor cleans
+            'spage': spage if self.rng.random() < 0.8 else None, 'epage': spage + self.rng.randint( 5, 40 ) if self.rng.random() < 0.8 else None,
+            'issn': f'{self.rng.randint(1000, 9999)}-{self.rng.randint(1000, 9999)}', 'issue': str( self.rng.randint(1, 12) ),
+            'volume': str( self.rng.randint(1, 80) ), 'date': datetime.date( self.rng.randint(1960, 2023), 1, 1 ), 'year': str( self.rng.randint(1960, 2023) ),
+            'date_due': self.rng.choice( [None, self.make_datetime().date()] ), 'art_updated': self.make_datetime(),
+            'isbn': '', 'art_url': self.rng.choice( ['', 'https://www.jstor.org/stable/%s' % self.rng.randint(10000, 99999)] ),
+            'sfxlink': sfxlink, 'facnotes': '' }
+
+    ## oit and leganto rows -----------------------------------------
+
+    def make_oit_row( self, course_code: str, course_title: str, year: str, season: str, course_instructors: list ) -> list:
+        all_instructors: str = ','.join( [instructor['bru_id'] for instructor in course_instructors] )
+        instructor_columns: list = [ instructor['bru_id'] for instructor in course_instructors ][:10]
+        instructor_columns += [ '' ] * ( 10 - len(instructor_columns) )
+        department: str = course_code.split( '.' )[1]
+        row: list = [
+            course_code, course_title, course_code.split('.')[-1].upper(), 'UGRD', department.upper(), f'{year}-{season}', '', '', '',
+            f'{year}-01-24', f'{year}-05-10', str( self.rng.randint(5, 200) ), str( self.rng.choice([2, 3, 4]) ), year,
+            course_code, '', '' ] + instructor_columns + [ all_instructors, 'ADD', '', '', '', '', course_title ]
+        assert len( row ) == len( OIT_HEADERS )
+        return row
+
+    def make_already_in_leganto_row( self, course_code: str, course_title: str, instructor: dict ) -> list:
+        department: str = course_code.split( '.' )[1]
+        return [
+            str( self.rng.randint(1000000, 9999999) ), instructor['name'], department.upper(), course_code, course_title, course_code, 's01',
+            course_title, instructor['name'], instructor['bru_id'], f'{instructor["name"]} ({instructor["bru_id"]})', instructor['email'] ]
+
+    ## helpers ------------------------------------------------------
+
+    def make_course_keys( self, count: int ) -> list:
+        """ Returns distinct ( department, number ) pairs. """
+        course_keys: list = []
+        seen: set = set()
+        while len( course_keys ) < count:
+            number: str = f'{self.rng.randint(10, 2999):04d}' + self.rng.choice( ['', '', '', 'a', 'b', 'v', 'x'] )
+            course_key: tuple = ( self.rng.choice(DEPARTMENTS), number )
+            if course_key not in seen:
+                seen.add( course_key )
+                course_keys.append( course_key )
+        return course_keys
+
+    def pick_other_term( self ) -> tuple:
+        year, season = self.config['year'], self.config['season']
+        while ( year, season ) == ( self.config['year'], self.config['season'] ):
+            year = str( int(self.config['year']) + self.rng.choice([-1, 0, 1]) )
+            season = self.rng.choice( list(SEASON_CODES.keys()) )
+        return ( year, season )
+
+    def pick( self, distribution: list ):
+        """ Returns a value from a [ [value, weight], ... ] distribution. """
+        return self.rng.choices( [pair[0] for pair in distribution], weights=[pair[1] for pair in distribution] )[0]
+
+    def make_title( self, short: bool = False ) -> str:
+        words: dict = TITLE_WORDS
+        title: str = f'{self.rng.choice(words["adjectives"])} {self.rng.choice(words["nouns"])}'
+        if not short:
+            title = ( f'{title} of {self.make_place_name()}: {self.rng.choice(words["topics"])}, {self.rng.choice(words["topics"]).lower()}, '
+                f'and the {self.make_place_name()} {self.rng.choice(words["nouns"]).lower()}' )
+        return title
+
+    def make_place_name( self ) -> str:
+        return ''.join( [self.rng.choice(NAME_SYLLABLES) for _ in range(self.rng.randint(2, 4))] ).capitalize()
+
+    def make_citation_title( self ) -> str:
+        """ Returns a title; some are CDL-catalog titles, re-cased (as OCRA's often are), so the fuzzy CDL-search finds them. """
+        if self.cdl_titles and self.rng.random() < self.config['cdl_match_fraction']:
+            return self.rng.choice( self.cdl_titles ).title()
+        return self.make_title()
+
+    def make_datetime( self ) -> datetime.datetime:
+        return datetime.datetime( 2005, 1, 1 ) + datetime.timedelta( seconds=self.rng.randint(0, 19 * 365 * 86400) )
+
+    def make_author( self ) -> str:
+        return f'{self.rng.choice(LAST_NAMES)}, {self.rng.choice(FIRST_NAMES)}.'
+
+    def next_id( self, key: str ) -> int:
+        value: int = self.next_ids[key]
+        self.next_ids[key] += 1
+        return value
+
+    def next_request_id( self ) -> str:
+        """ Returns a unique OCRA-style requestid, a timestamp like `20031210153909`. """
+        self.next_ids['request_second'] += self.rng.randint( 1, 600 )
+        return ( datetime.datetime(2005, 1, 1) + datetime.timedelta(seconds=self.next_ids['request_second']) ).strftime( '%Y%m%d%H%M%S' )
+
+    ## end class Synthetic_Term()
+
+
+## writers ----------------------------------------------------------
+
+def write_tsv( filepath: str, headers: list, rows: list ) -> None:
+    """ Writes plain tab-joined lines (the values never contain tabs), which is how steps 10 and 20 split them.
+        Called by main() """
+    with open( filepath, 'w', encoding='utf-8' ) as f:
+        f.write( '\t'.join(headers) + '\n' )
+        for row in rows:
+            f.write( '\t'.join(row) + '\n' )
+    return
+
+
+def load_config( config_path: str, courses: int ) -> dict:
+    """ Returns DEFAULT_CONFIG, updated by the optional json config-file and course-count.
+        Called by if __name__ == '__main__' """
+    config: dict = dict( DEFAULT_CONFIG )
+    if config_path:
+        with open( config_path, 'r' ) as f:
+            config.update( json.loads(f.read()) )
+    if courses:
+        config['oit_courses'] = courses
+    unknown_keys: list = sorted( set(config.keys()) - set(DEFAULT_CONFIG.keys()) )
+    if unknown_keys:
+        raise Exception( f'unknown config keys, ``{unknown_keys}``' )
+    return config
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='generates synthetic instructor-check-flow inputs' )
+    parser.add_argument( '--output-dir', required=True, help='directory for the generated files' )
+    parser.add_argument( '--seed', type=int, default=1, help='random seed; default 1' )
+    parser.add_argument( '--courses', type=int, default=0, help='OIT course-count; default from the config' )
+    parser.add_argument( '--config', default='', help='json file of DEFAULT_CONFIG overrides' )
+    args: dict = vars( parser.parse_args() )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    config: dict = load_config( args['config'], args['courses'] )
+    manifest: dict = main( args['output_dir'], args['seed'], config )
+    print( json.dumps(manifest['counts'], sort_keys=True, indent=2) )
+    sys.exit()
@@ -54,6 +54,17 @@ log.debug( f'JSON_SUMMARY_PATH, ``{JSON_SUMMARY_PATH}``' )
 def main():
     """ Controller.
         Called by if __name__ == '__main__' """
+    oit_subset: dict = process()
+    save( oit_subset )
+    return
+
+    ## end main()
+
+
+def process() -> dict:
+    """ Validates and filters the OIT file; returns the subset and its summary, like:
+            { 'heading_line': 'COURSE_CODE\tCOURSE_TITLE...', 'subset_lines': [ 'brown.afri.0090...', etc... ], 'summary': {...} }
+        Called by main(), and by run_all.py (which passes the result straight to step 15). """
 
     ## validate OIT file --------------------------------------------
     assert is_utf8_encoded( OIT_COURSE_LIST_PATH ) == True
@@ -125,19 +136,27 @@ def main():
     easyview_output = make_easyview_output( buckets_dict, skipped_due_to_no_instructor, len(data_lines), len(subset_lines) )
     log.debug( f'easyview_output, ``{pprint.pformat(easyview_output)}``' )
 
+    return { 'heading_line': heading_line, 'subset_lines': subset_lines, 'summary': easyview_output }
+
+    ## end process()
+
+
+def save( oit_subset: dict ) -> None:
+    """ Writes the json summary and the subset tsv.
+        Called by main(), and by run_all.py when writing artifacts. """
+
     ## write json summary -------------------------------------------
     with open( JSON_SUMMARY_PATH, 'w' ) as f:
         # json.dump( easyview_output, f, indent=2 )
-        jsn = json.dumps( easyview_output, sort_keys=True, indent=2 )
+        jsn = json.dumps( oit_subset['summary'], sort_keys=True, indent=2 )
         f.write( jsn )
 
     ## write summer-2023 subset to file -----------------------------
     with open( OIT_SUBSET_01_OUTPUT_PATH, 'w' ) as f:
-        f.write( heading_line )
-        for line in subset_lines:
+        f.write( oit_subset['heading_line'] )
+        for line in oit_subset['subset_lines']:
             f.write( line )
-        
-    ## end main()
+    return
 
 
 ## helper functions -------------------------------------------------
@@ -27,6 +27,7 @@ sys.path.append( PROJECT_CODE_DIR )
 
 ## additional imports -----------------------------------------------
 from instructor_check_flow import common as instructor_common
+from lib import db_stuff
 from lib.common import query_ocra
 from lib.common import validate_files
 
@@ -47,6 +48,17 @@ log.debug( f'STEP_1p5_OUTPUT_PATH, ``{STEP_1p5_OUTPUT_PATH}``' )
 def main():
     """ Controller.
         Called by if __name__ == '__main__' """
+    oit_subset: dict = load_source()
+    data_holder_dict: dict = process( oit_subset )
+    save( data_holder_dict )
+    return
+
+    ## end def main() 
+
+
+def load_source() -> dict:
+    """ Validates and loads the oit-subset-01 file into the shape step 10's process() returns.
+        Called by main(), and by run_all.py when step 10 was skipped. """
 
     ## validate oit-subset-01 file ----------------------------------
     assert validate_files.is_utf8_encoded(OIT_SUBSET_01_SOURCE_PATH) == True
@@ -56,14 +68,22 @@ def main():
     lines = []
     with open( OIT_SUBSET_01_SOURCE_PATH, 'r' ) as f:
         lines = f.readlines()
+    return { 'heading_line': lines[0], 'subset_lines': lines[1:] }
+
+
+def process( oit_subset: dict ) -> dict:
+    """ Builds the data-holder-dict, adds OCRA email-addresses, and removes entries with no email.
+        Called by main(), and by run_all.py (which passes in step 10's output directly). """
+
+    db_stuff.reset_query_stats()  # so the meta's `query_summary` covers just this step's queries
+    db_stuff.set_query_context( '15' )
 
     ## get heading and data lines -----------------------------------
-    new_subset_lines = []
-    heading_line = lines[0]
+    heading_line = oit_subset['heading_line']
     parts = heading_line.split( '\t' )
     parts = [ part.strip() for part in parts ]
     log.debug( f'parts, ``{pprint.pformat(parts)}``' )
-    data_lines = lines[1:]
+    data_lines = oit_subset['subset_lines']
 
     ## build course_code.course_number dict -------------------------
     data_holder_dict = build_data_holder_dict( data_lines )
@@ -73,13 +93,19 @@ def main():
 
     ## remove entries with no email ---------------------------------
     data_holder_dict = remove_entries_with_no_email( data_holder_dict )
+    data_holder_dict['__meta__']['query_summary'] = db_stuff.get_query_summary()
+    return data_holder_dict
+
+    ## end def process()
 
-    ## write data-holder-dict to file -------------------------------
+
+def save( data_holder_dict: dict ) -> None:
+    """ Writes data-holder-dict to file.
+        Called by main(), and by run_all.py when writing artifacts. """
     with open( STEP_1p5_OUTPUT_PATH, 'w' ) as f:
         jsn = json.dumps( data_holder_dict, sort_keys=True, indent=2 )
         f.write( jsn )
-
-    ## end def main() 
+    return
 
 
 ## helper functions -------------------------------------------------
@@ -150,6 +176,7 @@ def add_emails_to_data_holder_dict( data_holder_dict: dict ) -> dict:
         Called by main() """
     for i, ( course_key, course_parts_dict ) in enumerate( data_holder_dict.items() ):
         log.debug( f'i, ``{i}``; course_key, ``{course_key}``' )
+        db_stuff.set_query_context( '15', course_key )  # for the slow-query log
         # if i >= 10:  # for testing
         #     break
         bru_ids = course_parts_dict['oit_all_instructors']
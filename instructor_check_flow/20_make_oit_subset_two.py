@@ -3,7 +3,7 @@ This script:
 - loads the "oit_data_01b.json" into a data-holder-dict.
 - loads the current "already_in_leganto.tsv".
 - produces a subset of the data-holder-dict -- "oit_subset_02.tsv" -- which will be used to create reading-lists.
-- takes about 1-minute, 30-seconds to run.
+- takes a few seconds to run (the already-in-leganto data is indexed by course-key once, up front).
 
 The logic...
 - If there is an OIT course with OIT-instructor-X -- and that OIT course is not in Leganto -- I _WILL_ try to create an OCRA reading-list.
@@ -14,7 +14,7 @@ Another way of saying this...
 The new subset file will remove courses from the original subset file if the course is already in Leganto with the same instructor.
 """
 
-import datetime, json, logging, os, pprint, sys
+import datetime, json, logging, os, pprint, re, sys
 
 ## setup logging ----------------------------------------------------
 LOG_PATH: str = os.environ['LGNT__LOG_PATH']
@@ -40,6 +40,9 @@ log.debug( f'JSON_DATA_DIR_PATH, ``{JSON_DATA_DIR_PATH}``')
 log.debug( f'ALREADY_IN_LEGANTO_FILEPATH, ``{ALREADY_IN_LEGANTO_FILEPATH}``')
 
 ## constants --------------------------------------------------------
+FIELD_COURSE_KEY_PATTERN = re.compile( r'(?=([a-z]+)[. ]?([0-9][a-z0-9]*))' )  # lookahead, so every dept-suffix is found
+INDEXABLE_DEPT_PATTERN = re.compile( r'[a-z]+' )
+INDEXABLE_NUM_PATTERN = re.compile( r'[0-9][a-z0-9]*' )
 STEP_1p5_SOURCE_PATH = f'{JSON_DATA_DIR_PATH}/oit_data_01b.json'
 STEP_2p0_OUTPUT_PATH = f'{JSON_DATA_DIR_PATH}/oit_data_02.json'
 log.debug( f'STEP_1p5_SOURCE_PATH, ``{STEP_1p5_SOURCE_PATH}``' )
@@ -51,16 +54,32 @@ log.debug( f'STEP_2p0_OUTPUT_PATH, ``{STEP_2p0_OUTPUT_PATH}``' )
 def main():
     """ Controller.
         Called by if __name__ == '__main__' """
+    source_data_holder_dict: dict = load_source()
+    post_instructor_check_data_holder_dict: dict = process( source_data_holder_dict )
+    save( post_instructor_check_data_holder_dict )
+    return
+
+    ## end def main() 
 
-    ## validate already-in-leganto file -----------------------------
-    assert validate_files.is_utf8_encoded( ALREADY_IN_LEGANTO_FILEPATH ) == True
-    # assert validate_files.is_tab_separated( ALREADY_IN_LEGANTO_FILEPATH ) == True  # TODO
-    assert validate_files.already_in_leganto_columns_valid( ALREADY_IN_LEGANTO_FILEPATH ) == True
 
-    ## load "oit_data_01b.json" file --------------------------------
+def load_source() -> dict:
+    """ Loads "oit_data_01b.json" file.
+        Called by main(), and by run_all.py when step 15 was skipped. """
     source_data_holder_dict = {}
     with open( STEP_1p5_SOURCE_PATH, 'r' ) as f:
         source_data_holder_dict = json.loads( f.read() )
+    return source_data_holder_dict
+
+
+def process( source_data_holder_dict: dict ) -> dict:
+    """ Removes courses that are already in Leganto with the same instructor.
+        Does not modify source_data_holder_dict.
+        Called by main(), and by run_all.py (which passes in step 15's output directly). """
+
+    ## validate already-in-leganto file -----------------------------
+    assert validate_files.is_utf8_encoded( ALREADY_IN_LEGANTO_FILEPATH ) == True
+    # assert validate_files.is_tab_separated( ALREADY_IN_LEGANTO_FILEPATH ) == True  # TODO
+    assert validate_files.already_in_leganto_columns_valid( ALREADY_IN_LEGANTO_FILEPATH ) == True
 
     ## initialize _meta_ data ----------------------------------------
     meta = {
@@ -79,6 +98,7 @@ def main():
     already_in_leganto_dict_lines = prep_already_in_leganto_dict_lines( already_in_leganto_lines )
     update_meta_with_already_in_leganto_data( already_in_leganto_dict_lines, meta )
     # log.debug( f'meta, ``{pprint.pformat(meta)}``' )
+    already_in_leganto_index: dict = build_already_in_leganto_index( already_in_leganto_dict_lines )
 
     ## run comparison ------------------------------------------------
     post_instructor_check_data_holder_dict = {}
@@ -94,7 +114,7 @@ def main():
         ## check each OIT email-and-course against leganto data -----
         match_found = False
         for oit_email in oit_email_list:
-            match_found = check_for_match( oit_course_code_key, oit_email, already_in_leganto_dict_lines )
+            match_found = check_for_match_in_index( oit_course_code_key, oit_email, already_in_leganto_index, already_in_leganto_dict_lines )
             if match_found == True:
                 meta['OIT_courses_removed_count'] += 1
                 meta['OIT_courses_removed_list'].append( oit_course_code_key )
@@ -111,12 +131,17 @@ def main():
     meta['number_of_courses_below'] = len( post_instructor_check_data_holder_dict.keys() )  # no need to exclude `__meta__`, because it hasn't been added yet
     post_instructor_check_data_holder_dict['__meta__'] = meta
     log.debug( f'post_instructor_check_data_holder_dict, ``{pprint.pformat(post_instructor_check_data_holder_dict)}``' )
+    return post_instructor_check_data_holder_dict
 
-    ## save "oit_data_02.json" file ----------------------------------
+    ## end def process()
+
+
+def save( post_instructor_check_data_holder_dict: dict ) -> None:
+    """ Saves "oit_data_02.json" file.
+        Called by main(), and by run_all.py when writing artifacts. """
     with open( STEP_2p0_OUTPUT_PATH, 'w' ) as f:
         f.write( json.dumps( post_instructor_check_data_holder_dict, sort_keys=True, indent=2 ) )
-
-    ## end def main() 
+    return
 
 
 ## helper functions -------------------------------------------------
@@ -193,9 +218,47 @@ def update_meta_with_already_in_leganto_data( already_in_leganto_dict_lines: lis
     # log.debug( f'meta, ``{pprint.pformat(meta)}``' )
 
 
+def build_already_in_leganto_index( already_in_leganto_dict_lines: list ) -> dict:
+    """ Returns dict of normalized course-key to set-of-lowercased-emails, like:
+            { 'afri.0090': {'first_last@brown.edu'}, etc... }
+        A key is recorded for every `dept.num`, `dept num`, or `deptnum` substring of the `Reading List Code`, 
+            `Reading List Name`, and `Course Code` fields -- including the shorter dept-suffix and num-prefix variants 
+            a substring-check would also hit (eg `brown.anth.0066x` yields `anth.0066`, `nth.0066x`, etc.) -- 
+            so a lookup gives the same answer as check_for_match()'s substring probes.
+        Called by main(). """
+    already_in_leganto_index = {}
+    for leganto_item in already_in_leganto_dict_lines:
+        lowercase_emails: set = { email.lower() for email in leganto_item['email_list'] }
+        for field in ( leganto_item['Reading List Code'], leganto_item['Reading List Name'], leganto_item['Course Code'] ):
+            for match in FIELD_COURSE_KEY_PATTERN.finditer( field ):
+                ( dept_part, num_run ) = ( match.group(1), match.group(2) )
+                for end_position in range( 1, len(num_run) + 1 ):
+                    course_key = f'{dept_part}.{num_run[0:end_position]}'
+                    already_in_leganto_index.setdefault( course_key, set() ).update( lowercase_emails )
+    log.debug( f'len(already_in_leganto_index), ``{len(already_in_leganto_index)}``' )
+    return already_in_leganto_index
+
+
+def check_for_match_in_index( oit_course_code_key, oit_email, already_in_leganto_index, already_in_leganto_dict_lines ):
+    """ Returns True if match found, else False -- same result as check_for_match(), via a hash-lookup.
+        Course-keys the index can't represent (non-letter dept, or number not starting with a digit) fall back to check_for_match().
+        Called by main(). """
+    key_parts = oit_course_code_key.split( '.' )
+    dept_part = key_parts[0]
+    num_part = key_parts[1]
+    if not ( INDEXABLE_DEPT_PATTERN.fullmatch(dept_part) and INDEXABLE_NUM_PATTERN.fullmatch(num_part) ):
+        log.debug( f'course-key, ``{oit_course_code_key}`` not indexable; using full scan' )
+        return check_for_match( oit_course_code_key, oit_email, already_in_leganto_dict_lines )
+    leganto_lowercase_email_addresses: set = already_in_leganto_index.get( f'{dept_part}.{num_part}', set() )
+    course_code_and_instructor_match_found_result = oit_email.lower() in leganto_lowercase_email_addresses
+    log.debug( f'course_code_and_instructor_match_found_result for, ``{dept_part}/{num_part}``, ``{course_code_and_instructor_match_found_result}``' )
+    return course_code_and_instructor_match_found_result
+
+
 def check_for_match( oit_course_code_key, oit_email, already_in_leganto_dict_lines ):
     """ Returns True if match found, else False.
-        Called by main(). """
+        Full-scan version; the reference for check_for_match_in_index().
+        Called by check_for_match_in_index(). """
     # log.debug( f'param oit_course_code_key, ``{oit_course_code_key}``' )
     # log.debug( f'param oit_email, ``{oit_email}``' )
     # log.debug( f'param already_in_leganto_dict_lines, ``{pprint.pformat(already_in_leganto_dict_lines)}``' )
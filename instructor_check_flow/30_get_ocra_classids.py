@@ -4,6 +4,7 @@
 - It adds one element to the data-holder-dict: a list of "ocra_class_ids" for the given course-code.
     - These ocra_class_ids will be used in the subsequent script to extract reading-list data.
 - Takes about 7-minutes to run.
+- Checkpoints each course's class_ids to "json_data/oit_data_03.json.journal.jsonl"; if the run fails partway, re-running resumes from there.
 """
 
 import datetime, json, logging, os, pprint, sys
@@ -23,6 +24,8 @@ PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
 sys.path.append( PROJECT_CODE_DIR )
 
 ## additional imports -----------------------------------------------
+from lib import db_stuff
+from lib.common.checkpoint_journal import Checkpoint_Journal, make_source_fingerprint
 from lib.common.query_ocra import get_class_id_entries
 # from lib.common.validate_files import is_utf8_encoded, is_tab_separated, columns_are_valid
 
@@ -33,6 +36,7 @@ log.debug( f'JSON_DATA_DIR_PATH, ``{JSON_DATA_DIR_PATH}``' )
 ## constants --------------------------------------------------------
 JSON_DATA_SOURCE_PATH = f'{JSON_DATA_DIR_PATH}/oit_data_02.json'
 JSON_DATA_OUTPUT_PATH = f'{JSON_DATA_DIR_PATH}/oit_data_03.json'
+JOURNAL_PATH = f'{JSON_DATA_OUTPUT_PATH}.journal.jsonl'  # checkpoints; removed when the step finishes
 log.debug( f'JSON_DATA_SOURCE_PATH, ``{JSON_DATA_SOURCE_PATH}``' )
 log.debug( f'JSON_DATA_OUTPUT_PATH, ``{JSON_DATA_OUTPUT_PATH}``' )
 
@@ -41,11 +45,28 @@ log.debug( f'JSON_DATA_OUTPUT_PATH, ``{JSON_DATA_OUTPUT_PATH}``' )
 def main():
     """ Controller.
         Called by if __name__ == '__main__' """
-    
-    ## load source file ---------------------------------------------
+    data_holder_dict: dict = load_source()
+    updated_data_holder_dict: dict = process( data_holder_dict )
+    save( updated_data_holder_dict )
+    return
+
+    ## end main()
+
+
+def load_source() -> dict:
+    """ Loads source file.
+        Called by main(), and by run_all.py when step 20 was skipped. """
     data_holder_dict = {}
     with open( JSON_DATA_SOURCE_PATH, 'r' ) as f:
         data_holder_dict = json.loads( f.read() )
+    return data_holder_dict
+
+
+def process( data_holder_dict: dict ) -> dict:
+    """ Adds `ocra_class_ids` to each course, and removes courses with no class_ids.
+        Returns a new dict (with copied course-entries), so the incoming data_holder_dict is not modified.
+        Each course's class_ids are checkpointed, so a re-run after a failure resumes where it left off.
+        Called by main(), and by run_all.py (which passes in step 20's output directly). """
 
     ## initialize meta ----------------------------------------------
     meta = {
@@ -56,45 +77,58 @@ def main():
         'oit_courses_removed_count': 0,
         'oit_courses_removed_list': [],
         }
+    db_stuff.reset_query_stats()  # so the meta's `query_summary` covers just this step's queries
+    db_stuff.set_query_context( '30' )
     ## get class_ids from ocra --------------------------------------
-    for ( i, (course_key, course_data_dict) ) in enumerate( data_holder_dict.items() ):
-        log.debug( f'processing course_key, ``{course_key}``')
-        if course_key == '__meta__':
-            continue
-        # log.debug( f'i, ``{i}``')
-        # log.debug( f'course_key, ``{course_key}``' )
-        # log.debug( f'course_data_dict, ``{pprint.pformat(course_data_dict)}``' )
-        course_code = course_key.split( '.' )[0]
-        course_number = course_key.split( '.' )[1]
-        class_ids: list = get_class_id_entries( course_code, course_number )
-        class_ids.sort()
-        ## update data_holder_dict with class_ids -------------------
-        data_holder_dict[course_key]['ocra_class_ids'] = class_ids
-        ## update meta-counts ---------------------------------------
-        if len(class_ids) == 0:
-            log.debug( f'course_key, ``{course_key}`` has no class_ids' )
-            meta['oit_courses_removed_count'] += 1
-            meta['oit_courses_removed_list'].append( course_key )
-        # if i > 2:
-        #     break
-
-    ## remove OIT courses that have no class_ids --------------------
-    for course_key in meta['oit_courses_removed_list']:
-        del data_holder_dict[course_key]
-    meta['number_of_courses_below'] = len( data_holder_dict.items() ) - 1  # -1 for the '__meta__' entry
+    updated_data_holder_dict = {}
+    with Checkpoint_Journal( JOURNAL_PATH, make_source_fingerprint(data_holder_dict) ) as journal:
+        for ( i, (course_key, course_data_dict) ) in enumerate( data_holder_dict.items() ):
+            log.debug( f'processing course_key, ``{course_key}``')
+            if course_key == '__meta__':
+                continue
+            # log.debug( f'i, ``{i}``')
+            # log.debug( f'course_key, ``{course_key}``' )
+            # log.debug( f'course_data_dict, ``{pprint.pformat(course_data_dict)}``' )
+            if journal.has( course_key ):
+                class_ids: list = journal.get( course_key )  # done by a previous, interrupted, run
+            else:
+                course_code = course_key.split( '.' )[0]
+                course_number = course_key.split( '.' )[1]
+                db_stuff.set_query_context( '30', course_key )  # for the slow-query log
+                class_ids: list = get_class_id_entries( course_code, course_number )
+                class_ids.sort()
+                journal.append( course_key, class_ids )
+            ## update meta-counts -----------------------------------
+            if len(class_ids) == 0:
+                log.debug( f'course_key, ``{course_key}`` has no class_ids' )
+                meta['oit_courses_removed_count'] += 1
+                meta['oit_courses_removed_list'].append( course_key )
+                continue
+            ## add course, with class_ids, to updated data-holder ---
+            updated_course_data_dict = dict( course_data_dict )
+            updated_course_data_dict['ocra_class_ids'] = class_ids
+            updated_data_holder_dict[course_key] = updated_course_data_dict
+            # if i > 2:
+            #     break
+        journal.finish()
+    meta['number_of_courses_below'] = len( updated_data_holder_dict.items() )  # meta hasn't been added yet
 
     ## update meta --------------------------------------------------
-    data_holder_dict['__meta__'] = meta
+    meta['query_summary'] = db_stuff.get_query_summary()
+    updated_data_holder_dict['__meta__'] = meta
+    return updated_data_holder_dict
+
+    ## end process()
+
 
-    ## save class_ids data ------------------------------------------
+def save( data_holder_dict: dict ) -> None:
+    """ Saves class_ids data.
+        Called by main(), and by run_all.py when writing artifacts. """
     with open( JSON_DATA_OUTPUT_PATH, 'w' ) as f:
         jsn = json.dumps( data_holder_dict, sort_keys=True, indent=2 )
         f.write( jsn )
-
     return
 
-    ## end main()
-
 
 if __name__ == '__main__':
     main()
@@ -23,6 +23,7 @@ PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
 sys.path.append( PROJECT_CODE_DIR )
 
 ## additional imports -----------------------------------------------
+from lib import db_stuff
 from lib.common import query_ocra 
 
 ## grab env vars ----------------------------------------------------
@@ -41,11 +42,30 @@ log.debug( f'JSON_DATA_OUTPUT_PATH, ``{JSON_DATA_OUTPUT_PATH}``' )
 def main():
     """ Controller.
         Called by if __name__ == '__main__' """
-    
-    ## load source file ---------------------------------------------
+    source_data_holder_dict: dict = load_source()
+    filtered_data_holder_dict: dict = process( source_data_holder_dict )
+    save( filtered_data_holder_dict )
+    return
+
+    ## end main()
+
+
+def load_source() -> dict:
+    """ Loads source file.
+        Called by main(), and by run_all.py when step 30 was skipped. """
     data_holder_dict = {}
     with open( JSON_DATA_SOURCE_PATH, 'r' ) as f:
         data_holder_dict = json.loads( f.read() )
+    return data_holder_dict
+
+
+def process( source_data_holder_dict: dict ) -> dict:
+    """ Adds OCRA instructor-emails to each course, and removes courses with no OIT/OCRA instructor match.
+        Works on copies of the course-entries, so the incoming source_data_holder_dict is not modified.
+        Called by main(), and by run_all.py (which passes in step 30's output directly). """
+    data_holder_dict = {}
+    for ( course_key, course_data_dict ) in source_data_holder_dict.items():
+        data_holder_dict[course_key] = course_data_dict if course_key == '__meta__' else dict( course_data_dict )
 
     ## initialize meta ----------------------------------------------
     meta = {
@@ -56,6 +76,8 @@ def main():
         'oit_courses_removed_count': 0,
         'oit_courses_removed_list': [],  # make this list like { course_key: {'oit_instructors': [], 'ocra_instructors': []}, etc... }
         }
+    db_stuff.reset_query_stats()  # so the meta's `query_summary` covers just this step's queries
+    db_stuff.set_query_context( '35' )
     
     ## get instructor-emails from ocra ------------------------------
     for ( i, (course_key, course_data_dict) ) in enumerate( data_holder_dict.items() ):
@@ -65,6 +87,7 @@ def main():
         # log.debug( f'course_data_dict, ``{pprint.pformat(course_data_dict)}``' )
         if course_key == '__meta__':
             continue
+        db_stuff.set_query_context( '35', course_key )  # for the slow-query log
         ## get oit email addresses ----------------------------------
         oit_email_addresses = course_data_dict['oit_email_addresses']
         oit_email_addresses = [ email.strip().lower() for email in course_data_dict['oit_email_addresses'] ]
@@ -115,17 +138,21 @@ def main():
     ## update meta --------------------------------------------------
     meta['number_of_courses_originally'] = len( data_holder_dict.items() ) - 1  # -1 for the '__meta__' entry
     meta['number_of_courses_below'] = len( filtered_data_holder_dict.items() )  # meta hasn't been added yet
+    meta['query_summary'] = db_stuff.get_query_summary()
     filtered_data_holder_dict['__meta__'] = meta
+    return filtered_data_holder_dict
+
+    ## end process()
+
 
-    ## save class_ids data ------------------------------------------
+def save( filtered_data_holder_dict: dict ) -> None:
+    """ Saves instructor-email data.
+        Called by main(), and by run_all.py when writing artifacts. """
     with open( JSON_DATA_OUTPUT_PATH, 'w' ) as f:
         jsn = json.dumps( filtered_data_holder_dict, sort_keys=True, indent=2 )
         f.write( jsn )
-
     return
 
-    ## end main()
-
 
 if __name__ == '__main__':
     main()
@@ -4,9 +4,14 @@
 - Data is prepared from the OCRA data, with some additional lookups.
     - TODO: Define the addtional lookups.
 - Takes a little less than 5 minutes to run.
+- `--jobs N` maps courses across N worker-processes; output is identical to the default serial run.
+- `--shard-by department` and/or `--max-rows N` split the output into multiple tsv files (never splitting a course), plus a manifest.
+- `--delta` writes only rows that are new or changed since the previous `--delta` run, plus a list of removed rows; see lib/delta_export.py.
+
+Usage: % python ./instructor_check_flow/50_create_reading_lists.py [--jobs 4] [--shard-by department] [--max-rows 5000] [--delta]
 """
 
-import datetime, json, logging, os, pprint, sys
+import argparse, json, logging, multiprocessing, os, pprint, sys
 
 ## setup logging ----------------------------------------------------
 LOG_PATH: str = os.environ['LGNT__LOG_PATH']
@@ -23,10 +28,12 @@ PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
 sys.path.append( PROJECT_CODE_DIR )
 
 ## additional imports -----------------------------------------------
+from lib import citation_pipeline
 from lib import csv_maker
+from lib import db_stuff
+from lib import delta_export
 from lib import leganto_final_processor
 from lib import loaders
-from lib import readings_processor
 from lib.cdl import CDL_Checker
 
 ## grab env vars ----------------------------------------------------
@@ -37,34 +44,54 @@ log.debug( f'CSV_DATA_DIR_PATH, ``{CSV_DATA_DIR_PATH}``' )
 
 ## globals ----------------------------------------------------------
 JSON_DATA_SOURCE_PATH = f'{JSON_DATA_DIR_PATH}/oit_data_04.json'
-datetimestamp = datetime.datetime.now().isoformat().replace( ':', '-' )[0:2]  # two decimal places is enough
-TSV_DATA_OUTPUT_PATH = f'{CSV_DATA_DIR_PATH}/2024_spring/list_{datetimestamp}.tsv'
 log.debug( f'JSON_DATA_SOURCE_PATH, ``{JSON_DATA_SOURCE_PATH}``' )
-log.debug( f'TSV_DATA_OUTPUT_PATH, ``{TSV_DATA_OUTPUT_PATH}``' )
+WORKER_STATE: dict = {}  # read-only reference data for `--jobs` workers; set before the pool forks, so it's inherited rather than pickled
 
 
 ## controller -------------------------------------------------------
 
-def main():
+def main( jobs: int = 1, shard_by: str = '', max_rows: int = 0, delta: bool = False ):
     """ Controller.
         Called by if __name__ == '__main__' """
+    data_holder_dict: dict = load_source()
+    process( data_holder_dict, jobs, shard_by, max_rows, delta )
+    return
+
+    ## end main()
+
+
+def load_source() -> dict:
+    """ Loads source file.
+        Called by main(), and by run_all.py when step 40 was skipped. """
+    data_holder_dict = {}
+    with open( JSON_DATA_SOURCE_PATH, 'r' ) as f:
+        data_holder_dict = json.loads( f.read() )
+    return data_holder_dict
+
+
+def process( data_holder_dict: dict, jobs: int = 1, shard_by: str = '', max_rows: int = 0, delta: bool = False ) -> None:
+    """ Maps each course's ocra data to leganto rows, and writes the reading-list tsv.
+        (The tsv is this step's product, so unlike the earlier steps there is no separate save().)
+        With jobs > 1, courses are mapped in a process-pool; rows are merged back in course order.
+        With shard_by ('department' or 'rows') the output is split into multiple tsvs; see csv_maker.create_sharded_csvs().
+        With delta, only new or changed rows are written; see delta_export.Delta_Exporter.
+        Called by main(), and by run_all.py (which passes in step 40's output directly). """
     
+    if shard_by and delta:
+        raise Exception( 'sharded output and delta output can\'t be combined' )
+    db_stuff.reset_query_stats()  # the step writes no json, so its query-summary is only logged
+    db_stuff.set_query_context( '50' )
     ## settings -----------------------------------------------------
     settings: dict = load_initial_settings()
     ## load/prep necessary data -------------------------------------
     err: dict = loaders.rebuild_pdf_data_if_necessary( {'days': settings["PDF_OLDER_THAN_DAYS"]} )
     if err:
         raise Exception( f'problem rebuilding pdf-json, error-logged, ``{err["err"]}``' )  
-    
-    ## load source file ---------------------------------------------
-    data_holder_dict = {}
-    with open( JSON_DATA_SOURCE_PATH, 'r' ) as f:
-        data_holder_dict = json.loads( f.read() )
 
     ## initialize meta ----------------------------------------------
     # meta = {
     #     'datetime_stamp': datetime.datetime.now().isoformat(),
-    #     'description': f'Starts with "oit_data_04.json". Produces "{TSV_DATA_OUTPUT_PATH}" file. Defines necessary leganto fields and assembles the data. Then writes it to a .tsv file.',
+    #     'description': f'Starts with "oit_data_04.json". Produces a file in the term-directory (csv_maker.get_term_dir_path()). Defines necessary leganto fields and assembles the data. Then writes it to a .tsv file.',
     #     'number_of_courses_in_reading_list_file': len( data_holder_dict ) - 1, # -1 for meta
     #     'number_of_courses_below': 0,
     #     }
@@ -76,77 +103,29 @@ def main():
     #     leganto_dict_template[field] = ''
     
     ## process courses ----------------------------------------------
-    all_courses_enhanced_data = []
-    for ( i, (course_key, course_data_val) ) in enumerate( data_holder_dict.items() ):
-        if course_key == '__meta__':
-            continue
-        log.debug( f'processing course_key, ``{course_key}``')
-        log.debug( f'processing course_data_val, ``{pprint.pformat(course_data_val)}``')
-
-        ## get ocra data --------------------------------------------
-        ocra_course_data: dict = course_data_val['ocra_course_data']  # { 'class_id_1234': {'articles': [], 'audios': [], etc...}, 'class_id_2468': {'articles': [], 'audios': [], etc...} }
-        log.debug( f'ocra_course_data, ``{pprint.pformat(ocra_course_data)}``' )
-
-        ## combine all same-formats ---------------------------------  # cuz there could be multiple class_id results for a course
-        combined_course_data_dict = combine_course_data( ocra_course_data )
-        
-        ## prepare data for enhancements ----------------------------
-        course_id = f'%s%s' % ( course_key.split('.')[0].upper(), course_key.split('.')[1].upper )  # e.g., 'ENGL1234'
-        oit_course_id = course_data_val['oit_course_id']
-        cdl_checker = CDL_Checker()
-        oit_section_id = 'S01'
-        oit_title = course_data_val['oit_course_title']
-
-        ## enhance articles -----------------------------------------
-        combined_articles = combined_course_data_dict['ocra_articles']
-        enhanced_articles = readings_processor.map_articles( combined_articles, course_id, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## enhance audios -------------------------------------------
-        combined_audios = combined_course_data_dict['ocra_audios']
-        enhanced_audios: list = readings_processor.map_audio_files( combined_audios, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## enhance books --------------------------------------------
-        combined_books = combined_course_data_dict['ocra_books']
-        enhanced_books: list = readings_processor.map_books( combined_books, oit_course_id, oit_section_id, oit_title, cdl_checker )
-
-        ## enhance ebooks -------------------------------------------
-        combined_ebooks = combined_course_data_dict['ocra_ebooks']
-        enhanced_ebooks: list = readings_processor.map_ebooks( combined_ebooks, course_id, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## enhance excerpts -----------------------------------------
-        combined_excerpts = combined_course_data_dict['ocra_excerpts']
-        enhanced_excerpts: list = readings_processor.map_excerpts( combined_excerpts, course_id, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## enhance tracks -------------------------------------------
-        combined_tracks = combined_course_data_dict['ocra_tracks']
-        enhanced_tracks: list = readings_processor.map_tracks( combined_tracks, course_id, oit_course_id, oit_section_id, oit_title )
-
-        ## enhance videos -------------------------------------------
-        combined_videos = combined_course_data_dict['ocra_videos']
-        enhanced_videos: list = readings_processor.map_videos( combined_videos, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## enhance websites -----------------------------------------
-        combined_websites = combined_course_data_dict['ocra_websites']
-        enhanced_websites: list = readings_processor.map_websites( combined_websites, course_id, oit_course_id, cdl_checker, oit_section_id, oit_title, settings )
-
-        ## combine data ---------------------------------------------
-        course_enhanced_data: list = enhanced_articles + enhanced_audios + enhanced_books + enhanced_ebooks + enhanced_excerpts + enhanced_tracks + enhanced_videos + enhanced_websites
-        all_courses_enhanced_data = all_courses_enhanced_data + course_enhanced_data
-
-        # if i > 2:
-        #     break
-
-        # end for-course loop...
-
-    ## apply final leganto processing -------------------------------
-    leganto_data: list = prep_leganto_data( all_courses_enhanced_data, settings )
-
-    ## save ---------------------------------------------------------
-    csv_maker.create_csv( leganto_data, leganto_final_processor.get_headers() )
-
+    cdl_checker = CDL_Checker()  # shared by all courses, so the cdl-titles are loaded once
+    if jobs > 1:
+        course_rows = iter_courses_in_pool( data_holder_dict, cdl_checker, settings, jobs )
+    else:
+        course_rows = iter_course_rows( data_holder_dict, cdl_checker, settings )  # generator; one course at a time
+
+    ## save, writing rows as each course finishes -------------------
+    headers: list = leganto_final_processor.get_headers()
+    if shard_by:
+        csv_maker.create_sharded_csvs( course_rows, headers, shard_by, max_rows )
+    elif delta:
+        with delta_export.Delta_Exporter( headers ) as exporter:
+            for ( _course_key, course_leganto_rows ) in course_rows:
+                exporter.write_rows( course_leganto_rows )
+    else:
+        with csv_maker.Streaming_TSV_Writer( headers ) as writer:
+            for ( _course_key, course_leganto_rows ) in course_rows:
+                writer.write_rows( course_leganto_rows )
+
+    db_stuff.get_query_summary()  # logs it; with jobs > 1, the workers' queries are merged in by iter_courses_in_pool()
     return
 
-    ## end main()
+    ## end process()
 
 
 ## helper functions ---------------------------------------------
@@ -175,86 +154,69 @@ def load_initial_settings() -> dict:
     return settings
 
 
-def combine_course_data( ocra_course_data ) -> dict:
-    combined_articles = []
-    combined_audios = []
-    combined_books = []
-    combined_ebooks = []
-    combined_excerpts = []
-    combined_tracks = []
-    combined_videos = []
-    combined_websites = []
-    for class_id_key, results_dict_val in ocra_course_data.items():
-        log.debug( f'class_id_key, ``{class_id_key}``' )
-        log.debug( f'results_dict_val, ``{pprint.pformat(results_dict_val)}``' )
-        combined_articles += results_dict_val['article_results']
-        combined_audios += results_dict_val['audio_results']
-        combined_books += results_dict_val['book_results']
-        combined_ebooks += results_dict_val['ebook_results']
-        combined_excerpts += results_dict_val['excerpt_results']
-        combined_tracks += results_dict_val['tracks_results']
-        combined_videos += results_dict_val['video_results']
-        combined_websites += results_dict_val['website_results']
-    course_data_dict = {
-        'ocra_articles': combined_articles,
-        'ocra_audios': combined_audios,
-        'ocra_books': combined_books,
-        'ocra_ebooks': combined_ebooks,
-        'ocra_excerpts': combined_excerpts,
-        'ocra_tracks': combined_tracks,
-        'ocra_videos': combined_videos,
-        'ocra_websites': combined_websites,
-        }
-    log.debug( f'course_data_dict, ``{pprint.pformat(course_data_dict)}``' )
-    return course_data_dict
-
-
-def prep_leganto_data( basic_data: list, settings: dict ) -> list:
-    """ Enhances basic data for CSV-files. 
-        Called by main() """
+def iter_course_rows( data_holder_dict: dict, cdl_checker, settings: dict ):
+    """ Yields ( course_key, generator of the course's leganto rows ), in course order; see lib/citation_pipeline.py.
+        Called by process() """
+    yield from citation_pipeline.iter_term_leganto_rows( data_holder_dict, cdl_checker, settings )
+
+
+def map_courses_in_pool( data_holder_dict: dict, cdl_checker, settings: dict, jobs: int ) -> list:
+    """ Returns all courses' leganto rows, from iter_courses_in_pool().
+        Called by tests """
     leganto_data: list = []
-    for entry in basic_data:
-        log.debug( f'result-dict-entry, ``{pprint.pformat(entry)}``' )
-        result: dict = entry
-        row_dict = {}
-        headers: list = leganto_final_processor.get_headers()
-        for entry in headers:
-            header: str = entry
-            row_dict[header] = ''
-        log.debug( f'default row_dict, ``{pprint.pformat(row_dict)}``' )
-        course_code_found: bool = False if 'oit_course_code_not_found' in result['coursecode'] else True
-        row_dict['citation_author'] = leganto_final_processor.clean_citation_author( result['citation_author'] ) 
-        row_dict['citation_doi'] = result['citation_doi']
-        row_dict['citation_end_page'] = result['citation_end_page']
-        row_dict['citation_isbn'] = result['citation_isbn']
-        row_dict['citation_issn'] = result['citation_issn']
-        row_dict['citation_issue'] = result['citation_issue']
-        row_dict['citation_journal_title'] = result['citation_journal_title']
-        row_dict['citation_publication_date'] = result['citation_publication_date']
-        row_dict['citation_public_note'] = 'Please contact rock-reserves@brown.edu if you have problem accessing the course-reserves material.' if result['external_system_id'] else ''
-        row_dict['citation_secondary_type'] = leganto_final_processor.calculate_leganto_type( result['citation_secondary_type'] )
-        row_dict['citation_source'] = leganto_final_processor.calculate_leganto_citation_source( result )
-        row_dict['citation_start_page'] = result['citation_start_page']
-        row_dict['citation_status'] = 'BeingPrepared' if result['external_system_id'] else ''
-        row_dict['citation_title'] = leganto_final_processor.clean_citation_title( result['citation_title'] )
-        row_dict['citation_volume'] = result['citation_volume']
-        row_dict['coursecode'] = leganto_final_processor.calculate_leganto_course_code( result['coursecode'] )
-        row_dict['reading_list_code'] = row_dict['coursecode'] if result['external_system_id'] else ''
-        # row_dict['citation_library_note'] = leganto_final_processor.calculate_leganto_staff_note( result['citation_source1'], result['citation_source2'], result['citation_source3'], result['external_system_id'] )
-        row_dict['citation_library_note'] = leganto_final_processor.calculate_leganto_staff_note( result['citation_source1'], result['citation_source2'], result['citation_source3'], result['external_system_id'], result.get('citation_library_note', '') )
-        if row_dict['citation_library_note'] == 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND':
-            result['external_system_id'] = 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND'  # so this will appear in the staff spreadsheet
-        row_dict['reading_list_name'] = result['reading_list_name'] if result['external_system_id'] else ''
-        row_dict['reading_list_status'] = 'BeingPrepared' if result['external_system_id'] else ''
-        row_dict['section_id'] = result['section_id']
-        row_dict['section_name'] = 'Resources' if result['external_system_id'] else ''
-        row_dict['visibility'] = 'RESTRICTED' if result['external_system_id'] else ''
-        log.debug( f'updated row_dict, ``{pprint.pformat(row_dict)}``' )
-        leganto_data.append( row_dict )
-    log.debug( f'leganto_data, ``{pprint.pformat(leganto_data)}``' )
+    for ( _course_key, course_leganto_rows ) in iter_courses_in_pool( data_holder_dict, cdl_checker, settings, jobs ):
+        leganto_data.extend( course_leganto_rows )
     return leganto_data
 
 
+def iter_courses_in_pool( data_holder_dict: dict, cdl_checker, settings: dict, jobs: int ):
+    """ Maps and leganto-preps courses across a fork-started process-pool; yields ( course_key, course's leganto rows ), in course order.
+        Workers inherit the data and reference-data (pdf-data, cdl-titles) at fork, so only course-keys, row-lists, and query-stats are pickled.
+        Each course's worker query-stats are merged into this process's db_stuff.QUERY_STATS, so the step's query-summary covers them.
+        imap() keeps results in course order, so output matches the serial run.
+        Called by process() """
+    if not cdl_checker.CDL_TITLES:
+        cdl_checker.CDL_TITLES = cdl_checker.populate_cdl_titles()  # load once, before forking, instead of once per worker
+    WORKER_STATE['data_holder_dict'] = data_holder_dict
+    WORKER_STATE['cdl_checker'] = cdl_checker
+    WORKER_STATE['settings'] = settings
+    course_keys: list = [ course_key for course_key in data_holder_dict.keys() if course_key != '__meta__' ]
+    log.debug( f'mapping ``{len(course_keys)}`` courses with ``{jobs}`` jobs' )
+    try:
+        with multiprocessing.get_context( 'fork' ).Pool( jobs ) as pool:
+            for ( course_key, ( course_leganto_rows, query_stats ) ) in zip( course_keys, pool.imap(map_course_in_worker, course_keys) ):
+                db_stuff.merge_query_stats( query_stats )
+                yield ( course_key, course_leganto_rows )
+    finally:
+        WORKER_STATE.clear()
+    return
+
+
+def map_course_in_worker( course_key: str ) -> tuple:
+    """ Returns ( one course's leganto rows, as a list; the query-stats of the course's queries ), to send back to the parent; uses the fork-inherited WORKER_STATE.
+        The worker's QUERY_STATS are reset first, so stats inherited at fork, or from the worker's previous course, aren't sent again.
+        Called (in a worker-process) by iter_courses_in_pool() """
+    db_stuff.reset_query_stats()
+    course_rows = citation_pipeline.iter_course_leganto_rows( course_key, WORKER_STATE['data_holder_dict'][course_key], WORKER_STATE['cdl_checker'], WORKER_STATE['settings'] )
+    return ( list(course_rows), dict(db_stuff.QUERY_STATS) )
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='creates the reading-list tsv from oit_data_04.json' )
+    parser.add_argument( '--jobs', type=int, default=1, help='number of worker-processes for mapping courses; default 1 (serial)' )
+    parser.add_argument( '--shard-by', choices=['department', 'rows'], default='', help='split output into one tsv per department, or by row-count (requires --max-rows)' )
+    parser.add_argument( '--max-rows', type=int, default=0, help='maximum rows per output file; a course is never split' )
+    parser.add_argument( '--delta', action='store_true', help='write only rows new or changed since the previous --delta run, plus a removed-rows list' )
+    args: dict = vars( parser.parse_args() )
+    log.debug( f'args, ``{args}``' )
+    return args
+
+
 if __name__ == '__main__':
-    main()
+    args: dict = parse_args()
+    if args['max_rows'] and not args['shard_by']:
+        args['shard_by'] = 'rows'
+    main( args['jobs'], args['shard_by'], args['max_rows'], args['delta'] )
     sys.exit()
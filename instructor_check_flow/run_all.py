@@ -0,0 +1,195 @@
+"""
+Runs the instructor-check steps (10 through 50) in a single process.
+
+- Each step's data-holder-dict is passed straight to the next step's process(), so the intermediate json files are not re-read.
+  It's first rebuilt in the form the next step's load_source() would read back from the artifact (keys sorted, as save() writes them),
+  so the output is the same as running the step-scripts one by one, whichever steps were skipped.
+- Each step's json artifact is still written (for auditing) by that step's save(), on a background thread, unless `--no-artifacts` is passed.
+- `--start-at` begins at a later step, loading that step's source file from the previous run's artifact.
+- A step is skipped (like a make target) when its input-fingerprint matches the one recorded next to its artifact;
+  the fingerprint covers the step's code, the previous step's fingerprint, its input-files, and its settings. `--force` re-runs everything.
+
+Usage:
+    % python ./instructor_check_flow/run_all.py
+    % python ./instructor_check_flow/run_all.py --start-at 30
+    % python ./instructor_check_flow/run_all.py --no-artifacts
+    % python ./instructor_check_flow/run_all.py --force
+    % python ./instructor_check_flow/run_all.py --jobs 4  (passed to step 50)
+"""
+
+import argparse, concurrent.futures, datetime, importlib, logging, os, sys
+
+## setup logging ----------------------------------------------------
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+log.debug( 'logging ready' )
+
+## update sys.path for project imports  -----------------------------
+PROJECT_CODE_DIR = os.environ['LGNT__PROJECT_CODE_DIR']
+sys.path.append( PROJECT_CODE_DIR )
+sys.path.append( f'{PROJECT_CODE_DIR}/instructor_check_flow' )  # step-scripts start with a digit, so they're imported via importlib
+
+## additional imports -----------------------------------------------
+from lib.common import stage_cache
+
+## constants --------------------------------------------------------
+DB_SETTING_ENVARS: list = [ 'LGNT__DB_HOST', 'LGNT__DB_DATABASE_NAME', 'LGNT__DB_BACKEND', 'LGNT__SQLITE_MIRROR_PATH', 'LGNT__FAKE_OCRA_PATH' ]
+STEPS: list = [  # in run order; each step's fingerprinted code (its module and the shared project-code) is listed by get_code_paths()
+    ## `artifact_attr` names the step-module constant for the file the next step's load_source() reads
+    { 'number': '10', 'module': '10_prepare_oit_initial_subset', 'artifact_attr': 'OIT_SUBSET_01_OUTPUT_PATH',
+        'input_file_envars': [ 'LGNT__COURSES_FILEPATH' ], 'setting_envars': [ 'LGNT__SEASON', 'LGNT__YEAR', 'LGNT__LEGIT_SECTIONS_JSON' ] },
+    { 'number': '15', 'module': '15_make_oit_subset_two', 'artifact_attr': 'STEP_1p5_OUTPUT_PATH',
+        'input_file_envars': [], 'setting_envars': DB_SETTING_ENVARS },
+    { 'number': '20', 'module': '20_make_oit_subset_two', 'artifact_attr': 'STEP_2p0_OUTPUT_PATH',
+        'input_file_envars': [ 'LGNT__ALREADY_IN_LEGANTO_FILEPATH' ], 'setting_envars': [] },
+    { 'number': '30', 'module': '30_get_ocra_classids', 'artifact_attr': 'JSON_DATA_OUTPUT_PATH',
+        'input_file_envars': [], 'setting_envars': DB_SETTING_ENVARS },
+    { 'number': '35', 'module': '35_get_ocra_instructor_emails', 'artifact_attr': 'JSON_DATA_OUTPUT_PATH',
+        'input_file_envars': [], 'setting_envars': DB_SETTING_ENVARS },
+    { 'number': '40', 'module': '40_gather_reading_list_data', 'artifact_attr': 'JSON_DATA_OUTPUT_PATH',
+        'input_file_envars': [], 'setting_envars': DB_SETTING_ENVARS },
+    { 'number': '50', 'module': '50_create_reading_lists', 'artifact_attr': None,  # step 50 writes its tsv inside process(); it's always run
+        'input_file_envars': [], 'setting_envars': [] },
+    ]
+LAST_STEP_NUMBER: str = STEPS[-1]['number']
+
+
+## controller -------------------------------------------------------
+
+def main( start_at: str, write_artifacts: bool, force: bool, jobs: int = 1 ) -> None:
+    """ Controller.
+        Called by if __name__ == '__main__' """
+    start_time = datetime.datetime.now()
+    validate_start_at( start_at )
+    pending_saves: list = []
+    with concurrent.futures.ThreadPoolExecutor( max_workers=1 ) as artifact_writer:  # one worker keeps artifact-writes in step-order
+        data = None  # None means the next step to run must load its source-file
+        started = False
+        upstream_fingerprint = ''
+        for step in STEPS:
+            step_number: str = step['number']
+            module = importlib.import_module( step['module'] )
+            fingerprint: str = make_step_fingerprint( step, module, upstream_fingerprint )
+            upstream_fingerprint = fingerprint
+            started = started or step_number == start_at
+            artifact_path = getattr( module, step['artifact_attr'] ) if step['artifact_attr'] else None
+            if not started:
+                continue  # fingerprint still computed, so later steps' fingerprints don't depend on `--start-at`
+            if artifact_path and not force and stage_cache.is_fresh( artifact_path, fingerprint ):
+                log.info( f'step ``{step_number}`` inputs unchanged; skipping' )
+                data = None
+                continue
+            step_start_time = datetime.datetime.now()
+            if step_number == '10':
+                data = module.process()
+            else:
+                if data is None:
+                    data = module.load_source()  # starting mid-flow, or previous step was skipped; use its artifact
+                if step_number == LAST_STEP_NUMBER:
+                    data = module.process( data, jobs )
+                else:
+                    data = module.process( data )
+            log.info( f'step ``{step_number}`` processed; elapsed, ``{datetime.datetime.now() - step_start_time}``' )
+            if write_artifacts and artifact_path:
+                pending_saves.append( (step_number, artifact_writer.submit(save_artifact, module, data, artifact_path, fingerprint, step_number)) )
+            if step_number not in ( '10', LAST_STEP_NUMBER ):  # step 10's artifact is a tsv, which its process() output already matches
+                data = make_hand_off( data )  # a rebuilt copy, so the background artifact-write and the next step don't share dicts or lists
+        check_saves( pending_saves )
+    log.info( f'all steps done; elapsed, ``{datetime.datetime.now() - start_time}``' )
+    return
+
+    ## end main()
+
+
+## helpers ----------------------------------------------------------
+
+def validate_start_at( start_at: str ) -> None:
+    """ Raises if `start_at` isn't a known step-number.
+        Called by main() """
+    step_numbers: list = [ step['number'] for step in STEPS ]
+    if start_at not in step_numbers:
+        raise Exception( f'unknown step, ``{start_at}``; valid steps, ``{step_numbers}``' )
+    return
+
+
+def make_step_fingerprint( step: dict, module, upstream_fingerprint: str ) -> str:
+    """ Returns the step's input-fingerprint.
+        Called by main() """
+    code_paths: list = get_code_paths( module )
+    input_filepaths: list = [ os.environ[envar] for envar in step['input_file_envars'] ]
+    settings: dict = { envar: os.environ.get(envar, '') for envar in step['setting_envars'] }
+    fingerprint: str = stage_cache.make_fingerprint( code_paths, upstream_fingerprint, input_filepaths, settings )
+    return fingerprint
+
+
+def get_code_paths( module ) -> list:
+    """ Returns the sorted file-paths of the step-module and of all the shared project-code: every python file under lib/, and instructor_check_flow/common.py.
+        The whole shared tree, rather than the modules the step imports, so an import made inside a function (eg sqlite_mirror.sync()'s db_stuff)
+          can't be missed; the cost is that a change to any shared module re-runs every step.
+        Called by make_step_fingerprint() """
+    code_paths: list = [ os.path.abspath(module.__file__), os.path.abspath(f'{PROJECT_CODE_DIR}/instructor_check_flow/common.py') ]
+    for ( dir_path, dir_names, file_names ) in os.walk( f'{PROJECT_CODE_DIR}/lib' ):
+        dir_names[:] = [ dir_name for dir_name in dir_names if dir_name != '__pycache__' ]
+        code_paths.extend( [os.path.abspath(f'{dir_path}/{file_name}') for file_name in file_names if file_name.endswith('.py')] )
+    return sorted( code_paths )
+
+
+def make_hand_off( data ):
+    """ Returns the data as the next step's load_source() would read it from the step's json artifact:
+          every dict rebuilt with its keys in sorted order (steps' save() use `sort_keys=True`), and tuples as lists -- without a json round-trip.
+        Without this, step 50 would write courses in step 40's processing-order -- unlike a step-by-step run, or a run_all that skipped a step.
+        (The steps' keys are all strings already, so no key-conversion is needed.)
+        Called by main(), recursively """
+    if isinstance( data, dict ):
+        return { key: make_hand_off(data[key]) for key in sorted(data) }
+    if isinstance( data, (list, tuple) ):
+        return [ make_hand_off(value) for value in data ]
+    return data
+
+
+def save_artifact( module, data, artifact_path: str, fingerprint: str, step_number: str ) -> None:
+    """ Saves the step's artifact, then records its fingerprint.
+        Called (on the artifact-writer thread) by main() """
+    stage_cache.clear( artifact_path )  # so an interrupted save isn't later treated as fresh
+    module.save( data )
+    stage_cache.record( artifact_path, fingerprint, step_number )
+    return
+
+
+def check_saves( pending_saves: list ) -> None:
+    """ Waits for the background artifact-writes, and raises if any failed.
+        Called by main() """
+    problems: list = []
+    for ( step_number, future ) in pending_saves:
+        try:
+            future.result()
+        except Exception as e:
+            log.exception( f'problem saving artifact for step ``{step_number}``' )
+            problems.append( f'step {step_number}: {repr(e)}' )
+    if problems:
+        raise Exception( f'problem writing artifacts, ``{problems}``' )
+    return
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='runs the instructor-check steps in one process' )
+    parser.add_argument( '--start-at', default='10', help='step-number to start at (earlier steps\' artifacts must exist); default 10' )
+    parser.add_argument( '--no-artifacts', action='store_true', help='skip writing the intermediate json artifacts' )
+    parser.add_argument( '--force', action='store_true', help='re-run steps even if their input-fingerprints are unchanged' )
+    parser.add_argument( '--jobs', type=int, default=1, help='number of worker-processes for step 50\'s course-mapping; default 1 (serial)' )
+    args: dict = vars( parser.parse_args() )
+    log.debug( f'args, ``{args}``' )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    main( args['start_at'], not args['no_artifacts'], args['force'], args['jobs'] )
+    sys.exit()
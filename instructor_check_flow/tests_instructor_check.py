@@ -8,9 +8,17 @@ Usage:
     - example: $ python3 ./instructor_check_flow/tests_instructor_check.py SomeClass.some_method
 """
 
-import datetime, importlib, json, logging, os, unittest
+import csv, datetime, decimal, importlib, json, logging, os, sqlite3, subprocess, sys, tempfile, threading, unittest
+import unittest.mock
 
+from lib import citation_pipeline, csv_maker, db_stuff, delta_export, fake_ocra, leganto_final_processor, openurl_parser, readings_extractor, readings_processor, sqlite_mirror
+from lib.cdl import CDL_Checker
+from lib.common import query_ocra, stage_cache, validate_files
+from lib.common.checkpoint_journal import Checkpoint_Journal, make_source_fingerprint
+
+## (benchmarks/ modules are imported inside the tests that use them, so a broken benchmark only fails its own tests)
 make_oit_subset_two = importlib.import_module( '20_make_oit_subset_two' )  # required because modules shouldn't start wit numbers
+create_reading_lists = importlib.import_module( '50_create_reading_lists' )
 
 
 class MiscTest( unittest.TestCase ):
@@ -37,6 +45,709 @@ class MiscTest( unittest.TestCase ):
         # result = common.parse_course_code( 'foo', 1 )
         self.assertEqual( expected, result )
 
+    def test_check_for_match_in_index(self):
+        """ Checks that the indexed lookup agrees with the full-scan check_for_match(). 
+            Includes near-misses that substring-matching treats as matches, like `hist.012` vs `hist.0120`. """
+        already_in_leganto_dict_lines = [
+            { 'Reading List Code': 'brown.afri.0090.2023-fall.s01', 'Reading List Name': 'an intro to africana studies', 'Course Code': 'brown.afri.0090.2023-fall.s01', 'email_list': ['first_last@brown.edu'] },
+            { 'Reading List Code': '', 'Reading List Name': 'hist 1120 -- fall', 'Course Code': 'envs1232', 'email_list': ['a_b@brown.edu', 'c_d@brown.edu'] },
+            { 'Reading List Code': 'brown.anth.0066x.2023-spring.s01', 'Reading List Name': '', 'Course Code': 'xhist.0120', 'email_list': [''] },
+            { 'Reading List Code': 'brown.anth.0066x.2023-spring.s01', 'Reading List Name': '', 'Course Code': '', 'email_list': ['e_f@brown.edu'] },
+        ]
+        already_in_leganto_index = make_oit_subset_two.build_already_in_leganto_index( already_in_leganto_dict_lines )
+        course_keys = [ 'afri.0090', 'afri.009', 'hist.1120', 'envs.1232', 'nvs.1232', 'anth.0066', 'anth.0066x', 'hist.012', 'hist.0120', 'biol.0200', 'x1.0200', 'anth.a066' ]
+        emails = [ 'First_Last@brown.edu', 'a_b@brown.edu', 'C_D@brown.edu', 'e_f@brown.edu', '', 'nobody@brown.edu' ]
+        for course_key in course_keys:
+            for email in emails:
+                expected = make_oit_subset_two.check_for_match( course_key, email, already_in_leganto_dict_lines )
+                result = make_oit_subset_two.check_for_match_in_index( course_key, email, already_in_leganto_index, already_in_leganto_dict_lines )
+                self.assertEqual( expected, result, f'mismatch for course_key, ``{course_key}``; email, ``{email}``' )
+
+
+class CreateReadingListsTest( unittest.TestCase ):
+
+    """ Checks step 50's course-assembly. """
+
+    def make_course( self, oit_course_id: str, track_titles: list ) -> dict:
+        empty_results = { results_key: [] for ( _format_name, results_key ) in citation_pipeline.FORMAT_RESULTS_KEYS }
+        tracks = [ {'filename': f'{title}.mp3', 'trackid': i, 'tracktitle': title} for ( i, title ) in enumerate(track_titles) ]
+        return {
+            'oit_course_id': oit_course_id,
+            'oit_course_title': 'a course',
+            'ocra_course_data': { '1234': dict(empty_results, tracks_results=tracks[:1]), '5678': dict(empty_results, tracks_results=tracks[1:]) },
+            }
+
+    def test_rows_stream_in_course_order(self):
+        """ Checks that rows come out in course-then-class_id order, with every header, and that rows don't share the template. """
+        data_holder_dict = {
+            '__meta__': {},
+            'musc.0100': self.make_course( 'brown.musc.0100.2024-spring.s01', ['first', 'second'] ),
+            'musc.0200': self.make_course( 'brown.musc.0200.2024-spring.s01', ['third'] ),
+            }
+        course_rows = list( create_reading_lists.iter_course_rows(data_holder_dict, None, {}) )  # no cdl_checker needed for tracks
+        self.assertEqual( ['musc.0100', 'musc.0200'], [course_key for (course_key, _rows) in course_rows] )
+        leganto_rows = [ row for (_course_key, rows) in course_rows for row in rows ]
+        self.assertEqual( ['first', 'second', 'third'], [row['citation_title'] for row in leganto_rows] )
+        self.assertEqual( create_reading_lists.leganto_final_processor.get_headers(), list(leganto_rows[0].keys()) )
+        leganto_rows[0]['citation_note'] = 'changed'
+        self.assertEqual( '', leganto_rows[1]['citation_note'] )
+
+    def test_course_rows_are_generated_lazily(self):
+        """ Checks that a course's rows are produced as they're consumed, rather than all mapped up-front. """
+        course = self.make_course( 'brown.musc.0100.2024-spring.s01', ['first', 'second'] )
+        course['ocra_course_data']['5678']['website_results'] = [ {'title': 'a website missing its other fields'} ]  # maps last
+        course_rows = citation_pipeline.iter_course_leganto_rows( 'musc.0100', course, None, {} )
+        self.assertEqual( 'first', next(course_rows)['citation_title'] )
+        self.assertEqual( 'second', next(course_rows)['citation_title'] )
+        with self.assertRaises( KeyError ):
+            next( course_rows )
+
+    def test_pool_matches_serial(self):
+        """ Checks that `--jobs` output matches the serial output, in the same order. """
+        data_holder_dict = { '__meta__': {} }
+        for i in range( 6 ):
+            data_holder_dict[f'musc.0{i}00'] = self.make_course( f'brown.musc.0{i}00.2024-spring.s01', [f'title-{i}-a', f'title-{i}-b', f'title-{i}-c'] )
+        cdl_checker = create_reading_lists.CDL_Checker()
+        cdl_checker.CDL_TITLES = [ {'item_id': '1', 'title': 'a cdl title'} ]  # pre-populated, so no cdl-db query
+        serial_rows = [ row for (_course_key, rows) in create_reading_lists.iter_course_rows(data_holder_dict, cdl_checker, {}) for row in rows ]
+        pool_rows = create_reading_lists.map_courses_in_pool( data_holder_dict, cdl_checker, {}, 3 )
+        self.assertEqual( serial_rows, pool_rows )
+        self.assertEqual( {}, create_reading_lists.WORKER_STATE )
+
+    def test_import_creates_no_output_dirs(self):
+        """ Checks that importing step 50 (as tests and run_all.py do) doesn't create the term's output-directory. """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            env = dict( os.environ, LGNT__CSV_OUTPUT_DIR_PATH=temp_dir )
+            subprocess.run( [sys.executable, '-c', 'import importlib; importlib.import_module("50_create_reading_lists")'],
+                env=env, cwd=f'{os.environ["LGNT__PROJECT_CODE_DIR"]}/instructor_check_flow', check=True )
+            self.assertEqual( [], os.listdir(temp_dir) )
+
+
+class ReadingsProcessorTest( unittest.TestCase ):
+
+    """ Checks readings_processor mapping. """
+
+    def test_citation_record_acts_like_mapped_dict(self):
+        """ Checks that a Citation_Record compares, reads, and converts like the MAPPED_CATEGORIES-copy it replaces. """
+        record = readings_processor.map_empty( 'brown.musc.0100.2024-spring.s01', 'S01', 'a course' )
+        expected = dict( readings_processor.MAPPED_CATEGORIES, coursecode='brown.musc.0100.2024-spring.s01', section_id='S01', reading_list_name='a course' )
+        self.assertEqual( expected, record )
+        self.assertEqual( expected, record.as_dict() )
+        self.assertEqual( list(readings_processor.MAPPED_CATEGORIES.keys()), list(record.keys()) )
+        self.assertFalse( hasattr(record, '__dict__') )
+        ## unset note behaves like a missing key
+        self.assertEqual( '', record.get('citation_library_note', '') )
+        with self.assertRaises( KeyError ):
+            record['citation_library_note']
+        record['citation_library_note'] = 'a note'
+        self.assertEqual( 'a note', record['citation_library_note'] )
+        ## unknown fields are rejected
+        with self.assertRaises( KeyError ):
+            record['not_a_field'] = 'x'
+
+    def test_compiled_mapper_parses_openurl_once(self):
+        """ Checks that both page-fallbacks come from a single openurl-parse, and that a bad spec fails at compile-time. """
+        source = { 'spage': None, 'epage': '', 'sfxlink': 'https://sfx.example/openurl?spage=12&epage=20' }
+        spec = ( ('citation_start_page', 'page', 'spage'), ('citation_end_page', 'page', 'epage') ) + readings_processor.COURSE_FIELD_SPECS
+        mapper = readings_processor.compile_mapper( 'test', spec )
+        course = readings_processor.make_course_context( 'MUSC0100', 'brown.musc.0100.2024-spring.s01', 'S01', 'a course', None, {} )
+        with unittest.mock.patch.object( openurl_parser, 'parse', wraps=openurl_parser.parse ) as parse:
+            record = mapper( source, course )
+        self.assertEqual( 1, parse.call_count )
+        self.assertEqual( ('12', '20'), (record['citation_start_page'], record['citation_end_page']) )
+        self.assertEqual( 'brown.musc.0100.2024-spring.s01', record['coursecode'] )
+        with self.assertRaises( Exception ):
+            readings_processor.compile_mapper( 'test', (('not_a_field', 'const', ''),) )
+
+
+class ReadingsExtractorTest( unittest.TestCase ):
+
+    """ Checks readings_extractor helpers. """
+
+    def test_partition_articles_by_format(self):
+        """ Checks single-pass format-bucketing, keeping query order, and skipping unknown/missing formats. """
+        rows = [ {'format': 'video ', 'atitle': 'a'}, {'format': 'article', 'atitle': 'b'}, {'format': 'poster', 'atitle': 'c'},
+            {'format': None, 'atitle': 'd'}, {'atitle': 'e'}, {'format': 'article', 'atitle': 'f'} ]
+        result = readings_extractor.partition_articles_by_format( rows )
+        self.assertEqual( [f'{format_name}_results' for format_name in readings_extractor.ARTICLE_TABLE_FORMATS], list(result.keys()) )
+        self.assertEqual( ['b', 'f'], [row['atitle'] for row in result['article_results']] )
+        self.assertEqual( ['a'], [row['atitle'] for row in result['video_results']] )
+        self.assertEqual( 3, sum([len(bucket) for bucket in result.values()]) )
+        self.assertEqual( result, readings_processor.filter_article_table_results(rows) )
+
+
+class OpenurlParserTest( unittest.TestCase ):
+
+    """ Checks the cached openurl-parse. """
+
+    def test_parse_is_cached_and_immutable(self):
+        """ Checks that a repeat-link is served from the cache, and that page-fallbacks and the bruknow-openurl come from one parse. """
+        raw_ourl = 'https://login.revproxy.brown.edu/login?url=http://sfx.brown.edu:8888/sfx_local?sid=sfx:citation&genre=article&spage=5&epage=&url=x'
+        openurl_parser.parse.cache_clear()
+        parsed = openurl_parser.parse( raw_ourl )
+        self.assertIs( parsed, openurl_parser.parse(raw_ourl) )
+        self.assertEqual( 1, openurl_parser.parse.cache_info().misses )
+        self.assertEqual( ('5', ''), (parsed.spage, parsed.epage) )
+        self.assertEqual( f'{openurl_parser.BRUKNOW_OPENURL_PATTERN}&genre=article&spage=5', parsed.bruknow_openurl )
+        self.assertEqual( {'sid': ['sfx:citation'], 'genre': ['article'], 'spage': ['5'], 'url': ['x']}, readings_processor.parse_openurl(raw_ourl) )
+        with self.assertRaises( AttributeError ):
+            parsed.spage = '6'
+        ## empty and query-less links
+        self.assertEqual( ((), '', '', 'no openurl found'), tuple(openurl_parser.parse('')) )
+        self.assertEqual( (), openurl_parser.parse( 'https://example.com/no-query' ).params )
+        self.assertTrue( openurl_parser.is_helpful_bruknow_openurl(parsed.bruknow_openurl) )
+        self.assertFalse( openurl_parser.is_helpful_bruknow_openurl('no openurl found') )
+
+
+class LegantoFinalProcessorTest( unittest.TestCase ):
+
+    """ Checks the leganto row-factory. """
+
+    def test_no_ocra_data_row(self):
+        """ Checks that a no-ocra-data citation's id is set part-way through the row, as the original prep did. """
+        record = readings_processor.map_empty( 'brown.musc.0100.2024-spring.s01', 'S01', 'a course' )
+        row = leganto_final_processor.make_leganto_row( record )
+        self.assertEqual( list(leganto_final_processor.HEADERS), list(row.keys()) )
+        self.assertEqual( leganto_final_processor.NO_OCRA_DATA_NOTE, record['external_system_id'] )
+        self.assertEqual( leganto_final_processor.NO_OCRA_DATA_NOTE, row['citation_library_note'] )
+        self.assertEqual( ('', '', ''), (row['citation_public_note'], row['citation_status'], row['reading_list_code']) )  # before the id is set
+        self.assertEqual( ('a course', 'BeingPrepared', 'RESTRICTED'), (row['reading_list_name'], row['reading_list_status'], row['visibility']) )  # after
+        self.assertEqual( '', leganto_final_processor.ROW_TEMPLATE['citation_library_note'] )
+        self.assertIsNot( leganto_final_processor.get_headers(), leganto_final_processor.get_headers() )
+
+    def test_clean_citation_title_matches_reference(self):
+        """ Checks the single-pass title-cleaner against the pre-optimization version, on the tests.py titles and some edge-cases. """
+        from benchmarks import reference_impls
+        titles = [
+            '',
+            '(EXCERPT) ',
+            '(EXCERPT) "Bharatha Natyam-What Are You?.',
+            '“Frayed Fabrications: Feminine Mobility, Surrogate Bodies and Robe Usage in Noh Drama”',
+            '"Ritual"',
+            '“Research, Countertext, Proposal: Considering the Textual Authority of the Dramaturg',
+            'Is Summer Learning Loss Real? How I lost faith in one of\neducation research‚Äôs classic results - Education Next : Education\nNext',
+            'a   title  with   runs of spaces',
+            'A Title:',
+            'A Title.',
+            ' A Title: .',
+            '“An Unbalanced Title',
+            None,
+            ]
+        for title in titles:
+            with self.subTest( title=title ):
+                self.assertEqual( reference_impls.clean_citation_title(title), leganto_final_processor.clean_citation_title(title) )
+        for title in [ '.', '""' ]:  # the reference raised IndexError on titles that clean down to nothing
+            self.assertEqual( '', leganto_final_processor.clean_citation_title(title) )
+
+
+class CsvMakerTest( unittest.TestCase ):
+
+    """ Checks the streaming tsv-writer. """
+
+    def test_streaming_writer_drops_no_ocra_rows(self):
+        """ Checks header, tab-delimiting, and that no-ocra-data rows are dropped as they stream through. """
+        headers = [ 'coursecode', 'citation_title', 'citation_library_note' ]
+        rows = ( {'coursecode': code, 'citation_title': title, 'citation_library_note': note} for ( code, title, note ) in [
+            ( 'brown.afri.0090.2024-spring.s01', 'a title', '' ),
+            ( 'brown.hist.1120.2024-spring.s01', '', 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND' ),
+            ( 'brown.hist.1120.2024-spring.s01', 'another title', 'CDL link possibly' ),
+            ] )  # a generator, as step 50 passes
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_filepath = f'{temp_dir}/list.tsv'
+            with csv_maker.Streaming_TSV_Writer( headers, output_filepath ) as writer:
+                writer.write_rows( rows )
+            with open( output_filepath, 'r', newline='' ) as f:
+                lines = f.read().split( '\r\n' )
+        self.assertEqual( 'coursecode\tcitation_title\tcitation_library_note', lines[0] )
+        self.assertEqual( 'brown.afri.0090.2024-spring.s01\ta title\t', lines[1] )
+        self.assertEqual( 'brown.hist.1120.2024-spring.s01\tanother title\tCDL link possibly', lines[2] )
+        self.assertEqual( [ '' ], lines[3:] )
+        self.assertEqual( (2, 1), (writer.rows_written, writer.rows_skipped) )
+
+
+    def test_sharded_output_keeps_courses_whole(self):
+        """ Checks department- and row-count-sharding, and the manifest. """
+        headers = [ 'coursecode', 'citation_title', 'citation_library_note' ]
+        def make_rows( course_key, count, note='' ):
+            return [ {'coursecode': course_key, 'citation_title': f'title {i}', 'citation_library_note': note} for i in range(count) ]
+        course_rows = [
+            ( 'afri.0090', make_rows('afri.0090', 2) ),
+            ( 'hist.1120', make_rows('hist.1120', 3) ),
+            ( 'afri.0100', make_rows('afri.0100', 2) ),
+            ( 'envs.1232', make_rows('envs.1232', 1, 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND') ),  # dropped, so no shard
+            ( 'hist.1200', make_rows('hist.1200', 5) ),  # bigger than max_rows; gets its own shard
+            ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            original_dir_path = csv_maker.CSV_OUTPUT_DIR_PATH
+            csv_maker.CSV_OUTPUT_DIR_PATH = temp_dir
+            try:
+                by_department = csv_maker.create_sharded_csvs( iter(sorted(course_rows)), headers, 'department' )  # in course order, as step 50 yields them
+                by_rows = csv_maker.create_sharded_csvs( iter(course_rows), headers, 'rows', max_rows=4 )
+            finally:
+                csv_maker.CSV_OUTPUT_DIR_PATH = original_dir_path
+        self.assertEqual(
+            [ ('part_001_afri.tsv', ['afri.0090', 'afri.0100'], 4), ('part_002_hist.tsv', ['hist.1120', 'hist.1200'], 8) ],
+            [ (entry['filename'], entry['course_keys'], entry['row_count']) for entry in by_department['shards'] ] )
+        self.assertEqual(
+            [ ('part_001.tsv', ['afri.0090'], 2), ('part_002.tsv', ['hist.1120'], 3), ('part_003.tsv', ['afri.0100'], 2), ('part_004.tsv', ['hist.1200'], 5) ],
+            [ (entry['filename'], entry['course_keys'], entry['row_count']) for entry in by_rows['shards'] ] )
+        self.assertEqual( (4, 12), (by_rows['total_courses'], by_rows['total_rows']) )
+
+    def test_department_shard_written_when_department_ends(self):
+        """ Checks that, without max_rows, a department's shard is handed off for writing once the next department starts, rather than at the end. """
+        headers = [ 'coursecode', 'citation_title', 'citation_library_note' ]
+        written_groups = { 'afri': threading.Event(), 'hist': threading.Event() }
+        original_write_shard = csv_maker.write_shard
+        def recording_write_shard( shard, headers, output_dir_path ):
+            entry = original_write_shard( shard, headers, output_dir_path )
+            written_groups[shard['group']].set()
+            return entry
+        def iter_course_rows():
+            for course_key in [ 'afri.0090', 'afri.0100', 'hist.1120' ]:
+                yield ( course_key, [{'coursecode': course_key, 'citation_title': 'a title', 'citation_library_note': ''}] )
+            self.assertTrue( written_groups['afri'].wait(5) )  # handed off when hist.1120 arrived
+            self.assertFalse( written_groups['hist'].is_set() )
+            yield ( 'hist.1200', [{'coursecode': 'hist.1200', 'citation_title': 'a title', 'citation_library_note': ''}] )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with unittest.mock.patch.object( csv_maker, 'CSV_OUTPUT_DIR_PATH', temp_dir ), unittest.mock.patch.object( csv_maker, 'write_shard', recording_write_shard ):
+                manifest = csv_maker.create_sharded_csvs( iter_course_rows(), headers, 'department' )
+        self.assertEqual(
+            [ ('part_001_afri.tsv', ['afri.0090', 'afri.0100']), ('part_002_hist.tsv', ['hist.1120', 'hist.1200']) ],
+            [ (entry['filename'], entry['course_keys']) for entry in manifest['shards'] ] )
+
+
+class DeltaExportTest( unittest.TestCase ):
+
+    """ Checks delta-export of new/changed/removed rows. """
+
+    def read_delta_titles( self, exporter: delta_export.Delta_Exporter ) -> list:
+        with open( exporter.delta_filepath, 'r', newline='' ) as f:
+            return [ row['citation_title'] for row in csv.DictReader(f, delimiter='\t') ]
+
+    def test_delta_against_previous_export(self):
+        """ Checks, on rows from make_leganto_row(), that a first run exports everything; that inserting a citation exports just that row;
+            and that a changed citation is exported and a dropped one listed by its source-id. """
+        headers = leganto_final_processor.get_headers()
+        def make_rows( tracks ):
+            citations = [ readings_processor.map_track({'filename': f'{title}.mp3', 'trackid': track_id, 'tracktitle': title}, 'brown.musc.0100.2024-spring.s01', 'S01', 'a course')
+                for ( track_id, title ) in tracks ]
+            return list( leganto_final_processor.finalize_rows(citations) )
+        first_rows = make_rows( [(11, 'first'), (12, 'second'), (13, 'third')] )
+        self.assertEqual( ['', '', ''], [row['external_system_id'] for row in first_rows] )  # the column stays blank; rows are keyed on the citation's id
+        inserted_rows = make_rows( [(11, 'first'), (14, 'inserted'), (12, 'second'), (13, 'third')] )
+        changed_rows = make_rows( [(11, 'first'), (14, 'inserted'), (12, 'second, retitled')] )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with delta_export.Delta_Exporter( headers, temp_dir ) as first_exporter:
+                first_exporter.write_rows( first_rows )
+            self.assertEqual( {'unchanged': 0, 'changed': 0, 'new': 3, 'removed': 0}, first_exporter.counts )
+            with delta_export.Delta_Exporter( headers, temp_dir ) as inserted_exporter:
+                inserted_exporter.write_rows( inserted_rows )
+            self.assertEqual( {'unchanged': 3, 'changed': 0, 'new': 1, 'removed': 0}, inserted_exporter.counts )
+            inserted_titles = self.read_delta_titles( inserted_exporter )  # read now; a run in the same second re-uses the delta filename
+            with delta_export.Delta_Exporter( headers, temp_dir ) as changed_exporter:
+                changed_exporter.write_rows( changed_rows )
+            self.assertEqual( {'unchanged': 2, 'changed': 1, 'new': 0, 'removed': 1}, changed_exporter.counts )
+            changed_titles = self.read_delta_titles( changed_exporter )
+            with open( changed_exporter.removed_filepath, 'r' ) as f:
+                removed_lines = f.read().splitlines()
+        self.assertEqual( ['inserted'], inserted_titles )
+        self.assertEqual( ['second, retitled'], changed_titles )
+        self.assertEqual( ['coursecode\texternal_system_id', 'brown.musc.0100.2024-spring.s01\t13'], removed_lines )
+
+
+class SqliteMirrorTest( unittest.TestCase ):
+
+    """ Checks the existing queries against the `sqlite` backend's mirror. """
+
+    def setUp( self ):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.mirror_path = f'{self.temp_dir.name}/mirror.sqlite3'
+        mirror_connection = sqlite_mirror.open_mirror_for_writing( self.mirror_path )
+        tables = [  # ( name, columns, pk_columns, rows )
+            ( 'books', [('bookid', 'INTEGER'), ('requestid', 'TEXT COLLATE NOCASE'), ('bk_title', 'TEXT COLLATE NOCASE')], ['bookid'],
+                [ {'bookid': 1, 'requestid': 'r1', 'bk_title': 'zebra'}, {'bookid': 2, 'requestid': 'r1', 'bk_title': 'Apple'}, {'bookid': 3, 'requestid': 'r2', 'bk_title': 'other class'} ] ),
+            ( 'requests', [('requestid', 'TEXT COLLATE NOCASE'), ('classid', 'INTEGER')], ['requestid'],
+                [ {'requestid': 'r1', 'classid': 12}, {'requestid': 'r2', 'classid': 99} ] ),
+            ( 'classes', [('classid', 'INTEGER'), ('facultyid', 'INTEGER')], ['classid'], [ {'classid': 12, 'facultyid': 7} ] ),
+            ( 'instructors', [('facultyid', 'INTEGER'), ('email', 'TEXT COLLATE NOCASE')], ['facultyid'], [ {'facultyid': 7, 'email': 'first_last@brown.edu'} ] ),
+            ]
+        for ( table_name, columns, pk_columns, rows ) in tables:
+            column_names = [ name for ( name, _ ) in columns ]
+            sqlite_mirror.create_mirror_table( mirror_connection, table_name, columns, pk_columns )
+            sqlite_mirror.write_rows( mirror_connection, table_name, column_names, rows )
+            sqlite_mirror.create_indexes( mirror_connection, table_name, column_names, [('requestid',), ('classid',)] )
+        mirror_connection.close()
+
+    def tearDown( self ):
+        self.temp_dir.cleanup()
+
+    def test_extractor_query_against_mirror(self):
+        """ Checks a join-query runs unchanged, sorts case-insensitively (like OCRA's MySQL), and names the repeated column like pymysql's DictCursor. """
+        with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'sqlite' ), unittest.mock.patch.object( sqlite_mirror, 'MIRROR_PATH', self.mirror_path ):
+            results = readings_extractor.get_book_readings( '12' )
+        self.assertEqual( ['Apple', 'zebra'], [result['bk_title'] for result in results] )
+        self.assertEqual( {'bookid': 2, 'requestid': 'r1', 'bk_title': 'Apple', 'requests.requestid': 'r1', 'classid': 12}, results[0] )
+
+    def test_query_ocra_against_mirror(self):
+        """ Checks a `reserves.`-qualified query, and that the mirror is opened read-only. """
+        with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'sqlite' ), unittest.mock.patch.object( sqlite_mirror, 'MIRROR_PATH', self.mirror_path ):
+            self.assertEqual( ['first_last@brown.edu'], query_ocra.get_ocra_instructor_email_from_classid('12') )
+            with db_stuff.get_db_connection() as db_connection:
+                with db_connection.cursor() as db_cursor:
+                    with self.assertRaises( sqlite3.OperationalError ):
+                        db_cursor.execute( "DELETE FROM `classes`" )
+
+    def test_date_values_parsed_by_mirror_only(self):
+        """ Checks date/time and decimal values come back parsed, a MySQL zero-date comes back as its string (as pymysql returns it),
+            and that plain sqlite3 connections in the process aren't given the mirror's parsing. """
+        mirror_connection = sqlite_mirror.open_mirror_for_writing( self.mirror_path )
+        columns = [ ('itemid', 'INTEGER'), ('created', 'DATETIME'), ('due', 'DATE'), ('fee', 'DECIMAL') ]
+        sqlite_mirror.create_mirror_table( mirror_connection, 'items', columns, ['itemid'] )
+        sqlite_mirror.write_rows( mirror_connection, 'items', [name for ( name, _ ) in columns], [
+            {'itemid': 1, 'created': datetime.datetime(2021, 6, 24, 19, 38, 39), 'due': datetime.date(2021, 7, 1), 'fee': decimal.Decimal('2.5')},
+            {'itemid': 2, 'created': '0000-00-00 00:00:00', 'due': '0000-00-00', 'fee': None} ] )
+        mirror_connection.close()
+        with sqlite_mirror.Mirror_Connection( self.mirror_path ) as db_connection:
+            with db_connection.cursor() as db_cursor:
+                db_cursor.execute( 'SELECT * FROM `items` ORDER BY `itemid`' )
+                rows = db_cursor.fetchall()
+        self.assertEqual( {'itemid': 1, 'created': datetime.datetime(2021, 6, 24, 19, 38, 39), 'due': datetime.date(2021, 7, 1), 'fee': decimal.Decimal('2.5')}, rows[0] )
+        self.assertEqual( {'itemid': 2, 'created': '0000-00-00 00:00:00', 'due': '0000-00-00', 'fee': None}, rows[1] )
+        plain_connection = sqlite3.connect( ':memory:', detect_types=sqlite3.PARSE_DECLTYPES )
+        plain_connection.execute( 'CREATE TABLE `other` (`stamp` DATETIME)' )
+        plain_connection.execute( "INSERT INTO `other` VALUES ('2021-06-24 19:38:39')" )
+        self.assertEqual( ('2021-06-24 19:38:39',), plain_connection.execute('SELECT `stamp` FROM `other`').fetchone() )
+        plain_connection.close()
+
+    def test_unknown_backend(self):
+        with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'oracle' ):
+            with self.assertRaises( Exception ):
+                db_stuff.get_db_connection()
+
+
+class FakeOcraTest( unittest.TestCase ):
+
+    """ Checks the `fake` backend's fixture-building, latency-injection, and counts. """
+
+    def test_cdl_search_against_fixture(self):
+        """ Checks a CDL search (from tests.py's live CDL_Checker_Test) against a fixture, including datetime round-tripping. """
+        cdl_rows = [
+            {'id': 1523, 'alma_item_pid': None, 'alma_mms_id': '991006299729706966', 'author': '', 'barcode': None, 'bib_id': 'b90794643',
+                'created': datetime.datetime(2021, 6, 24, 19, 38, 39, 946705), 'item_file': 'b90794643_b90794643.pdf', 'item_id': 'b90794643',
+                'modified': datetime.datetime(2021, 8, 23, 20, 49, 45, 623634), 'num_copies': 1, 'status': 'ready',
+                'title': 'Critical encounters in Secondary English : teaching literary theory to adolescents'},
+            {'id': 9, 'alma_item_pid': '2', 'alma_mms_id': '3', 'author': 'Someone', 'barcode': '4', 'bib_id': '',
+                'created': datetime.datetime(2022, 1, 1), 'item_file': '4.pdf', 'item_id': '2',
+                'modified': datetime.datetime(2022, 1, 2), 'num_copies': 1, 'status': 'ready', 'title': 'An unrelated title'},
+            ]
+        expected = dict( cdl_rows[0], fuzzy_score=93 )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fixture_path = f'{temp_dir}/fake_ocra.sqlite3'
+            self.assertEqual( {'cdl_app_item': 2}, fake_ocra.build_fixture_db(fixture_path, {'cdl_app_item': cdl_rows}) )
+            fake_ocra.reset_stats()
+            with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'fake' ), \
+                    unittest.mock.patch.object( fake_ocra, 'FIXTURE_PATH', fixture_path ), \
+                    unittest.mock.patch.object( fake_ocra, 'QUERY_LATENCY_MS', 5 ), \
+                    unittest.mock.patch.object( fake_ocra.time, 'sleep' ) as mock_sleep:
+                result = CDL_Checker().search_cdl( 'Critical Encounters in Secondary English: Teaching Literary Theory to Adolescents' )
+        self.assertEqual( [expected], result )
+        mock_sleep.assert_called_once_with( 0.005 )
+        self.assertEqual( {'connections': 1, 'queries': 1}, fake_ocra.STATS )
+
+
+class QueryInstrumentationTest( unittest.TestCase ):
+
+    """ Checks db_stuff's per-query recording and summary. """
+
+    def test_make_sql_fingerprint(self):
+        """ Checks that literal values are replaced, so queries differing only in values group together. """
+        sql = "SELECT * FROM `banner_courses`  WHERE `subject` LIKE 'BIOL' AND `course` LIKE '1234a' AND `id` IN (1, 2, 3) AND `x` = %s"
+        self.assertEqual( 'SELECT * FROM `banner_courses` WHERE `subject` LIKE ? AND `course` LIKE ? AND `id` IN (?) AND `x` = ?', db_stuff.make_sql_fingerprint(sql) )
+
+    def test_query_summary(self):
+        """ Checks that two class-id lookups are summarized as one fingerprint, with their calls, rows, and caller. """
+        rows = [
+            {'classid': 101, 'subject': 'BIOL', 'course': '1234a', 'term': '202210'},
+            {'classid': 102, 'subject': 'BIOL', 'course': '1234a', 'term': '202110'},
+            {'classid': 201, 'subject': 'HIST', 'course': '0150', 'term': '202210'},
+            ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fixture_path = f'{temp_dir}/fake_ocra.sqlite3'
+            fake_ocra.build_fixture_db( fixture_path, {'banner_courses': rows} )
+            db_stuff.reset_query_stats()
+            with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'fake' ), unittest.mock.patch.object( fake_ocra, 'FIXTURE_PATH', fixture_path ):
+                self.assertEqual( ['101', '102'], query_ocra.get_class_id_entries('BIOL', '1234a') )
+                self.assertEqual( ['201'], query_ocra.get_class_id_entries('HIST', '0150') )
+        summary = db_stuff.get_query_summary()
+        db_stuff.reset_query_stats()
+        self.assertEqual( 2, summary['queries'] )
+        self.assertEqual( 1, len(summary['fingerprints']) )
+        fingerprint = summary['fingerprints'][0]
+        self.assertEqual( "SELECT * FROM `banner_courses` WHERE `subject` LIKE ? AND `course` LIKE ? ORDER BY `banner_courses`.`term` DESC", fingerprint['fingerprint'] )
+        self.assertEqual( 2, fingerprint['calls'] )
+        self.assertEqual( 3, fingerprint['rows'] )
+        self.assertEqual( {'lib.common.query_ocra.get_class_id_entries': 2}, fingerprint['callers'] )
+        self.assertTrue( fingerprint['p50_ms'] <= fingerprint['p95_ms'] <= fingerprint['max_ms'] )
+
+    def test_slow_query_log(self):
+        """ Checks that a query over the threshold is logged with its sql, context, and query-plan; and that faster ones aren't. """
+        rows = [ {'classid': 101, 'subject': 'BIOL', 'course': '1234a', 'term': '202210'} ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fixture_path = f'{temp_dir}/fake_ocra.sqlite3'
+            slow_query_log_path = f'{temp_dir}/slow_queries.jsonl'
+            fake_ocra.build_fixture_db( fixture_path, {'banner_courses': rows} )
+            with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'fake' ), \
+                    unittest.mock.patch.object( fake_ocra, 'FIXTURE_PATH', fixture_path ), \
+                    unittest.mock.patch.object( db_stuff, 'SLOW_QUERY_LOG_PATH', slow_query_log_path ), \
+                    unittest.mock.patch.object( db_stuff, 'SLOW_QUERY_EXPLAIN', True ), \
+                    unittest.mock.patch.dict( db_stuff.QUERY_CONTEXT ):
+                db_stuff.set_query_context( '30', 'biol.1234a' )
+                with unittest.mock.patch.object( db_stuff, 'SLOW_QUERY_MS', 60000 ):
+                    query_ocra.get_class_id_entries( 'BIOL', '1234a' )
+                self.assertFalse( os.path.exists(slow_query_log_path) )
+                with unittest.mock.patch.object( db_stuff, 'SLOW_QUERY_MS', 0.0001 ):
+                    self.assertEqual( ['101'], query_ocra.get_class_id_entries('BIOL', '1234a') )
+            db_stuff.reset_query_stats()
+            with open( slow_query_log_path, 'r' ) as f:
+                entries = [ json.loads(line) for line in f ]
+        self.assertEqual( 1, len(entries) )
+        entry = entries[0]
+        self.assertEqual( "SELECT * FROM `banner_courses` WHERE `subject` LIKE 'BIOL' AND `course` LIKE '1234a' ORDER BY `banner_courses`.`term` DESC", entry['sql'] )
+        self.assertEqual( ('30', 'biol.1234a', 'lib.common.query_ocra.get_class_id_entries', 1), (entry['step'], entry['course_key'], entry['caller'], entry['rows']) )
+        self.assertTrue( entry['explain'] and 'detail' in entry['explain'][0] )  # sqlite's `EXPLAIN QUERY PLAN` rows
+
+    def test_pool_workers_query_stats_merged(self):
+        """ Checks that, with step 50's `--jobs`, queries made in the worker-processes are counted in the parent's query-summary, once each. """
+        rows = [ {'classid': 101, 'subject': 'MUSC', 'course': '0100', 'term': '202210'} ]
+        def query_and_map( course_key, course_data, cdl_checker, settings ):  # stands in for citation_pipeline's mapping; inherited by the forked workers
+            query_ocra.get_class_id_entries( 'MUSC', course_key.split('.')[1] )
+            return iter( [{'coursecode': course_key}] )
+        data_holder_dict = { '__meta__': {}, 'musc.0100': {}, 'musc.0200': {}, 'musc.0300': {} }
+        cdl_checker = CDL_Checker()
+        cdl_checker.CDL_TITLES = [ {'item_id': '1', 'title': 'a cdl title'} ]  # pre-populated, so no cdl-db query
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fixture_path = f'{temp_dir}/fake_ocra.sqlite3'
+            fake_ocra.build_fixture_db( fixture_path, {'banner_courses': rows} )
+            with unittest.mock.patch.object( db_stuff, 'DB_BACKEND', 'fake' ), \
+                    unittest.mock.patch.object( fake_ocra, 'FIXTURE_PATH', fixture_path ), \
+                    unittest.mock.patch.object( citation_pipeline, 'iter_course_leganto_rows', query_and_map ):
+                db_stuff.reset_query_stats()
+                query_ocra.get_class_id_entries( 'MUSC', '0100' )  # a parent-process query, inherited by the workers at fork
+                leganto_rows = create_reading_lists.map_courses_in_pool( data_holder_dict, cdl_checker, {}, 2 )
+                summary = db_stuff.get_query_summary()
+                db_stuff.reset_query_stats()
+        self.assertEqual( ['musc.0100', 'musc.0200', 'musc.0300'], [row['coursecode'] for row in leganto_rows] )
+        self.assertEqual( 4, summary['queries'] )
+        self.assertEqual( 2, summary['fingerprints'][0]['rows'] )
+
+
+class SyntheticDataTest( unittest.TestCase ):
+
+    """ Checks benchmarks/synthetic_data.py's generated files. """
+
+    def test_seeded_and_valid(self):
+        """ Checks that a seed reproduces the same files, and that the tsv files pass step 10's and step 20's column checks. """
+        from benchmarks import synthetic_data
+        config = dict( synthetic_data.DEFAULT_CONFIG, oit_courses=200, cdl_catalog_size=50 )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = synthetic_data.main( f'{temp_dir}/a', 7, config )
+            synthetic_data.main( f'{temp_dir}/b', 7, config )
+            for file_name in ( 'oit_courses.tsv', 'already_in_leganto.tsv', 'pdf_data.json' ):
+                with open( f'{temp_dir}/a/{file_name}' ) as f_a, open( f'{temp_dir}/b/{file_name}' ) as f_b:
+                    self.assertEqual( f_a.read(), f_b.read() )
+            self.assertTrue( validate_files.OIT_columns_are_valid(f'{temp_dir}/a/oit_courses.tsv') )
+            self.assertTrue( validate_files.already_in_leganto_columns_valid(f'{temp_dir}/a/already_in_leganto.tsv') )
+            with sqlite3.connect( f'{temp_dir}/a/fake_ocra.sqlite3' ) as connection:
+                article_count = connection.execute( 'SELECT COUNT(*) FROM articles' ).fetchone()[0]
+        self.assertEqual( 200, manifest['counts']['oit_rows'] )
+        self.assertEqual( article_count, manifest['counts']['tables']['articles'] )
+
+
+class CdlMatchingTest( unittest.TestCase ):
+
+    """ Checks benchmarks/cdl_matching.py's matchers against search_cdl()'s brute-force results. """
+
+    def test_recall_against_brute_force(self):
+        """ Checks that the lossless matchers are identical to brute-force, and that a match the lossy token-block matcher drops lowers its recall. """
+        from benchmarks import cdl_matching
+        catalog = [
+            {'id': 1, 'item_id': 'i1', 'title': 'Critical encounters in Secondary English : teaching literary theory to adolescents'},
+            {'id': 2, 'item_id': 'i2', 'title': 'The art of war'},  # no 4+ character words, so token-blocking can't find it
+            {'id': 3, 'item_id': 'i3', 'title': 'An unrelated title'},
+            ]
+        search_titles = [ 'Critical Encounters in Secondary English: Teaching Literary Theory to Adolescents', 'The Art of War', '' ]
+        ( expected, _ ) = cdl_matching.run_matcher( cdl_matching.Brute_Force_Matcher, catalog, search_titles )
+        self.assertEqual( [[(0, 93)], [(1, 86)], []], expected )
+        for matcher_class in ( cdl_matching.Length_Bound_Matcher, cdl_matching.Character_Bound_Matcher ):
+            ( results, _ ) = cdl_matching.run_matcher( matcher_class, catalog, search_titles )
+            self.assertEqual( expected, results, matcher_class.__name__ )
+        ( results, _ ) = cdl_matching.run_matcher( cdl_matching.Token_Block_Matcher, catalog, search_titles )
+        comparison = cdl_matching.compare_results( expected, results, search_titles )
+        self.assertEqual( (0.5, 1.0), (comparison['recall'], comparison['precision']) )
+        self.assertEqual( 66.67, comparison['identical_percent'] )
+
+
+class GoldenOutputTest( unittest.TestCase ):
+
+    """ Checks benchmarks/golden_output.py's row-comparison and tsv-reading. """
+
+    def test_compare_rows(self):
+        """ Checks that a changed value is reported by column, and that course-order only matters when the mode keeps it. """
+        from benchmarks import golden_output
+        headers = [ 'coursecode', 'citation_title' ]
+        reference_rows = [ ['brown.hist.1120', 'A'], ['brown.hist.1120', 'B'], ['brown.afri.0090', 'C'] ]
+        regrouped_rows = [ ['brown.afri.0090', 'C'], ['brown.hist.1120', 'A'], ['brown.hist.1120', 'B'] ]
+        self.assertEqual( [], golden_output.compare_rows(headers, reference_rows, list(reference_rows), keeps_order=True) )
+        self.assertEqual( [], golden_output.compare_rows(headers, reference_rows, regrouped_rows, keeps_order=False) )
+        self.assertEqual( 3, len(golden_output.compare_rows(headers, reference_rows, regrouped_rows, keeps_order=True)) )
+        changed_rows = [ ['brown.hist.1120', 'A'], ['brown.hist.1120', 'B2'] ]
+        self.assertEqual(
+            [ 'row-count 2 vs reference 3', 'row 2: {"citation_title": ["B", "B2"]}' ],
+            golden_output.compare_rows(headers, reference_rows, changed_rows, keeps_order=True) )
+
+    def test_golden_tsv_and_term_dir(self):
+        """ Checks that a saved golden tsv reads back as written, and that a run's rows come from its term-directory's shards, in part-order. """
+        from benchmarks import golden_output
+        headers = [ 'coursecode', 'citation_title' ]
+        rows = [ ['brown.hist.1120', 'A "quoted"\ttitle'], ['brown.hist.1120', 'B\nsecond line'], ['brown.afri.0090', ''] ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            golden_output.write_tsv( f'{temp_dir}/golden.tsv', headers, rows )
+            self.assertEqual( (headers, rows), golden_output.read_tsv(f'{temp_dir}/golden.tsv') )
+            os.makedirs( f'{temp_dir}/csv/2024-spring/list_shards' )
+            golden_output.write_tsv( f'{temp_dir}/csv/oit_subset_01.tsv', ['not', 'a', 'reading-list'], [] )
+            golden_output.write_tsv( f'{temp_dir}/csv/2024-spring/list_shards/part_002.tsv', headers, rows[2:] )
+            golden_output.write_tsv( f'{temp_dir}/csv/2024-spring/list_shards/part_001.tsv', headers, rows[:2] )
+            golden_output.write_tsv( f'{temp_dir}/csv/2024-spring/list_shards/part_001_removed.tsv', headers, rows[:1] )
+            self.assertEqual( (headers, rows), golden_output.read_output_rows(f'{temp_dir}/csv/2024-spring') )
+
+
+class StageCacheTest( unittest.TestCase ):
+
+    """ Checks run_all.py's stage-cache fingerprinting. """
+
+    def test_fingerprint_and_freshness(self):
+        """ Checks that the fingerprint tracks input-file and setting changes, and that a re-written artifact is stale. """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code_path = f'{temp_dir}/step.py'
+            input_path = f'{temp_dir}/input.tsv'
+            artifact_path = f'{temp_dir}/output.json'
+            for ( path, content ) in [ (code_path, 'print(1)'), (input_path, 'a\tb\n'), (artifact_path, '{}') ]:
+                with open( path, 'w' ) as f:
+                    f.write( content )
+            fingerprint = stage_cache.make_fingerprint( [code_path], 'upstream', [input_path], {'LGNT__YEAR': '2024'} )
+            self.assertEqual( False, stage_cache.is_fresh(artifact_path, fingerprint) )  # nothing recorded yet
+            stage_cache.record( artifact_path, fingerprint, '20' )
+            self.assertEqual( True, stage_cache.is_fresh(artifact_path, fingerprint) )
+            ## settings, upstream, and input-file changes all change the fingerprint
+            self.assertNotEqual( fingerprint, stage_cache.make_fingerprint([code_path], 'upstream', [input_path], {'LGNT__YEAR': '2025'}) )
+            self.assertNotEqual( fingerprint, stage_cache.make_fingerprint([code_path], 'other', [input_path], {'LGNT__YEAR': '2024'}) )
+            with open( input_path, 'a' ) as f:
+                f.write( 'c\td\n' )
+            self.assertNotEqual( fingerprint, stage_cache.make_fingerprint([code_path], 'upstream', [input_path], {'LGNT__YEAR': '2024'}) )
+            ## an artifact re-written outside the runner is no longer fresh
+            with open( artifact_path, 'w' ) as f:
+                f.write( '{"changed": true}' )
+            self.assertEqual( False, stage_cache.is_fresh(artifact_path, fingerprint) )
+
+    def test_code_paths_cover_shared_code(self):
+        """ Checks that a step's fingerprinted code is its script plus all the shared code -- including modules imported only inside functions. """
+        run_all = importlib.import_module( 'run_all' )
+        project_code_dir = os.path.abspath( os.environ['LGNT__PROJECT_CODE_DIR'] )
+        gather_reading_list_data = importlib.import_module( '40_gather_reading_list_data' )
+        code_paths = [ os.path.relpath(path, project_code_dir) for path in run_all.get_code_paths(gather_reading_list_data) ]
+        self.assertEqual( sorted(code_paths), code_paths )
+        self.assertTrue( {'instructor_check_flow/40_gather_reading_list_data.py', 'instructor_check_flow/common.py', 'lib/db_stuff.py', 'lib/sqlite_mirror.py', 'lib/common/query_ocra.py'} <= set(code_paths) )
+        self.assertEqual( [], [path for path in code_paths if not path.endswith('.py') or '__pycache__' in path] )
+        self.assertEqual( ['instructor_check_flow/40_gather_reading_list_data.py'], [path for path in code_paths if os.path.basename(path)[0].isdigit()] )  # no other step-scripts
+        make_oit_subset_two_paths = [ os.path.relpath(path, project_code_dir) for path in run_all.get_code_paths(make_oit_subset_two) ]
+        self.assertEqual( set(code_paths) - {'instructor_check_flow/40_gather_reading_list_data.py'}, set(make_oit_subset_two_paths) - {'instructor_check_flow/20_make_oit_subset_two.py'} )
+        self.assertTrue( {'LGNT__SQLITE_MIRROR_PATH', 'LGNT__FAKE_OCRA_PATH'} <= set(run_all.DB_SETTING_ENVARS) )
+
+
+class RunAllTest( unittest.TestCase ):
+
+    """ Checks that run_all.py's in-memory hand-offs produce the same reading-list as the step-scripts run one by one. """
+
+    STEP_50_SETTING_ENVARS = [ 'LGNT__SHEET_CREDENTIALS_JSON', 'LGNT__SHEET_NAME', 'LGNT__LAST_CHECKED_JSON_PATH', 'LGNT__FILES_URL_PATTERN', 'LGNT__TRACKER_JSON_FILEPATH' ]
+
+    @unittest.skipUnless( all([envar in os.environ for envar in STEP_50_SETTING_ENVARS]), 'step 50\'s settings-envars are not set' )
+    def test_matches_step_scripts(self):
+        """ Runs steps 10 through 50 both ways, against a small synthetic term and the `fake` db-backend, and compares the tsvs, row-order included. """
+        from benchmarks import synthetic_data
+        project_code_dir = os.environ['LGNT__PROJECT_CODE_DIR']
+        step_scripts = [ '10_prepare_oit_initial_subset', '15_make_oit_subset_two', '20_make_oit_subset_two', '30_get_ocra_classids',
+            '35_get_ocra_instructor_emails', '40_gather_reading_list_data', '50_create_reading_lists' ]
+        runs = {
+            'scripts': [ [f'{project_code_dir}/instructor_check_flow/{step_script}.py'] for step_script in step_scripts ],
+            'run_all': [ [f'{project_code_dir}/instructor_check_flow/run_all.py', '--force'] ],
+            }
+        config = dict( synthetic_data.DEFAULT_CONFIG, oit_courses=200, cdl_catalog_size=50 )
+        tsv_contents = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manifest = synthetic_data.main( f'{temp_dir}/inputs', 3, config )
+            for ( run_name, commands ) in runs.items():
+                env = dict( os.environ, **manifest['envars'] )
+                env.update( {'LGNT__JSON_DATA_DIR_PATH': f'{temp_dir}/{run_name}/json', 'LGNT__CSV_OUTPUT_DIR_PATH': f'{temp_dir}/{run_name}/csv', 'LGNT__LOG_PATH': f'{temp_dir}/{run_name}/log.txt'} )
+                for sub_dir in ( 'json', 'csv' ):
+                    os.makedirs( f'{temp_dir}/{run_name}/{sub_dir}' )
+                for command in commands:
+                    subprocess.run( [sys.executable] + command, env=env, check=True )
+                term_dir_path = f'{temp_dir}/{run_name}/csv/{config["year"]}-{config["season"]}'
+                tsv_names = os.listdir( term_dir_path )
+                self.assertEqual( 1, len(tsv_names) )
+                with open( f'{term_dir_path}/{tsv_names[0]}', 'r' ) as f:
+                    tsv_contents[run_name] = f.read()
+        self.assertTrue( tsv_contents['scripts'].count('\n') > 10 )
+        self.assertEqual( tsv_contents['scripts'], tsv_contents['run_all'] )
+
+    def test_hand_off_matches_artifact(self):
+        """ Checks that the hand-off equals the json-artifact round-trip, key-order included, and shares no dicts or lists with the step's output. """
+        run_all = importlib.import_module( 'run_all' )
+        data = { 'hist.1120': {'ocra_course_data': {'5678': {'tracks_results': [{'z': 1, 'a': (2, 3)}]}, '1234': {}}}, '__meta__': {'b': None, 'a': []} }
+        hand_off = run_all.make_hand_off( data )
+        expected = json.loads( json.dumps(data, sort_keys=True) )
+        self.assertEqual( expected, hand_off )
+        self.assertEqual( json.dumps(expected), json.dumps(hand_off) )  # same key-order, at every level
+        hand_off['hist.1120']['ocra_course_data']['5678']['tracks_results'][0]['z'] = 'changed'
+        hand_off['__meta__']['a'].append( 'changed' )
+        self.assertEqual( 1, data['hist.1120']['ocra_course_data']['5678']['tracks_results'][0]['z'] )
+        self.assertEqual( [], data['__meta__']['a'] )
+
+
+class CheckpointJournalTest( unittest.TestCase ):
+
+    """ Checks the step 30/40 checkpoint-journal. """
+
+    def test_resume_after_interruption(self):
+        """ Checks that completed courses survive an exception, a partial last line is ignored, and other source data starts over. """
+        data_holder_dict = { '__meta__': {'datetime_stamp': 'a'}, 'afri.0090': {}, 'hist.1120': {}, 'envs.1232': {} }
+        fingerprint = make_source_fingerprint( data_holder_dict )
+        self.assertEqual( fingerprint, make_source_fingerprint(dict(data_holder_dict, __meta__={'datetime_stamp': 'b'})) )  # meta ignored
+        with tempfile.TemporaryDirectory() as temp_dir:
+            journal_path = f'{temp_dir}/oit_data_03.json.journal.jsonl'
+            ## first run fails on the second course ---------------------
+            with self.assertRaises( ValueError ):
+                with Checkpoint_Journal( journal_path, fingerprint ) as journal:
+                    journal.append( 'afri.0090', ['123'] )
+                    raise ValueError( 'dropped connection' )
+            with open( journal_path, 'a' ) as f:
+                f.write( '{"course_key": "hist.1120", "res' )  # crash mid-write
+            ## second run resumes ---------------------------------------
+            with Checkpoint_Journal( journal_path, fingerprint ) as journal:
+                self.assertEqual( True, journal.has('afri.0090') )
+                self.assertEqual( ['123'], journal.get('afri.0090') )
+                self.assertEqual( False, journal.has('hist.1120') )
+                journal.append( 'hist.1120', [] )
+            with Checkpoint_Journal( journal_path, fingerprint ) as journal:
+                self.assertEqual( [], journal.get('hist.1120') )
+                journal.finish()
+            self.assertEqual( False, os.path.exists(journal_path) )
+            ## different source data doesn't reuse an old journal -------
+            with Checkpoint_Journal( journal_path, fingerprint ) as journal:
+                journal.append( 'afri.0090', ['123'] )
+            with Checkpoint_Journal( journal_path, 'other-fingerprint' ) as journal:
+                self.assertEqual( False, journal.has('afri.0090') )
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,82 @@
+""" Generator stages that turn a course's ocra data into leganto rows, one citation at a time:
+        - extract: iter_format_results() -- a format's db-rows, across the course's class_ids
+        - map: iter_course_citations() -- readings_processor.Citation_Records, in output order
+        - finalize: iter_leganto_rows() -- leganto row-dicts, ready for a csv_maker / delta_export writer
+    iter_course_leganto_rows() chains the stages for one course; iter_term_leganto_rows() yields each course's chain.
+    No stage builds a list, so a citation goes from the source-data to the writer without intermediate copies,
+    and memory is bounded by one course's source-data rather than the whole term's mapped and finalized rows. """
+
+import logging, os
+
+from lib import leganto_final_processor
+from lib import readings_processor
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+
+
+FORMAT_RESULTS_KEYS: tuple = (  # ( readings_processor.FORMAT_SPECS key, step-40 results-key ), in output order
+    ( 'article', 'article_results' ),
+    ( 'audio', 'audio_results' ),
+    ( 'book', 'book_results' ),
+    ( 'ebook', 'ebook_results' ),
+    ( 'excerpt', 'excerpt_results' ),
+    ( 'track', 'tracks_results' ),
+    ( 'video', 'video_results' ),
+    ( 'website', 'website_results' ),
+    )
+
+
+## chains -----------------------------------------------------------
+
+def iter_term_leganto_rows( data_holder_dict: dict, cdl_checker, settings: dict ):
+    """ Yields ( course_key, generator of the course's leganto rows ), in course order.
+        Each course's rows are produced as the writer consumes them.
+        Called by 50_create_reading_lists.iter_course_rows() """
+    for ( course_key, course_data_val ) in data_holder_dict.items():
+        if course_key == '__meta__':
+            continue
+        yield ( course_key, iter_course_leganto_rows(course_key, course_data_val, cdl_checker, settings) )
+
+
+def iter_course_leganto_rows( course_key: str, course_data_val: dict, cdl_checker, settings: dict ):
+    """ Returns a generator of one course's leganto rows.
+        Called by iter_term_leganto_rows(), and by 50_create_reading_lists.map_course_in_worker() """
+    log.debug( f'processing course_key, ``{course_key}``')
+    return iter_leganto_rows( iter_course_citations(course_key, course_data_val, cdl_checker, settings) )
+
+
+## stages -----------------------------------------------------------
+
+def iter_format_results( ocra_course_data: dict, results_key: str ):
+    """ Yields one format's db-rows across the course's class_ids, in class_id order.
+        ocra_course_data is like: { 'class_id_1234': {'article_results': [], 'audio_results': [], etc...}, 'class_id_2468': {...} }
+        Called by iter_course_citations() """
+    for results_dict_val in ocra_course_data.values():
+        yield from results_dict_val[results_key]
+
+
+def iter_course_citations( course_key: str, course_data_val: dict, cdl_checker, settings: dict ):
+    """ Yields the course's Citation_Records, format by format (articles, audios, books, ebooks, excerpts, tracks, videos, websites).
+        Called by iter_course_leganto_rows() """
+    course_id = f'%s%s' % ( course_key.split('.')[0].upper(), course_key.split('.')[1].upper() )  # e.g., 'ENGL1234'
+    course: dict = readings_processor.make_course_context(
+        course_id, course_data_val['oit_course_id'], 'S01', course_data_val['oit_course_title'], cdl_checker, settings )
+    ocra_course_data: dict = course_data_val['ocra_course_data']
+    for ( format_name, results_key ) in FORMAT_RESULTS_KEYS:
+        mapper = readings_processor.MAPPERS[format_name]
+        for result in iter_format_results( ocra_course_data, results_key ):
+            yield mapper( result, course )
+
+
+def iter_leganto_rows( citations ):
+    """ Yields a leganto row-dict for each readings_processor.Citation_Record in `citations` (any iterable); see leganto_final_processor.make_leganto_row().
+        The row-dicts are what the tsv-writers take, so this is where a citation becomes a dict.
+        Called by iter_course_leganto_rows() """
+    return leganto_final_processor.finalize_rows( citations )
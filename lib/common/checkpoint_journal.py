@@ -0,0 +1,119 @@
+""" Append-only checkpoint-journal for the long-running instructor-check steps (30 and 40).
+    Each completed course's result is appended, as one json line, to a journal next to the step's output file.
+    If the step dies partway, the next run (on the same source data) reuses the journaled results instead of re-querying OCRA.
+    The journal is removed once the step finishes. """
+
+import hashlib, json, logging, os
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+log.debug( 'logging ready' )
+
+
+class Checkpoint_Journal:
+    """ Usage:
+            with Checkpoint_Journal( journal_path, make_source_fingerprint(data_holder_dict) ) as journal:
+                for course_key in ...:
+                    if journal.has( course_key ):
+                        result = journal.get( course_key )
+                    else:
+                        result = ...
+                        journal.append( course_key, result )
+                journal.finish()
+        If the with-block raises, the journal is kept for the next run. """
+
+    def __init__( self, journal_path: str, source_fingerprint: str ):
+        self.journal_path: str = journal_path
+        self.source_fingerprint: str = source_fingerprint
+        self.completed: dict = {}  # course_key -> result, for courses done by a previous (interrupted) run
+        self.file_handle = None
+
+    def __enter__( self ):
+        self.completed = self.load_completed()
+        if self.completed:
+            log.info( f'resuming from journal, ``{self.journal_path}``; completed-course count, ``{len(self.completed)}``' )
+            self.file_handle = open( self.journal_path, 'a' )
+        else:
+            self.file_handle = open( self.journal_path, 'w' )  # new, or stale, journal
+            self.write_line( {'source_fingerprint': self.source_fingerprint} )
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        if self.file_handle:
+            self.file_handle.close()
+            self.file_handle = None
+        if exc_type:
+            log.info( f'step interrupted; journal kept at, ``{self.journal_path}``' )
+        return False  # don't suppress the exception
+
+    def has( self, course_key: str ) -> bool:
+        return course_key in self.completed
+
+    def get( self, course_key: str ):
+        return self.completed[course_key]
+
+    def append( self, course_key: str, result ) -> None:
+        """ Records a completed course; flushed to disk immediately, since each course costs several OCRA queries.
+            Called by step 30 and 40 process() """
+        self.write_line( {'course_key': course_key, 'result': result} )
+        return
+
+    def finish( self ) -> None:
+        """ Removes the journal once the step has completed.
+            Called by step 30 and 40 process() """
+        if self.file_handle:
+            self.file_handle.close()
+            self.file_handle = None
+        if os.path.exists( self.journal_path ):
+            os.remove( self.journal_path )
+        return
+
+    def write_line( self, line_dict: dict ) -> None:
+        self.file_handle.write( json.dumps(line_dict, sort_keys=True) + '\n' )
+        self.file_handle.flush()
+        os.fsync( self.file_handle.fileno() )
+        return
+
+    def load_completed( self ) -> dict:
+        """ Returns the journaled results, or an empty dict if there's no journal, or if it was made from different source data.
+            A partially-written last line (from a crash mid-write) is ignored.
+            Called by __enter__() """
+        completed: dict = {}
+        if not os.path.exists( self.journal_path ):
+            return completed
+        with open( self.journal_path, 'r' ) as f:
+            lines: list = f.readlines()
+        if not lines:
+            return completed
+        try:
+            header: dict = json.loads( lines[0] )
+        except json.decoder.JSONDecodeError:
+            header = {}
+        if header.get( 'source_fingerprint', '' ) != self.source_fingerprint:
+            log.info( f'journal, ``{self.journal_path}`` is from different source data; starting over' )
+            return completed
+        if not lines[-1].endswith( '\n' ):  # partial last line; drop it, so appends start on a fresh line
+            log.warning( f'ignoring partial journal line, ``{lines[-1]}``' )
+            lines = lines[:-1]
+            with open( self.journal_path, 'w' ) as f:
+                f.write( ''.join(lines) )
+        for line in lines[1:]:
+            line_dict: dict = json.loads( line )
+            completed[line_dict['course_key']] = line_dict['result']
+        return completed
+
+    ## end class Checkpoint_Journal
+
+
+def make_source_fingerprint( data_holder_dict: dict ) -> str:
+    """ Returns a sha256 hex-digest of the step's source-data, ignoring `__meta__` (which holds a run-timestamp).
+        Called by step 30 and 40 process() """
+    course_data: dict = { key: value for ( key, value ) in data_holder_dict.items() if key != '__meta__' }
+    source_fingerprint: str = hashlib.sha256( json.dumps(course_data, sort_keys=True).encode('utf-8') ).hexdigest()
+    return source_fingerprint
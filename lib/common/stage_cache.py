@@ -0,0 +1,97 @@
+""" Records and checks input-fingerprints for instructor-check step artifacts, so unchanged steps can be skipped.
+    A step's fingerprint covers its code, the previous step's fingerprint, any input-files, and relevant settings;
+    it's stored, with a hash of the artifact itself, in a `.fingerprint.json` file next to the artifact. """
+
+import datetime, hashlib, json, logging, os
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+log.debug( 'logging ready' )
+
+
+def make_fingerprint( code_paths: list, upstream_fingerprint: str, input_filepaths: list, settings: dict ) -> str:
+    """ Returns a sha256 hex-digest covering everything that determines a step's output.
+        Called by run_all.py """
+    assert type(code_paths) == list
+    assert type(input_filepaths) == list
+    assert type(settings) == dict
+    parts: dict = {
+        'code': { path: hash_file(path) for path in code_paths },
+        'upstream': upstream_fingerprint,
+        'input_files': { path: hash_file(path) for path in input_filepaths },
+        'settings': settings,
+        }
+    fingerprint: str = hashlib.sha256( json.dumps(parts, sort_keys=True).encode('utf-8') ).hexdigest()
+    log.debug( f'fingerprint, ``{fingerprint}``' )
+    return fingerprint
+
+
+def is_fresh( artifact_path: str, fingerprint: str ) -> bool:
+    """ Returns True if the artifact exists, is unchanged since it was recorded, and was made from the same fingerprint.
+        Called by run_all.py """
+    fresh = False
+    record: dict = read_record( artifact_path )
+    if record.get( 'fingerprint', '' ) == fingerprint and os.path.exists( artifact_path ):
+        if record.get( 'artifact_sha256', '' ) == hash_file( artifact_path ):  # catches an artifact re-written by running a step-script on its own
+            fresh = True
+    log.debug( f'artifact_path, ``{artifact_path}``; fresh, ``{fresh}``' )
+    return fresh
+
+
+def record( artifact_path: str, fingerprint: str, step_number: str ) -> None:
+    """ Writes the fingerprint-file for a just-saved artifact.
+        Called by run_all.py """
+    record_dict: dict = {
+        'artifact_sha256': hash_file( artifact_path ),
+        'datetime_stamp': datetime.datetime.now().isoformat(),
+        'fingerprint': fingerprint,
+        'step': step_number,
+        }
+    with open( get_record_path(artifact_path), 'w' ) as f:
+        f.write( json.dumps(record_dict, sort_keys=True, indent=2) )
+    return
+
+
+def clear( artifact_path: str ) -> None:
+    """ Removes the fingerprint-file, so a partially-written artifact is never treated as fresh.
+        Called by run_all.py """
+    record_path: str = get_record_path( artifact_path )
+    if os.path.exists( record_path ):
+        os.remove( record_path )
+    return
+
+
+## helpers ----------------------------------------------------------
+
+def read_record( artifact_path: str ) -> dict:
+    """ Returns the fingerprint-file contents, or an empty dict.
+        Called by is_fresh() """
+    record_dict: dict = {}
+    record_path: str = get_record_path( artifact_path )
+    if os.path.exists( record_path ):
+        try:
+            with open( record_path, 'r' ) as f:
+                record_dict = json.loads( f.read() )
+        except Exception:
+            log.exception( f'problem reading fingerprint-file, ``{record_path}``; treating as stale' )
+    return record_dict
+
+
+def get_record_path( artifact_path: str ) -> str:
+    return f'{artifact_path}.fingerprint.json'
+
+
+def hash_file( path: str ) -> str:
+    """ Returns the sha256 hex-digest of a file, read in chunks.
+        Called by make_fingerprint(), is_fresh(), record() """
+    hasher = hashlib.sha256()
+    with open( path, 'rb' ) as f:
+        for chunk in iter( lambda: f.read(1024 * 1024), b'' ):
+            hasher.update( chunk )
+    return hasher.hexdigest()
@@ -1,4 +1,4 @@
-import csv, datetime, logging, os, pprint
+import concurrent.futures, csv, datetime, json, logging, os, pprint
 
 
 ## logging ----------------------------------------------------------
@@ -17,51 +17,169 @@ log = logging.getLogger(__name__)
 
 
 CSV_OUTPUT_DIR_PATH: str = os.environ['LGNT__CSV_OUTPUT_DIR_PATH']
+TERM_YEAR: str = os.environ['LGNT__YEAR']       # output goes to, eg, `CSV_OUTPUT_DIR_PATH/2024-spring/`
+TERM_SEASON: str = os.environ['LGNT__SEASON']
+
+
+NO_OCRA_DATA_NOTE: str = 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND'
+WRITE_BUFFER_SIZE: int = 1024 * 1024
+SHARD_WRITER_THREADS: int = 4
+
+
+class Streaming_TSV_Writer(object):
+    """ Writes leganto rows to a tsv one at a time, so the full row-list never needs to be in memory.
+        Rows whose `citation_library_note` contains the no-ocra-data note are dropped, as create_csv() always has.
+        Usage:
+            with csv_maker.Streaming_TSV_Writer( headers ) as writer:
+                for row in rows:
+                    writer.write_row( row ) """
+
+    def __init__( self, headers: list, output_filepath: str = '' ):
+        self.headers: list = headers
+        self.output_filepath: str = output_filepath if output_filepath else make_output_filepath()
+        self.csvfile = None
+        self.dict_writer = None
+        self.rows_written: int = 0
+        self.rows_skipped: int = 0
+
+    def __enter__( self ):
+        log.debug( f'output_filepath, ``{self.output_filepath}``' )
+        ## open a new file for writing - if file exists, contents will be erased
+        self.csvfile = open( self.output_filepath, 'w', buffering=WRITE_BUFFER_SIZE )
+        ## make a DictWriter with a tab delimiter
+        self.dict_writer = csv.DictWriter( self.csvfile, fieldnames=self.headers, delimiter='\t' )
+        self.dict_writer.writeheader()
+        return self
+
+    def write_row( self, row: dict ) -> None:
+        if NO_OCRA_DATA_NOTE in row['citation_library_note']:
+            self.rows_skipped += 1
+        else:
+            self.dict_writer.writerow( row )
+            self.rows_written += 1
+        return
+
+    def write_rows( self, rows ) -> None:
+        for row in rows:
+            self.write_row( row )
+        return
 
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.csvfile.close()  # flushes the buffer
+        log.debug( f'rows_written, ``{self.rows_written}``; rows_skipped, ``{self.rows_skipped}``' )
+        return False  # don't suppress exceptions
 
-def create_csv( data: list, headers: list ) -> None:
-    """ Credit: <https://python-adv-web-apps.readthedocs.io/en/latest/csv.html#writing-from-a-dictionary> """
+    ## end class Streaming_TSV_Writer()
 
-    log.debug( f'data, ``{pprint.pformat(data)}``' )
+
+def create_csv( data, headers: list ) -> None:
+    """ Writes all rows of `data` (a list, or any iterable of row-dicts) to a new timestamped tsv.
+        Credit: <https://python-adv-web-apps.readthedocs.io/en/latest/csv.html#writing-from-a-dictionary> """
     log.debug( f'headers, ``{pprint.pformat(headers)}``' )
+    with Streaming_TSV_Writer( headers ) as writer:
+        writer.write_rows( data )
+    return
 
-    cleaned_data: list = []
-    for entry in data:
-        entry: dict = entry
-        # if 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND' in entry['reading_list_library_note']:
-        if 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND' in entry['citation_library_note']:
-            pass
-        else:
-            cleaned_data.append( entry )
-    
+
+def create_sharded_csvs( course_rows, headers: list, shard_by: str, max_rows: int = 0 ) -> dict:
+    """ Writes rows to multiple tsvs, plus a `manifest.json`, in a new timestamped directory; returns the manifest.
+        course_rows: iterable of ( course_key, course's rows ), like `( 'hist.1120', [ {...}, {...} ] )`, in course-key order (as step 50 yields them).
+        shard_by:
+            - 'department': one shard per department (course_key prefix); also split at max_rows, if given.
+              (A department whose courses aren't contiguous in course_rows gets a shard per run of its courses.)
+            - 'rows': shards of at most max_rows rows.
+        A course's rows always go to a single shard (so a course with more than max_rows rows gets its own shard).
+        No-ocra-data rows are dropped (as create_csv() does) before rows are counted.
+        Full shards are handed to a thread-pool for writing while later courses are still arriving;
+          with 'department', a department's shard is also handed off as soon as the next department's first course arrives,
+          so only one department's rows are held at a time, even without max_rows.
+        Called by instructor_check_flow/50_create_reading_lists.py """
+    assert shard_by in [ 'department', 'rows' ], shard_by
+    if shard_by == 'rows' and max_rows < 1:
+        raise Exception( 'sharding by rows requires max_rows' )
+    output_dir_root: str = make_output_filepath()[:-len('.tsv')]  # eg `.../2024-spring/list_2024-01-19T10-59-04.34`
+    output_dir_path: str = output_dir_root
+    suffix: int = 1
+    while os.path.exists( output_dir_path ):  # the timestamp only has hundredths of a second
+        suffix += 1
+        output_dir_path = f'{output_dir_root}_{suffix}'
+    os.makedirs( output_dir_path )
+    open_shards: dict = {}      # shard-group (department, or '' for 'rows') -> shard being filled
+    shard_count: int = 0
+    futures: list = []
+    with concurrent.futures.ThreadPoolExecutor( max_workers=SHARD_WRITER_THREADS ) as shard_writer:
+        for ( course_key, rows ) in course_rows:
+            kept_rows: list = [ row for row in rows if NO_OCRA_DATA_NOTE not in row['citation_library_note'] ]
+            if not kept_rows:
+                continue
+            group: str = course_key.split( '.' )[0] if shard_by == 'department' else ''
+            for finished_group in [ open_group for open_group in open_shards if open_group != group ]:  # a new department; the previous one is done
+                futures.append( shard_writer.submit(write_shard, open_shards.pop(finished_group), headers, output_dir_path) )
+            shard = open_shards.get( group, None )
+            if shard and max_rows and len( shard['rows'] ) + len( kept_rows ) > max_rows:
+                futures.append( shard_writer.submit(write_shard, shard, headers, output_dir_path) )
+                shard = None
+            if shard is None:
+                shard_count += 1
+                shard = { 'number': shard_count, 'group': group, 'course_keys': [], 'rows': [] }
+                open_shards[group] = shard
+            shard['course_keys'].append( course_key )
+            shard['rows'].extend( kept_rows )
+        for shard in open_shards.values():
+            futures.append( shard_writer.submit(write_shard, shard, headers, output_dir_path) )
+        shard_entries: list = [ future.result() for future in futures ]  # re-raises any write-problem
+    shard_entries.sort( key=lambda entry: entry['filename'] )
+    manifest: dict = {
+        'datetime_stamp': datetime.datetime.now().isoformat(),
+        'max_rows': max_rows,
+        'shard_by': shard_by,
+        'shards': shard_entries,
+        'total_courses': sum( [entry['course_count'] for entry in shard_entries] ),
+        'total_rows': sum( [entry['row_count'] for entry in shard_entries] ),
+        }
+    with open( f'{output_dir_path}/manifest.json', 'w' ) as f:
+        f.write( json.dumps(manifest, sort_keys=True, indent=2) )
+    log.debug( f'wrote ``{len(shard_entries)}`` shards to, ``{output_dir_path}``' )
+    return manifest
+
+
+def write_shard( shard: dict, headers: list, output_dir_path: str ) -> dict:
+    """ Writes one shard's rows; returns its manifest-entry. Frees the shard's rows once written.
+        Called (on a writer-thread) by create_sharded_csvs() """
+    name_suffix: str = f'_{shard["group"]}' if shard['group'] else ''
+    filename: str = f'part_{shard["number"]:03d}{name_suffix}.tsv'
+    with Streaming_TSV_Writer( headers, f'{output_dir_path}/{filename}' ) as writer:
+        writer.write_rows( shard['rows'] )
+    shard_entry: dict = {
+        'course_count': len( shard['course_keys'] ),
+        'course_keys': shard['course_keys'],
+        'department': shard['group'],
+        'filename': filename,
+        'row_count': writer.rows_written,
+        }
+    shard['rows'] = []
+    return shard_entry
+
+
+def get_term_dir_path() -> str:
+    """ Returns (creating it if needed) the output directory for the term, like `CSV_OUTPUT_DIR_PATH/2024-spring`.
+        Called by make_output_filepath(), and by delta_export.Delta_Exporter() """
+    term_dir_path: str = f'{CSV_OUTPUT_DIR_PATH}/{TERM_YEAR}-{TERM_SEASON}'
+    os.makedirs( term_dir_path, exist_ok=True )
+    return term_dir_path
+
+
+def make_output_filepath() -> str:
+    """ Returns a timestamped output-filepath.
+        Called by Streaming_TSV_Writer(), create_sharded_csvs() """
     # output_filename: str = f'reading_list_{datetime.datetime.now().isoformat()}.csv'.replace( ':', '-' )  # produces, eg, `reading_list_2022-09-06T10-59-04.345469.csv`
     # output_filename: str = f'list_{datetime.datetime.now().isoformat()}.tsv'.replace( ':', '-' )[:22]  # produces, eg, `reading_list_2022-09-06T10-59-04.34.tsv`
     datetimestamp: str = datetime.datetime.now().isoformat().replace( ':', '-' )[:22]
     output_filename: str = f'list_{datetimestamp}.tsv'  # produces, eg, `reading_list_2022-09-06T10-59-04.34.tsv`
     log.debug( f'output_filename, ``{output_filename}``' ) 
+    output_filepath: str = f'{get_term_dir_path()}/{output_filename}'
+    return output_filepath
 
-    output_filepath: str = f'{CSV_OUTPUT_DIR_PATH}/2024-spring/{output_filename}'
-
-    ## open a new file for writing - if file exists, contents will be erased
-    csvfile = open( output_filepath, 'w' )
-
-    ## make a new variable - c - for Python's DictWriter object - note that fieldnames is required
-    # c = csv.DictWriter( csvfile, fieldnames=headers) 
-
-    ## make a DictWriter with a tab delimiter
-    c = csv.DictWriter( csvfile, fieldnames=headers, delimiter='\t' )
-
-    ## optional - write a header row
-    c.writeheader()
-
-    ## write all rows from list to file
-    # c.writerows( cleaned_data )
-    c.writerows( cleaned_data )
-
-    # save and close file
-    csvfile.close()
-
-    return
 
 # def create_csv( data: list, headers: list ) -> None:
 #     """ Credit: <https://python-adv-web-apps.readthedocs.io/en/latest/csv.html#writing-from-a-dictionary> """
@@ -1,10 +1,14 @@
-import logging, os, sys
+import datetime, json, logging, math, os, re, sys, time
 
 import pymysql
 import pymysql.cursors
+from lib import fake_ocra, sqlite_mirror
 
 log = logging.getLogger(__name__)
 
+DB_BACKEND = os.environ.get( 'LGNT__DB_BACKEND', 'mysql' )  # `mysql`; `sqlite` for the local mirror (see lib/sqlite_mirror.py); `fake` for offline fixtures (see lib/fake_ocra.py)
+DB_BACKENDS = [ 'mysql', 'sqlite', 'fake' ]
+
 HOST = os.environ['LGNT__DB_HOST']
 
 USERNAME = os.environ['LGNT__DB_USERNAME']
@@ -15,9 +19,29 @@ CDL_USERNAME = os.environ['LGNT__CDL_DB_USERNAME']
 CDL_PASSWORD = os.environ['LGNT__CDL_DB_PASSWORD']
 CDL_DB = os.environ['LGNT__CDL_DB_DATABASE_NAME']
 
+QUERY_SUMMARY_SIZE: int = int( os.environ.get('LGNT__QUERY_SUMMARY_SIZE', '10') )  # fingerprints kept in a step's `query_summary`
+QUERY_STATS: dict = {}  # fingerprint -> { 'calls', 'total_seconds', 'latencies', 'rows', 'callers' }; since import, or the last reset_query_stats()
+QUERY_CONTEXT: dict = { 'step': '', 'course_key': '' }  # set by the steps, via set_query_context(); recorded with slow queries
+
+SLOW_QUERY_MS: float = float( os.environ.get('LGNT__SLOW_QUERY_MS', '0') )  # queries taking at least this long (execute plus fetches) go to the slow-query log; 0 disables
+SLOW_QUERY_LOG_PATH: str = os.environ.get( 'LGNT__SLOW_QUERY_LOG_PATH', '' ) or f'{os.path.splitext(os.environ.get("LGNT__LOG_PATH", "leganto"))[0]}_slow_queries.jsonl'
+SLOW_QUERY_EXPLAIN: bool = os.environ.get( 'LGNT__SLOW_QUERY_EXPLAIN', 'false' ).lower() == 'true'  # also log each slow SELECT's query-plan
+
+
+def get_db_connection():
+    """ Returns a connection to the ocra database -- or, for the `sqlite` backend, to the local mirror; or, for the `fake` backend, to the fixture file.
+        In each case, the connection returns rows in dictionary format, and its queries are recorded in QUERY_STATS. """
+    check_backend()
+    if DB_BACKEND == 'sqlite':
+        return Instrumented_Connection( sqlite_mirror.get_connection() )
+    if DB_BACKEND == 'fake':
+        return Instrumented_Connection( fake_ocra.get_connection() )
+    return Instrumented_Connection( get_mysql_db_connection() )
 
-def get_db_connection() -> pymysql.connections.Connection:
-    """ Returns a connection to the database. """
+
+def get_mysql_db_connection() -> pymysql.connections.Connection:
+    """ Returns a connection to the database.
+        Called by get_db_connection(), and by sqlite_mirror.sync() """
     try:
         db_connection: pymysql.connections.Connection = pymysql.connect(  ## the with auto-closes the connection on any problem
                 host=HOST,
@@ -67,7 +91,19 @@ def get_db_connection() -> pymysql.connections.Connection:
 
 
 
-def get_CDL_db_connection():  # yes, yes, i should obviously refactor these two
+def get_CDL_db_connection():
+    """ Returns a connection to the CDL database -- or, for the `sqlite` and `fake` backends, as get_db_connection() does.
+        Its queries are recorded in QUERY_STATS. """
+    check_backend()
+    if DB_BACKEND == 'sqlite':
+        return Instrumented_Connection( sqlite_mirror.get_connection() )
+    if DB_BACKEND == 'fake':
+        return Instrumented_Connection( fake_ocra.get_connection() )
+    return Instrumented_Connection( get_mysql_CDL_db_connection() )
+
+
+def get_mysql_CDL_db_connection():  # yes, yes, i should obviously refactor these two
+    """ Called by get_CDL_db_connection(), and by sqlite_mirror.sync() """
     db_connection = pymysql.connect(  ## the with auto-closes the connection on any problem
             host=HOST,
             user=CDL_USERNAME,
@@ -79,3 +115,247 @@ def get_CDL_db_connection():  # yes, yes, i should obviously refactor these two
     return db_connection
 
 
+def check_backend() -> None:
+    """ Raises on an unknown LGNT__DB_BACKEND value, rather than silently using mysql.
+        Called by get_db_connection() and get_CDL_db_connection() """
+    if DB_BACKEND not in DB_BACKENDS:
+        raise Exception( f'unknown LGNT__DB_BACKEND, ``{DB_BACKEND}``; expected one of ``{DB_BACKENDS}``' )
+    return
+
+
+## query instrumentation --------------------------------------------
+
+
+class Instrumented_Connection(object):
+    """ Wraps a connection (pymysql, or a sqlite_mirror/fake_ocra one) so its cursors record each query in QUERY_STATS;
+        otherwise behaves like the wrapped connection, including `with db_connection:`. """
+
+    def __init__( self, connection ):
+        self.connection = connection
+
+    def __enter__( self ):
+        self.connection.__enter__()
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        return self.connection.__exit__( exc_type, exc_value, traceback )
+
+    def cursor( self, *args, **kwargs ):
+        return Instrumented_Cursor( self.connection.cursor(*args, **kwargs) )
+
+    def __getattr__( self, name ):
+        return getattr( self.connection, name )
+
+    ## end class Instrumented_Connection()
+
+
+class Instrumented_Cursor(object):
+    """ Wraps a cursor; times each execute() and its fetches, counts the rows fetched, and records them (with the execute()-caller)
+        in QUERY_STATS when the next query starts or the cursor closes. Queries over SLOW_QUERY_MS are also written to the slow-query log. """
+
+    def __init__( self, cursor ):
+        self.cursor = cursor
+        self.current_query = None  # { 'sql', 'args', 'fingerprint', 'caller', 'step', 'course_key', 'seconds', 'rows' }
+
+    def __enter__( self ):
+        self.cursor.__enter__()
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.finish_query()
+        return self.cursor.__exit__( exc_type, exc_value, traceback )
+
+    def execute( self, sql: str, args=None ):
+        self.finish_query()
+        caller_frame = sys._getframe( 1 )
+        caller: str = f'{caller_frame.f_globals.get("__name__", "")}.{caller_frame.f_code.co_name}'
+        start = time.perf_counter()
+        try:
+            return self.cursor.execute( sql, args )
+        finally:
+            self.current_query = { 'sql': sql, 'args': args, 'fingerprint': make_sql_fingerprint(sql), 'caller': caller,
+                'step': QUERY_CONTEXT['step'], 'course_key': QUERY_CONTEXT['course_key'], 'seconds': time.perf_counter() - start, 'rows': 0 }
+
+    def fetchone( self ):
+        row = self.timed_fetch( self.cursor.fetchone )
+        if row is not None and self.current_query:
+            self.current_query['rows'] += 1
+        return row
+
+    def fetchmany( self, *args ) -> list:
+        rows = self.timed_fetch( self.cursor.fetchmany, *args )
+        if self.current_query:
+            self.current_query['rows'] += len( rows )
+        return rows
+
+    def fetchall( self ) -> list:
+        rows = self.timed_fetch( self.cursor.fetchall )
+        if self.current_query:
+            self.current_query['rows'] += len( rows )
+        return rows
+
+    def timed_fetch( self, fetch_function, *args ):
+        start = time.perf_counter()
+        try:
+            return fetch_function( *args )
+        finally:
+            if self.current_query:
+                self.current_query['seconds'] += time.perf_counter() - start
+
+    def close( self ) -> None:
+        self.finish_query()
+        self.cursor.close()
+        return
+
+    def finish_query( self ) -> None:
+        if self.current_query:
+            record_query( self.current_query )
+            if SLOW_QUERY_MS and self.current_query['seconds'] * 1000 >= SLOW_QUERY_MS:
+                self.log_slow_query( self.current_query )
+            self.current_query = None
+        return
+
+    def log_slow_query( self, query: dict ) -> None:
+        """ Writes the query -- its sql and args, time, rows, caller, step and course-key, and (with SLOW_QUERY_EXPLAIN) its plan -- to the slow-query log. """
+        entry: dict = {
+            'datetime_stamp': datetime.datetime.now().isoformat(),
+            'milliseconds': round( query['seconds'] * 1000, 2 ),
+            'rows': query['rows'],
+            'sql': query['sql'],
+            'args': query['args'],
+            'fingerprint': query['fingerprint'],
+            'caller': query['caller'],
+            'step': query['step'],
+            'course_key': query['course_key'],
+            }
+        if SLOW_QUERY_EXPLAIN:
+            entry['explain'] = self.explain( query['sql'], query['args'] )
+        write_slow_query( entry )
+        return
+
+    def explain( self, sql: str, args ):
+        """ Returns the query-plan rows for a SELECT -- mysql's `EXPLAIN`, or sqlite's `EXPLAIN QUERY PLAN` for the `sqlite` and `fake` backends;
+            None for other statements. Runs on the wrapped cursor, so it isn't itself recorded. """
+        if not sql.lstrip().upper().startswith( 'SELECT' ):
+            return None
+        explain_prefix: str = 'EXPLAIN ' if DB_BACKEND == 'mysql' else 'EXPLAIN QUERY PLAN '
+        try:
+            self.cursor.execute( explain_prefix + sql, args )
+            return list( self.cursor.fetchall() )
+        except Exception as e:
+            log.exception( f'EXPLAIN failed for sql, ``{sql}``; traceback follows; continuing' )
+            return f'EXPLAIN failed, ``{repr(e)}``'
+
+    def __getattr__( self, name ):
+        return getattr( self.cursor, name )
+
+    ## end class Instrumented_Cursor()
+
+
+def make_sql_fingerprint( sql: str ) -> str:
+    """ Returns the sql with its literal values replaced by `?`, and whitespace collapsed, so queries differing only in values group together.
+        Called by Instrumented_Cursor.execute() """
+    fingerprint: str = re.sub( r"'(?:[^'\\]|\\.|'')*'", '?', sql )  # quoted strings
+    fingerprint = re.sub( r'\b\d+(?:\.\d+)?\b', '?', fingerprint )  # numbers (not digits inside names, like `table1`)
+    fingerprint = fingerprint.replace( '%s', '?' )
+    fingerprint = re.sub( r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', fingerprint )  # `IN (?, ?, ?)` -> `IN (?)`
+    return ' '.join( fingerprint.split() )
+
+
+def record_query( query: dict ) -> None:
+    """ Adds a finished query to QUERY_STATS.
+        Called by Instrumented_Cursor.finish_query() """
+    stats = QUERY_STATS.get( query['fingerprint'], None )
+    if stats is None:
+        stats = { 'calls': 0, 'total_seconds': 0.0, 'latencies': [], 'rows': 0, 'callers': {} }
+        QUERY_STATS[query['fingerprint']] = stats
+    stats['calls'] += 1
+    stats['total_seconds'] += query['seconds']
+    stats['latencies'].append( query['seconds'] )
+    stats['rows'] += query['rows']
+    stats['callers'][query['caller']] = stats['callers'].get( query['caller'], 0 ) + 1
+    return
+
+
+def write_slow_query( entry: dict ) -> None:
+    """ Appends the entry, as a json line, to the slow-query log.
+        Called by Instrumented_Cursor.log_slow_query() """
+    log.warning( f'slow query, ``{entry["milliseconds"]}``ms, step ``{entry["step"]}``, course_key ``{entry["course_key"]}``; see ``{SLOW_QUERY_LOG_PATH}``' )
+    with open( SLOW_QUERY_LOG_PATH, 'a' ) as f:
+        f.write( json.dumps(entry, sort_keys=True, default=str) + '\n' )  # default=str for dates and decimals in EXPLAIN rows
+    return
+
+
+def set_query_context( step: str, course_key: str = '' ) -> None:
+    """ Sets the step, and the course being processed, that slow-query log entries are attributed to.
+        Called by each step's process(), and its course-loop """
+    QUERY_CONTEXT['step'] = step
+    QUERY_CONTEXT['course_key'] = course_key
+    return
+
+
+def reset_query_stats() -> None:
+    """ Clears QUERY_STATS.
+        Called at the start of each step's process() """
+    QUERY_STATS.clear()
+    return
+
+
+def merge_query_stats( other_stats: dict ) -> None:
+    """ Adds another process's QUERY_STATS (eg a step 50 `--jobs` worker's) into this process's QUERY_STATS.
+        Called by step 50's iter_courses_in_pool() """
+    for ( fingerprint, other ) in other_stats.items():
+        stats = QUERY_STATS.get( fingerprint, None )
+        if stats is None:
+            stats = { 'calls': 0, 'total_seconds': 0.0, 'latencies': [], 'rows': 0, 'callers': {} }
+            QUERY_STATS[fingerprint] = stats
+        stats['calls'] += other['calls']
+        stats['total_seconds'] += other['total_seconds']
+        stats['latencies'].extend( other['latencies'] )
+        stats['rows'] += other['rows']
+        for ( caller, count ) in other['callers'].items():
+            stats['callers'][caller] = stats['callers'].get( caller, 0 ) + count
+    return
+
+
+def get_query_summary( top: int = 0 ) -> dict:
+    """ Returns the totals, and the `top` (default QUERY_SUMMARY_SIZE) fingerprints by total time, with call-counts, rows, callers, and p50/p95/max latencies;
+        like { 'queries': 1234, 'total_seconds': 5.6, 'fingerprints': [ {'fingerprint': 'SELECT ... classid = ?', 'calls': 600, 'p50_ms': 1.2, ...}, ... ] }
+        Called at the end of each step's process(), for its `__meta__` """
+    ranked: list = sorted( QUERY_STATS.items(), key=lambda item: item[1]['total_seconds'], reverse=True )
+    fingerprints: list = []
+    for ( fingerprint, stats ) in ranked[:top or QUERY_SUMMARY_SIZE]:
+        latencies: list = sorted( stats['latencies'] )
+        fingerprints.append( {
+            'fingerprint': fingerprint,
+            'calls': stats['calls'],
+            'total_seconds': round( stats['total_seconds'], 3 ),
+            'p50_ms': round( get_percentile(latencies, 50) * 1000, 2 ),
+            'p95_ms': round( get_percentile(latencies, 95) * 1000, 2 ),
+            'max_ms': round( latencies[-1] * 1000, 2 ),
+            'rows': stats['rows'],
+            'callers': stats['callers'],
+            } )
+    summary: dict = {
+        'queries': sum( [stats['calls'] for stats in QUERY_STATS.values()] ),
+        'total_seconds': round( sum([stats['total_seconds'] for stats in QUERY_STATS.values()]), 3 ),
+        'fingerprints': fingerprints,
+        }
+    log.info( f'query summary...\n{format_query_summary(summary)}' )
+    return summary
+
+
+def get_percentile( sorted_values: list, percent: int ) -> float:
+    """ Returns the nearest-rank percentile of the (non-empty, sorted) values.
+        Called by get_query_summary() """
+    rank: int = max( 1, math.ceil(percent / 100 * len(sorted_values)) )
+    return sorted_values[rank - 1]
+
+
+def format_query_summary( summary: dict ) -> str:
+    """ Returns the summary as a text table, for the log.
+        Called by get_query_summary() """
+    lines: list = [ f'{summary["queries"]} queries, {summary["total_seconds"]} seconds', f'{"total_s":>9} {"calls":>7} {"p50_ms":>8} {"p95_ms":>8} {"rows":>8}  fingerprint' ]
+    for entry in summary['fingerprints']:
+        lines.append( f'{entry["total_seconds"]:>9.3f} {entry["calls"]:>7} {entry["p50_ms"]:>8.2f} {entry["p95_ms"]:>8.2f} {entry["rows"]:>8}  {entry["fingerprint"][:120]}' )
+    return '\n'.join( lines )
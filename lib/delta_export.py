@@ -0,0 +1,139 @@
+""" Writes only the reading-list rows that are new or changed since the previous delta-export.
+    Each row is keyed by its course and its citation's source-id (see make_row_key()), and hashed over all its header-values.
+    The previous export's key->hash index is kept in the term output-directory (`delta_index.json`).
+    Each run writes:
+        - `list_DATE-TIME_delta.tsv` -- new or changed rows (same columns as the full tsv).
+        - `list_DATE-TIME_removed.tsv` -- `coursecode` and `external_system_id` (the citation's source-id) of rows in the previous export but not in this one.
+    The index is only updated when the run completes. (A first run, with no index, exports every row.) """
+
+import csv, datetime, hashlib, json, logging, os, pprint
+
+from lib import csv_maker
+
+
+## logging ----------------------------------------------------------
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+
+log_level_dict: dict = { 'DEBUG': logging.DEBUG, 'INFO': logging.INFO, 'WARNING': logging.WARNING, 'ERROR': logging.ERROR, 'CRITICAL': logging.CRITICAL }
+LOG_LEVEL: str = os.environ['LGNT__LOG_LEVEL']
+log_level_value = log_level_dict[LOG_LEVEL]  # yields logging.DEBUG or logging.INFO, etc.
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=log_level_value,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+
+
+INDEX_FILENAME: str = 'delta_index.json'
+REMOVED_HEADERS: list = [ 'coursecode', 'external_system_id' ]
+
+
+class Delta_Exporter(object):
+    """ Usage (like csv_maker.Streaming_TSV_Writer):
+            with delta_export.Delta_Exporter( headers ) as exporter:
+                exporter.write_rows( rows ) """
+
+    def __init__( self, headers: list, output_dir_path: str = '' ):
+        self.headers: list = headers
+        self.output_dir_path: str = output_dir_path if output_dir_path else csv_maker.get_term_dir_path()
+        self.index_path: str = f'{self.output_dir_path}/{INDEX_FILENAME}'
+        output_filename_root: str = os.path.basename( csv_maker.make_output_filepath() )[:-len('.tsv')]  # eg `list_2024-01-19T10-59-04.34`
+        self.delta_filepath: str = f'{self.output_dir_path}/{output_filename_root}_delta.tsv'
+        self.removed_filepath: str = f'{self.output_dir_path}/{output_filename_root}_removed.tsv'
+        self.previous_hashes: dict = {}
+        self.current_hashes: dict = {}
+        self.delta_writer = None
+        self.counts: dict = { 'unchanged': 0, 'changed': 0, 'new': 0, 'removed': 0 }
+
+    def __enter__( self ):
+        self.previous_hashes = load_index( self.index_path )
+        self.delta_writer = csv_maker.Streaming_TSV_Writer( self.headers, self.delta_filepath )
+        self.delta_writer.__enter__()
+        return self
+
+    def write_row( self, row: dict ) -> None:
+        if csv_maker.NO_OCRA_DATA_NOTE in row['citation_library_note']:
+            return  # never exported, so not indexed
+        row_key: str = make_row_key( row, self.current_hashes )
+        row_hash: str = make_row_hash( row, self.headers )
+        self.current_hashes[row_key] = row_hash
+        previous_hash = self.previous_hashes.get( row_key, None )
+        if previous_hash == row_hash:
+            self.counts['unchanged'] += 1
+        else:
+            self.counts['new' if previous_hash is None else 'changed'] += 1
+            self.delta_writer.write_row( row )
+        return
+
+    def write_rows( self, rows ) -> None:
+        for row in rows:
+            self.write_row( row )
+        return
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.delta_writer.__exit__( exc_type, exc_value, traceback )
+        if exc_type:
+            log.info( f'delta-export interrupted; index, ``{self.index_path}`` not updated' )
+            return False
+        ## write removed rows ---------------------------------------
+        removed_keys: list = sorted( set(self.previous_hashes.keys()) - set(self.current_hashes.keys()) )
+        self.counts['removed'] = len( removed_keys )
+        with open( self.removed_filepath, 'w' ) as f:
+            removed_writer = csv.writer( f, delimiter='\t' )
+            removed_writer.writerow( REMOVED_HEADERS )
+            for row_key in removed_keys:
+                removed_writer.writerow( row_key.split('|')[0:2] )
+        ## save index -----------------------------------------------
+        save_index( self.index_path, self.current_hashes )
+        log.info( f'delta-export counts, ``{pprint.pformat(self.counts)}``; delta-file, ``{self.delta_filepath}``' )
+        return False
+
+    ## end class Delta_Exporter()
+
+
+## helpers ----------------------------------------------------------
+
+def make_row_key( row: dict, current_hashes: dict ) -> str:
+    """ Returns `coursecode|source-id`. The source-id is the citation's ocra request-id (or track-id), carried on the leganto_final_processor.Leganto_Row,
+          since the row's own `external_system_id` column is blank; so a citation added to or dropped from a course doesn't change the course's other keys.
+        A repeat of the same pair in one export (eg a request under two class_ids) gets a `|2`, `|3`, etc suffix.
+        Called by Delta_Exporter.write_row() """
+    source_id: str = getattr( row, 'source_id', '' ) or row['external_system_id']  # a plain row-dict has only the column
+    base_key: str = f'{row["coursecode"]}|{source_id}'
+    row_key: str = base_key
+    occurrence: int = 1
+    while row_key in current_hashes:
+        occurrence += 1
+        row_key = f'{base_key}|{occurrence}'
+    return row_key
+
+
+def make_row_hash( row: dict, headers: list ) -> str:
+    """ Returns a sha256 hex-digest over the row's header-values, in header order.
+        Called by Delta_Exporter.write_row() """
+    row_text: str = '\t'.join( [str(row.get(header, '')) for header in headers] )
+    return hashlib.sha256( row_text.encode('utf-8') ).hexdigest()
+
+
+def load_index( index_path: str ) -> dict:
+    """ Returns the previous export's key->hash dict, or an empty dict if there's no index yet.
+        Called by Delta_Exporter.__enter__() """
+    row_hashes: dict = {}
+    if os.path.exists( index_path ):
+        with open( index_path, 'r' ) as f:
+            row_hashes = json.loads( f.read() )['row_hashes']
+    log.debug( f'previous-index row-count, ``{len(row_hashes)}``' )
+    return row_hashes
+
+
+def save_index( index_path: str, row_hashes: dict ) -> None:
+    """ Saves the index via a temp-file, so an interrupted save never leaves a partial index.
+        Called by Delta_Exporter.__exit__() """
+    index_dict: dict = { 'datetime_stamp': datetime.datetime.now().isoformat(), 'row_hashes': row_hashes }
+    temp_path: str = f'{index_path}.tmp'
+    with open( temp_path, 'w' ) as f:
+        f.write( json.dumps(index_dict, sort_keys=True, indent=2) )
+    os.replace( temp_path, index_path )
+    return
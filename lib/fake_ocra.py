@@ -0,0 +1,160 @@
+"""
+A stand-in for the OCRA and CDL MySQL databases, for offline benchmarking and testing.
+
+- Serves the same table shapes as the sqlite mirror (see lib/sqlite_mirror.py), from a fixture sqlite file built by build_fixture_db().
+- Selected with `LGNT__DB_BACKEND=fake`; the fixture file is at `LGNT__FAKE_OCRA_PATH`.
+- Latency can be injected, to approximate the network round-trips of the real databases:
+    - `LGNT__FAKE_OCRA_CONNECT_LATENCY_MS` -- per connection (the pipeline opens a connection per query).
+    - `LGNT__FAKE_OCRA_QUERY_LATENCY_MS` -- per query.
+    Both default to 0.
+- STATS counts connections and queries, for benchmarks.
+
+Usage (building a fixture file from json like `{"tables": {"books": [{...}, ...], ...}, "column_types": {"cdl_app_item": {"created": "DATETIME"}}}`):
+    % cd /path/to/leganto_reading_list_code/
+    % python -m lib.fake_ocra build --fixtures ./path/to/fixtures.json --output ./path/to/fake_ocra.sqlite3
+"""
+
+import argparse, datetime, decimal, json, logging, os, sys, time
+
+from lib import sqlite_mirror
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+
+
+FIXTURE_PATH: str = os.environ.get( 'LGNT__FAKE_OCRA_PATH', '' )
+CONNECT_LATENCY_MS: float = float( os.environ.get('LGNT__FAKE_OCRA_CONNECT_LATENCY_MS', '0') )
+QUERY_LATENCY_MS: float = float( os.environ.get('LGNT__FAKE_OCRA_QUERY_LATENCY_MS', '0') )
+STATS: dict = { 'connections': 0, 'queries': 0 }  # since import, or the last reset_stats()
+
+
+class Fake_Connection( sqlite_mirror.Mirror_Connection ):
+    """ A Mirror_Connection over the fixture file, with injected latency. """
+
+    def __init__( self, fixture_path: str, connect_latency_ms: float, query_latency_ms: float ):
+        if connect_latency_ms:
+            time.sleep( connect_latency_ms / 1000 )
+        super().__init__( fixture_path )
+        self.query_latency_ms: float = query_latency_ms
+        STATS['connections'] += 1
+
+    def cursor( self ):
+        return Fake_Cursor( self )
+
+    ## end class Fake_Connection()
+
+
+class Fake_Cursor( sqlite_mirror.Mirror_Cursor ):
+
+    def execute( self, sql: str, args=None ) -> int:
+        if self.mirror_connection.query_latency_ms:
+            time.sleep( self.mirror_connection.query_latency_ms / 1000 )
+        STATS['queries'] += 1
+        return super().execute( sql, args )
+
+    ## end class Fake_Cursor()
+
+
+def get_connection() -> Fake_Connection:
+    """ Returns a connection to the fixture file.
+        Called by db_stuff.get_db_connection() and db_stuff.get_CDL_db_connection(), for the `fake` backend. """
+    if not FIXTURE_PATH:
+        raise Exception( 'LGNT__DB_BACKEND is `fake`, but LGNT__FAKE_OCRA_PATH is not set' )
+    if not os.path.exists( FIXTURE_PATH ):
+        raise Exception( f'no fake-ocra fixture file at ``{FIXTURE_PATH}``; see lib/fake_ocra.py for building one' )
+    return Fake_Connection( FIXTURE_PATH, CONNECT_LATENCY_MS, QUERY_LATENCY_MS )
+
+
+def reset_stats() -> None:
+    """ Zeroes the connection and query counts.
+        Called by benchmarks. """
+    for key in STATS:
+        STATS[key] = 0
+    return
+
+
+## fixture-building -------------------------------------------------
+
+
+def build_fixture_db( fixture_path: str, tables: dict, column_types: dict = {} ) -> dict:
+    """ (Re-)builds the fixture file from `tables`, like { 'books': [ {row-dict}, ... ], ... }; returns the row-counts.
+        Column-types are inferred from the rows' python values, unless given in `column_types`, like { 'cdl_app_item': {'created': 'DATETIME'} }.
+        Tables get the same lookup-indexes as the sqlite mirror.
+        Called by if __name__ == '__main__', and by benchmarks. """
+    if os.path.exists( fixture_path ):
+        os.remove( fixture_path )
+    index_specs: dict = { spec['name']: spec['indexes'] for spec in sqlite_mirror.MIRRORED_TABLES }
+    row_counts: dict = {}
+    fixture_connection = sqlite_mirror.open_mirror_for_writing( fixture_path )
+    try:
+        fixture_connection.execute( 'BEGIN' )
+        for ( table_name, rows ) in tables.items():
+            columns: list = make_columns( rows, column_types.get(table_name, {}) )
+            column_names: list = [ name for ( name, _ ) in columns ]
+            sqlite_mirror.create_mirror_table( fixture_connection, table_name, columns, [] )
+            sqlite_mirror.write_rows( fixture_connection, table_name, column_names, [{name: row.get(name, None) for name in column_names} for row in rows] )
+            sqlite_mirror.create_indexes( fixture_connection, table_name, column_names, index_specs.get(table_name, []) )
+            row_counts[table_name] = len( rows )
+        fixture_connection.execute( 'COMMIT' )
+    finally:
+        fixture_connection.close()
+    log.debug( f'built fixture_path, ``{fixture_path}``; row_counts, ``{row_counts}``' )
+    return row_counts
+
+
+def make_columns( rows: list, column_types: dict ) -> list:
+    """ Returns [ (column-name, sqlite-type), ... ] for the union of the rows' keys, in first-seen order.
+        Called by build_fixture_db() """
+    columns: dict = {}  # name -> type; insertion-ordered
+    for row in rows:
+        for ( name, value ) in row.items():
+            if columns.get( name, None ) is None:
+                columns[name] = column_types.get( name, None ) or make_sqlite_type( value )
+    return [ (name, sqlite_type or 'TEXT COLLATE NOCASE') for ( name, sqlite_type ) in columns.items() ]
+
+
+def make_sqlite_type( value ):
+    """ Returns the sqlite column-type for a python value, matching sqlite_mirror.make_sqlite_type(); None for a None value.
+        Called by make_columns() """
+    sqlite_type = None
+    if isinstance( value, int ):  # bools, too
+        sqlite_type = 'INTEGER'
+    elif isinstance( value, float ):
+        sqlite_type = 'REAL'
+    elif isinstance( value, decimal.Decimal ):
+        sqlite_type = 'DECIMAL'
+    elif isinstance( value, datetime.datetime ):  # before `date`; a datetime is a date, too
+        sqlite_type = 'DATETIME'
+    elif isinstance( value, datetime.date ):
+        sqlite_type = 'DATE'
+    elif isinstance( value, bytes ):
+        sqlite_type = 'BLOB'
+    elif value is not None:
+        sqlite_type = 'TEXT COLLATE NOCASE'
+    return sqlite_type
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='builds the fake-ocra fixture file' )
+    parser.add_argument( 'command', choices=['build'], help='`build` makes the fixture sqlite file from a fixtures json file' )
+    parser.add_argument( '--fixtures', required=True, help='json file like {"tables": {table-name: [row-dicts]}, "column_types": {...}}' )
+    parser.add_argument( '--output', default=FIXTURE_PATH, help='fixture sqlite path; default LGNT__FAKE_OCRA_PATH' )
+    args: dict = vars( parser.parse_args() )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    with open( args['fixtures'], 'r' ) as f:
+        fixtures_dict: dict = json.loads( f.read() )
+    row_counts: dict = build_fixture_db( args['output'], fixtures_dict['tables'], fixtures_dict.get('column_types', {}) )
+    print( json.dumps(row_counts, sort_keys=True, indent=2) )
+    sys.exit()
@@ -1,78 +1,128 @@
-import logging, pprint
+import functools, logging, pprint
+
+from lib import openurl_parser
 
 
 log = logging.getLogger(__name__)
 
 
+HEADERS: tuple = (
+    'coursecode', 'section_id', 'searchable_id1', 'searchable_id2', 'searchable_id3', 'reading_list_code', 
+    'reading_list_name', 'reading_list_description', 'reading_list_subject', 'reading_list_status', 'RLStatus', 
+    'visibility', 'reading_list_assigned_to', 'reading_list_library_note', 'reading_list_instructor_note', 
+    'owner_user_name', 'creativecommon', 'section_name', 'section_description', 'section_start_date', 
+    'section_end_date', 'section_tags', 'citation_secondary_type', 'citation_status', 'citation_tags', 
+    'citation_mms_id', 'citation_original_system_id', 'citation_title', 'citation_journal_title', 'citation_author', 
+    'citation_publication_date', 'citation_edition', 'citation_isbn', 'citation_issn', 
+    'citation_place_of_publication', 'citation_publisher', 'citation_volume', 'citation_issue', 'citation_pages', 
+    'citation_start_page', 'citation_end_page', 'citation_doi', 'citation_oclc', 'citation_lccn', 
+    'citation_chapter', 'rlterms_chapter_title', 'citation_chapter_author', 'editor', 'citation_source', 
+    'citation_source1', 'citation_source2', 'citation_source3', 'citation_source4', 'citation_source5', 
+    'citation_source6', 'citation_source7', 'citation_source8', 'citation_source9', 'citation_source10', 
+    'citation_note', 'additional_person_name', 'file_name', 'citation_public_note', 'license_type', 
+    'citation_instructor_note', 'citation_library_note', 'external_system_id'
+    )
+ROW_TEMPLATE: dict = dict.fromkeys( HEADERS, '' )  # copied (never modified) by make_leganto_row()
+NO_OCRA_DATA_NOTE: str = 'NO-OCRA-BOOKS/ARTICLES/EXCERPTS-FOUND'
+TITLE_CACHE_SIZE: int = 16384  # distinct titles memoized by clean_citation_title()
+PUBLIC_NOTE: str = 'Please contact rock-reserves@brown.edu if you have problem accessing the course-reserves material.'
+
+
 def get_headers() -> list:
-    """ Getter for headers.
+    """ Getter for headers (a new list, from the HEADERS tuple).
         Called by manage_build_reading_list() -> prep_leganto_data() """
-    headers = [
-        'coursecode', 'section_id', 'searchable_id1', 'searchable_id2', 'searchable_id3', 'reading_list_code', 
-        'reading_list_name', 'reading_list_description', 'reading_list_subject', 'reading_list_status', 'RLStatus', 
-        'visibility', 'reading_list_assigned_to', 'reading_list_library_note', 'reading_list_instructor_note', 
-        'owner_user_name', 'creativecommon', 'section_name', 'section_description', 'section_start_date', 
-        'section_end_date', 'section_tags', 'citation_secondary_type', 'citation_status', 'citation_tags', 
-        'citation_mms_id', 'citation_original_system_id', 'citation_title', 'citation_journal_title', 'citation_author', 
-        'citation_publication_date', 'citation_edition', 'citation_isbn', 'citation_issn', 
-        'citation_place_of_publication', 'citation_publisher', 'citation_volume', 'citation_issue', 'citation_pages', 
-        'citation_start_page', 'citation_end_page', 'citation_doi', 'citation_oclc', 'citation_lccn', 
-        'citation_chapter', 'rlterms_chapter_title', 'citation_chapter_author', 'editor', 'citation_source', 
-        'citation_source1', 'citation_source2', 'citation_source3', 'citation_source4', 'citation_source5', 
-        'citation_source6', 'citation_source7', 'citation_source8', 'citation_source9', 'citation_source10', 
-        'citation_note', 'additional_person_name', 'file_name', 'citation_public_note', 'license_type', 
-        'citation_instructor_note', 'citation_library_note', 'external_system_id'
-    ]
-    log.debug( f'header-count, ``{len(headers)}``' )
-    return headers
+    return list( HEADERS )
+
+
+## row factory ------------------------------------------------------
+
+class Leganto_Row( dict ):
+    """ A leganto row-dict that also carries its citation's `source_id` (the ocra request-id, or track-id).
+        The row's own `external_system_id` column is left blank, as it always has been; the tsv-writers only see the header-keys,
+          so the source_id isn't written, but delta_export keys rows on it.
+        Created by make_leganto_row() """
+
+    __slots__ = ( 'source_id', )
+
+    ## end class Leganto_Row()
 
 
+def finalize_rows( citations ):
+    """ Yields a leganto row-dict for each readings_processor.Citation_Record (or citation-dict) in `citations` (any iterable).
+        Called by citation_pipeline.iter_leganto_rows() """
+    for citation in citations:
+        yield make_leganto_row( citation )
+
+
+def make_leganto_row( result ) -> dict:
+    """ Returns the leganto row-dict (a Leganto_Row, carrying the citation's source_id) for one citation; the row starts as a copy of ROW_TEMPLATE.
+        Note: for a citation with no ocra data, `external_system_id` is set to the no-ocra-data note on the citation itself,
+          so it appears in the staff spreadsheet; the fields after that point see it as set.
+        Called by finalize_rows() """
+    row_dict: dict = Leganto_Row( ROW_TEMPLATE )
+    row_dict.source_id = str( result['external_system_id'] )
+    has_id: bool = bool( result['external_system_id'] )
+    row_dict['citation_author'] = clean_citation_author( result['citation_author'] )
+    row_dict['citation_doi'] = result['citation_doi']
+    row_dict['citation_end_page'] = result['citation_end_page']
+    row_dict['citation_isbn'] = result['citation_isbn']
+    row_dict['citation_issn'] = result['citation_issn']
+    row_dict['citation_issue'] = result['citation_issue']
+    row_dict['citation_journal_title'] = result['citation_journal_title']
+    row_dict['citation_publication_date'] = result['citation_publication_date']
+    row_dict['citation_public_note'] = PUBLIC_NOTE if has_id else ''
+    row_dict['citation_secondary_type'] = calculate_leganto_type( result['citation_secondary_type'] )
+    row_dict['citation_source'] = calculate_leganto_citation_source( result )
+    row_dict['citation_start_page'] = result['citation_start_page']
+    row_dict['citation_status'] = 'BeingPrepared' if has_id else ''
+    row_dict['citation_title'] = clean_citation_title( result['citation_title'] )
+    row_dict['citation_volume'] = result['citation_volume']
+    row_dict['coursecode'] = calculate_leganto_course_code( result['coursecode'] )
+    row_dict['reading_list_code'] = row_dict['coursecode'] if has_id else ''
+    row_dict['citation_library_note'] = calculate_leganto_staff_note( result['citation_source1'], result['citation_source2'], result['citation_source3'], result['external_system_id'], result.get('citation_library_note', '') )
+    if row_dict['citation_library_note'] == NO_OCRA_DATA_NOTE:
+        result['external_system_id'] = NO_OCRA_DATA_NOTE  # so this will appear in the staff spreadsheet
+        has_id = True
+    row_dict['reading_list_name'] = result['reading_list_name'] if has_id else ''
+    row_dict['reading_list_status'] = 'BeingPrepared' if has_id else ''
+    row_dict['section_id'] = result['section_id']
+    row_dict['section_name'] = 'Resources' if has_id else ''
+    row_dict['visibility'] = 'RESTRICTED' if has_id else ''
+    return row_dict
+
+
+## row helpers ------------------------------------------------------
+
+@functools.lru_cache( maxsize=TITLE_CACHE_SIZE )
 def clean_citation_title( db_title: str ) -> str:
-    log.debug( f'db_title initially, ``{db_title}``' )
-    if db_title:
-        db_title = db_title.strip()
-        log.debug( f'db_title after strip, ``{db_title}``' )
-        db_title = db_title.replace( '\n', ' ' )
-        db_title = db_title.replace( '  ', ' ' )
-        if db_title == '(EXCERPT)':
-            pass
-        elif '(EXCERPT)' in db_title:
-            db_title = db_title.replace( '(EXCERPT)', '' )
-            db_title = db_title.strip()
-        if db_title[-1] == ':':
-            db_title = db_title[0:-1]
-        if db_title[-1] == '.':
-            log.debug( 'found period' )
-            db_title = db_title[0:-1]
-        if db_title[0] == '“':  # starting smart-quotes
-            ## remove initial-smart-quotes if there's only one, and only one end-smart-quotes, and it's at the end.
-            log.debug( 'found starting smart-quotes' )
-            count_start: int = db_title.count( '“' )
-            if count_start == 1:
-                count_end: int = db_title.count( '”' )
-                if count_end == 1:
-                    if db_title[-1] == '”':  # ok, remove both
-                        db_title = db_title[1:-1]
-        if db_title[0] == '“':
-            count_quotes: int = db_title.count( '“' )
-            if count_quotes == 1:
-                db_title = db_title[1:] 
-        if db_title[0] == '"':
-            ## remove initial-quotes if there are two, and the other is at the end.
-            log.debug( 'found starting simple-quotes' )
-            count_quotes: int = db_title.count( '"' )
-            if count_quotes == 2:
-                if db_title[-1] == '"':  # ok, remove both
-                    db_title = db_title[1:-1]
-        if db_title[0] == '"':
-            count_quotes: int = db_title.count( '"' )
-            if count_quotes == 1:
-                db_title = db_title[1:]
-        db_title = db_title.strip()
-    else:
-        db_title = 'no-title'
-    log.debug( f'db_title cleaned, ``{db_title}``' )
-    return db_title
+    """ Cleans title-string: whitespace, an `(EXCERPT)` marker, a trailing colon and period, and a wrapping (or lone opening) pair of quotes.
+        Each rule checks only the title's first/last character before doing any work, and each quote-count happens at most once.
+        Memoized, since the same titles recur across sections and terms.
+        (The previous version is kept in benchmarks/reference_impls.py, for the equivalence test and microbenchmark.)
+        Called by make_leganto_row() """
+    if not db_title:
+        return 'no-title'
+    title: str = db_title.strip().replace( '\n', ' ' ).replace( '  ', ' ' )
+    if '(EXCERPT)' in title and title != '(EXCERPT)':
+        title = title.replace( '(EXCERPT)', '' ).strip()
+    if title[-1:] == ':':
+        title = title[:-1]
+    if title[-1:] == '.':
+        title = title[:-1]
+    if title[:1] == '“' and title.count( '“' ) == 1:
+        ## remove a wrapping pair of smart-quotes, or a lone opening one
+        if title[-1] == '”' and title.count( '”' ) == 1:
+            title = title[1:-1]
+        else:
+            title = title[1:]
+    if title[:1] == '"':
+        ## remove a wrapping pair of simple-quotes, or a lone opening one
+        quote_count: int = title.count( '"' )
+        if quote_count == 2 and title[-1] == '"':
+            title = title[1:-1]
+        elif quote_count == 1:
+            title = title[1:]
+    return title.strip()
 
     ## end def clean_citation_title()
 
@@ -137,21 +187,17 @@ def calculate_end_column( number_of_columns: int ) -> str:
 
 
 def calculate_leganto_type( perceived_type: str ) -> str:
-    """ Converts `ARTICLE` to `JR` """
-    return_type = perceived_type
-    if perceived_type == 'ARTICLE':
-        return_type = 'JR'
-    log.debug( f'return_type, ``{return_type}``' )
-    return return_type
+    """ Converts `ARTICLE` to `JR`.
+        Kept to a single expression (no debug-log), since it's called for every row.
+        Called by make_leganto_row(), and by OLD_build_reading_list.py """
+    return 'JR' if perceived_type == 'ARTICLE' else perceived_type
 
 
 def calculate_leganto_course_code( data_string: str ) -> str:
-    """ Removes commentary if necessary. """
-    calculated_course_code = data_string
-    if 'oit_course_code_not_found' in data_string:
-        calculated_course_code = ''
-    log.debug( f'calculated_course_code, ``{calculated_course_code}``' )
-    return calculated_course_code
+    """ Removes commentary if necessary.
+        Kept to a single expression (no debug-log), since it's called for every row.
+        Called by make_leganto_row(), and by OLD_build_reading_list.py """
+    return '' if 'oit_course_code_not_found' in data_string else data_string
 
 
 def calculate_leganto_citation_source( result: dict ) -> str:
@@ -261,15 +307,13 @@ def calculate_leganto_staff_note( possible_cdl_text, possible_full_text: str, po
             message = temp_message
     if possible_openurl:
         log.debug( 'hereC' )
-        if 'https' in possible_openurl:
-            params: str = possible_openurl.split( 'openurl?' )[1]  # sometimes there's a link, but with no parameters.
-            if params:
-                log.debug( 'params exist' )
-                ourl_message: str = f'Occasionally-helpful link: <{possible_openurl}>.'
-                if message:
-                    message = f'{message} {ourl_message}'
-                else:
-                    message = ourl_message
+        if openurl_parser.is_helpful_bruknow_openurl( possible_openurl ):  # sometimes there's a link, but with no parameters.
+            log.debug( 'params exist' )
+            ourl_message: str = f'Occasionally-helpful link: <{possible_openurl}>.'
+            if message:
+                message = f'{message} {ourl_message}'
+            else:
+                message = ourl_message
     if initial_staff_note:
         log.debug( 'hereD' )
         if message:
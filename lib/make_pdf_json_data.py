@@ -22,7 +22,7 @@ log.debug( 'logging ready' )
 
 
 ## get db connection ------------------------------------------------
-db_connection: pymysql.connections.Connection = db_stuff.get_db_connection()  # connection configured to return rows in dictionary format
+db_connection: pymysql.connections.Connection = db_stuff.get_mysql_db_connection()  # connection configured to return rows in dictionary format; always mysql -- the pdf tables aren't in the sqlite mirror
 
 ## run query --------------------------------------------------------
 start_time = datetime.datetime.now()
@@ -0,0 +1,92 @@
+""" Parses ocra openurls (the `sfxlink` db-field) once per distinct link, into an immutable Parsed_Openurl.
+    The parse is memoized with a bounded lru-cache that's shared across courses (the same links recur across courses and formats).
+    Serves:
+        - readings_processor's start/end-page fallbacks and bruknow-openurl (citation_source3).
+        - leganto_final_processor's check for a staff-note-worthy bruknow-openurl. """
+
+import functools, logging, os, pprint
+import urllib.parse
+from typing import NamedTuple
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+
+
+OPENURL_CACHE_SIZE: int = int( os.environ.get('LGNT__OPENURL_CACHE_SIZE', '8192') )  # distinct links kept
+REVPROXY_PREFIX: str = 'https://login.revproxy.brown.edu/login?url='
+BRUKNOW_OPENURL_PATTERN: str = 'https://bruknow.library.brown.edu/discovery/openurl?institution=01BU_INST&vid=01BU_INST:BROWN'
+
+
+class Parsed_Openurl( NamedTuple ):
+    params: tuple           # ( (key, (value, ...)), ... ) -- the sfx-openurl's query, like parse_qs() but immutable
+    spage: str              # first `spage` value, or ''
+    epage: str              # first `epage` value, or ''
+    bruknow_openurl: str    # the link as a bruknow-openurl, or 'no openurl found'
+
+
+@functools.lru_cache( maxsize=OPENURL_CACHE_SIZE )
+def parse( raw_ourl: str ) -> Parsed_Openurl:
+    """ Returns the parsed openurl; cached, so repeat-links aren't re-parsed.
+        Called by readings_processor, and by is_helpful_bruknow_openurl() """
+    params: tuple = parse_params( raw_ourl )
+    params_dct: dict = dict( params )
+    parsed = Parsed_Openurl(
+        params=params,
+        spage=params_dct['spage'][0] if 'spage' in params_dct else '',
+        epage=params_dct['epage'][0] if 'epage' in params_dct else '',
+        bruknow_openurl=make_bruknow_openurl( raw_ourl ) )
+    log.debug( f'parsed, ``{parsed}``' )
+    return parsed
+
+
+def parse_params( raw_ourl: str ) -> tuple:
+    """ Returns fielded openurl elements, after removing any rev-proxy prefix.
+        Called by parse() """
+    params: tuple = ()
+    if raw_ourl:
+        ourl: str = raw_ourl[len(REVPROXY_PREFIX):] if raw_ourl.startswith( REVPROXY_PREFIX ) else raw_ourl
+        if '?' in ourl:
+            ourl_section: str = ourl.split( '?' )[1]
+            params = tuple( (key, tuple(values)) for ( key, values ) in urllib.parse.parse_qs(ourl_section).items() )
+        else:
+            log.debug( f'no query-string in ourl, ``{ourl}``' )
+    return params
+
+
+def make_bruknow_openurl( db_openurl: str ) -> str:
+    """ Converts db-openurl (possibly a fragment), to a valid bruknow-openurl.
+        Called by parse() """
+    new_openurl = ''
+    if db_openurl == '':
+        new_openurl = 'no openurl found'
+    else:
+        ## get the query string -------------------------------------
+        query_part: str = urllib.parse.urlparse( db_openurl ).query
+        ## make key-value pairs for urlencode() ---------------------
+        param_dct: dict = dict( urllib.parse.parse_qsl(query_part) )
+        log.debug( f'param_dct, ``{pprint.pformat(param_dct)}``' )
+        if 'url' in param_dct.keys():  # rev-proxy urls can contain the actual sfxlink
+            del( param_dct['url'] )
+        ## get a nice encoded querystring ---------------------------
+        encoded_querystring: str = urllib.parse.urlencode( param_dct, safe=',' )
+        ## build bruknow ourl
+        new_openurl = f'%s&%s' % ( BRUKNOW_OPENURL_PATTERN, encoded_querystring )
+    return new_openurl
+
+
+@functools.lru_cache( maxsize=OPENURL_CACHE_SIZE )
+def is_helpful_bruknow_openurl( possible_openurl: str ) -> bool:
+    """ Returns True for a real openurl-link with parameters (not, eg, 'no openurl found'); cached, like parse().
+        Called by leganto_final_processor.calculate_leganto_staff_note() """
+    helpful = False
+    if possible_openurl and 'https' in possible_openurl:
+        params: str = possible_openurl.split( 'openurl?' )[1]  # sometimes there's a link, but with no parameters.
+        if params:
+            helpful = True
+    return helpful
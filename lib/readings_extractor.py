@@ -12,6 +12,9 @@ logging.basicConfig(
 log = logging.getLogger(__name__)
 
 
+ARTICLE_TABLE_FORMATS: tuple = ( 'article', 'audio', 'ebook', 'excerpt', 'video', 'website' )  # `format` values kept from the articles table
+
+
 def get_book_readings( class_id: str ) -> list:
     db_connection = db_stuff.get_db_connection()
     sql = f"SELECT * FROM reserves.books, reserves.requests WHERE books.requestid = requests.requestid AND classid = {int(class_id)} ORDER BY `books`.`bk_title` ASC"
@@ -29,10 +32,11 @@ def get_book_readings( class_id: str ) -> list:
     return result_set
 
 
-def get_all_articles_readings( class_id: str ) -> list:
+def get_all_articles_readings( class_id: str, by_format: bool = False ):
     """ Runs sql to get article-data for given class_id. 
-        Previously checked for `format = 'article'`, but now ignores that; formats are filtered later.
-        Called by build_reading_list.prep_basic_data() """
+        Previously checked for `format = 'article'`, but now ignores that; formats are filtered later --
+          or, with `by_format=True`, returns the rows already partitioned; see partition_articles_by_format().
+        Called by build_reading_list.prep_basic_data(), and by step 40's gather_course_results() """
     db_connection = db_stuff.get_db_connection()
     sql = f"SELECT * FROM reserves.articles, reserves.requests WHERE articles.requestid = requests.requestid AND classid = {int(class_id)} AND articles.requestid = requests.requestid AND articles.status != 'volume on reserve' AND articles.status != 'purchase requested' ORDER BY `articles`.`atitle` ASC"
     log.debug( f'sql, ``{sql}``' )
@@ -53,9 +57,33 @@ def get_all_articles_readings( class_id: str ) -> list:
             log.debug( 'setting `None` doi to ""' )
             entry['doi']
     log.debug( '\n\n----------' )
+    if by_format:
+        return partition_articles_by_format( result_set )
     return result_set
 
 
+def partition_articles_by_format( all_articles_results: list ) -> dict:
+    """ Buckets article-table rows by their (stripped) `format`, in one pass, keeping each bucket in query (title) order.
+        Returns a dict like: { 'article_results': [...], 'audio_results': [...], etc... } -- one key per ARTICLE_TABLE_FORMATS entry.
+        Rows with an unknown, or no, format are counted and logged once, rather than per row.
+        Called by get_all_articles_readings(), and by readings_processor.filter_article_table_results() """
+    assert type(all_articles_results) == list
+    filtered_results: dict = { f'{format_name}_results': [] for format_name in ARTICLE_TABLE_FORMATS }
+    appenders: dict = { format_name: filtered_results[f'{format_name}_results'].append for format_name in ARTICLE_TABLE_FORMATS }
+    skipped_counts: dict = {}  # format -> count; `None` for rows with no format
+    for result in all_articles_results:
+        format_value = result.get( 'format', None )
+        append = appenders.get( format_value.strip(), None ) if format_value is not None else None
+        if append:
+            append( result )
+        else:
+            skipped_counts[format_value] = skipped_counts.get( format_value, 0 ) + 1
+    log.debug( f'count of all_articles_results, ``{len(all_articles_results)}``; bucket-counts, ``{ {key: len(val) for (key, val) in filtered_results.items()} }``' )
+    if skipped_counts:
+        log.debug( f'skipped unknown/no-format counts, ``{skipped_counts}``' )
+    return filtered_results
+
+
 def get_excerpt_readings( class_id: str ) -> list:
     db_connection = db_stuff.get_db_connection()
     sql = f"SELECT * FROM reserves.articles, reserves.requests WHERE requests.classid = {int(class_id)} AND format = 'excerpt' AND articles.requestid = requests.requestid AND articles.status != 'volume on reserve' AND articles.status != 'purchase requested' ORDER BY `articles`.`atitle` ASC;"
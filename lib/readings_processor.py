@@ -1,7 +1,8 @@
 import logging, os, pprint
-import urllib.parse
 
 from lib import cdl
+from lib import openurl_parser
+from lib import readings_extractor
 
 
 LOG_PATH: str = os.environ['LGNT__LOG_PATH']
@@ -35,271 +36,177 @@ MAPPED_CATEGORIES: dict = {
     'external_system_id': '',
     'reading_list_name': ''
 }
+CITATION_FIELDS: tuple = tuple( MAPPED_CATEGORIES.keys() ) + ( 'citation_library_note', )  # the note is only set for tracks
+CITATION_FIELD_SET: frozenset = frozenset( CITATION_FIELDS )
+
+
+class Citation_Record(object):
+    """ Slotted mapped-citation, used instead of a per-citation copy of MAPPED_CATEGORIES.
+        Supports the dict-style access the mappers and step-50's leganto-prep use; an unset field (like a non-track's
+        `citation_library_note`) behaves like a missing dict-key. as_dict() gives the equivalent plain dict.
+        Created by the map_*() functions """
+
+    __slots__ = CITATION_FIELDS
+
+    def __init__( self ):
+        self.coursecode = ''
+        self.section_id = ''
+        self.citation_secondary_type = ''
+        self.citation_title = ''
+        self.citation_journal_title = ''
+        self.citation_author = ''
+        self.citation_publication_date = ''
+        self.citation_doi = ''
+        self.citation_isbn = ''
+        self.citation_issn = ''
+        self.citation_volume = ''
+        self.citation_issue = ''
+        self.citation_start_page = ''
+        self.citation_end_page = ''
+        self.citation_source1 = ''
+        self.citation_source2 = ''
+        self.citation_source3 = ''
+        self.citation_source4 = ''
+        self.external_system_id = ''
+        self.reading_list_name = ''
+
+    def __getitem__( self, key: str ):
+        if key not in CITATION_FIELD_SET:
+            raise KeyError( key )
+        try:
+            return getattr( self, key )
+        except AttributeError:
+            raise KeyError( key )
+
+    def __setitem__( self, key: str, value ) -> None:
+        if key not in CITATION_FIELD_SET:
+            raise KeyError( f'unknown citation field, ``{key}``' )
+        setattr( self, key, value )
+
+    def __contains__( self, key: str ) -> bool:
+        return key in CITATION_FIELD_SET and hasattr( self, key )
+
+    def __iter__( self ):
+        return iter( self.keys() )
+
+    def __len__( self ) -> int:
+        return len( self.keys() )
+
+    def __eq__( self, other ) -> bool:
+        if isinstance( other, Citation_Record ):
+            return self.as_dict() == other.as_dict()
+        if isinstance( other, dict ):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __repr__( self ) -> str:
+        return repr( self.as_dict() )
+
+    def get( self, key: str, default=None ):
+        if key in self:
+            return getattr( self, key )
+        return default
+
+    def keys( self ) -> list:
+        return [ field for field in CITATION_FIELDS if hasattr(self, field) ]
+
+    def items( self ) -> list:
+        return [ (field, getattr(self, field)) for field in self.keys() ]
+
+    def as_dict( self ) -> dict:
+        return dict( self.items() )
+
+    ## end class Citation_Record()
+
 
 def filter_article_table_results( all_articles_results ):
-    """ Takes all article results and puts them in proper buckets.
+    """ Takes all article results and puts them in proper buckets; see readings_extractor.partition_articles_by_format().
         Called by build_reading_list.prep_basic_data() """
-    assert type(all_articles_results) == list
-    log.debug( f'count of all_articles_results, ``{len(all_articles_results)}``' )
-    ( article_results, audio_results, ebook_results, excerpt_results, video_results, website_results ) = ( [], [], [], [], [], [] )
-    for result in all_articles_results:
-        if 'format' in result.keys():
-            if result['format'].strip() == 'article':
-                article_results.append( result )
-            elif result['format'].strip() == 'audio':
-                audio_results.append( result )
-            elif result['format'].strip() == 'ebook':
-                ebook_results.append( result )
-            elif result['format'].strip() == 'excerpt':
-                excerpt_results.append( result )
-            elif result['format'].strip() == 'video':
-                video_results.append( result )
-            elif result['format'].strip() == 'website':
-                website_results.append( result )
-            else:
-                log.debug( f'unknown format, ``{result["format"]}``' )
-        else:   # no format
-            log.debug( f'no format, ``{result}``' )
-    log.debug( f'count of article_results, ``{len(article_results)}``' )
-    log.debug( f'count of audio_results, ``{len(audio_results)}``' )
-    log.debug( f'count of ebook_results, ``{len(ebook_results)}``' )
-    log.debug( f'count of excerpt_results, ``{len(excerpt_results)}``' )
-    log.debug( f'count of video_results, ``{len(video_results)}``' )
-    log.debug( f'count of website_results, ``{len(website_results)}``' )
-    filtered_results = {
-        'article_results': article_results,
-        'audio_results': audio_results,
-        'ebook_results': ebook_results,
-        'excerpt_results': excerpt_results,
-        'video_results': video_results,
-        'website_results': website_results }    
-    log.debug( f'filtered_results, ``{pprint.pformat(filtered_results)}``' )
-    return filtered_results  
-
-    ## end def filter_article_table_results()  
+    return readings_extractor.partition_articles_by_format( all_articles_results )
 
 
 ## tracks -----------------------------------------------------------
 
 def map_tracks( track_results: list, course_id: str, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str ) -> list:
-    """ Loop-caller for map_track(). 
+    """ Loop-caller for the track-mapper. 
         Called by build_reading_list.prep_basic_data()"""
-    mapped_tracks = []
-    for track_result in track_results:
-        mapped_track: dict = map_track( track_result, leganto_course_id, leganto_section_id, leganto_course_title )
-        mapped_tracks.append( mapped_track )
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, None, {} )
+    mapped_tracks: list = map_results( 'track', track_results, course )
     log.debug( f'count of mapped_tracks, ``{len(mapped_tracks)}``' )
-    # log.debug( f'mapped_tracks, ``{pprint.pformat(mapped_tracks)}``' )
     return mapped_tracks
 
-def map_track( initial_track_result_data: dict, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str ) -> dict:
+def map_track( initial_track_result_data: dict, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str ) -> Citation_Record:
     """ Maps track data to leganto format.
-        Called by map_tracks() """
-    mapped_track: dict = MAPPED_CATEGORIES.copy()
-    mapped_track['citation_library_note'] = f'filename, ``{initial_track_result_data["filename"]}``'
-    mapped_track['citation_secondary_type'] = 'AR'
-    mapped_track['citation_title'] = initial_track_result_data['tracktitle']
-    mapped_track['coursecode'] = leganto_course_id
-    mapped_track['external_system_id'] = str( initial_track_result_data['trackid'] )
-    mapped_track['reading_list_name'] = leganto_course_title
-    mapped_track['section_id'] = leganto_section_id
-    log.debug( f'mapped_track, ``{pprint.pformat(mapped_track)}``' )
-    return mapped_track
+        Called by tests """
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, None, {} )
+    return MAPPERS['track']( initial_track_result_data, course )
 
 
 ## articles ---------------------------------------------------------
 
 def map_articles( article_results: list, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> list:
-    mapped_articles = []
-    for article_result in article_results:
-        mapped_article: dict = map_article( article_result, course_id, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_articles.append( mapped_article )
-    return mapped_articles
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'article', article_results, course )
 
-def map_article( initial_article_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> dict:
+def map_article( initial_article_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> Citation_Record:
     """ This function maps the data from the database to the format required by the Leganto API. 
         Notes: 
         - the `course_id` is used for building the url for the leganto citation_source4 field (the pdf-url).
         - the `leganto_course_code` is used for the leganto `coursecode` field. """
-    log.debug( f'initial_article_data, ``{pprint.pformat(initial_article_data)}``' )
-    mapped_article_data: dict = MAPPED_CATEGORIES.copy()
-    ourl_parts: dict = parse_openurl( initial_article_data['sfxlink'] )
-    mapped_article_data['citation_author'] = f'{initial_article_data["aulast"]}, {initial_article_data["aufirst"]}'
-    mapped_article_data['citation_doi'] = initial_article_data['doi']
-    mapped_article_data['citation_end_page'] = str(initial_article_data['epage']) if initial_article_data['epage'] else parse_end_page_from_ourl( ourl_parts )
-    mapped_article_data['citation_issn'] = initial_article_data['issn']
-    mapped_article_data['citation_issue'] = initial_article_data['issue']
-    mapped_article_data['citation_publication_date'] = str( initial_article_data['date'] )
-    mapped_article_data['citation_secondary_type'] = 'ARTICLE'  # guess
-    mapped_article_data['citation_source1'] = cdl.run_article_cdl_check( initial_article_data['facnotes'], initial_article_data['atitle'], cdl_checker )
-    mapped_article_data['citation_source2'] = initial_article_data['art_url']  
-    mapped_article_data['citation_source3'] = map_bruknow_openurl( initial_article_data.get('sfxlink', '') )  
-    # mapped_article_data['citation_source4'] = check_pdfs( initial_article_data, CSV_DATA, course_id )
-    mapped_article_data['citation_source4'] = check_pdfs( initial_article_data, settings['PDF_DATA'], course_id, settings )
-    mapped_article_data['citation_start_page'] = str(initial_article_data['spage']) if initial_article_data['spage'] else parse_start_page_from_ourl( ourl_parts )
-    mapped_article_data['citation_title'] = initial_article_data['atitle'].strip()
-    mapped_article_data['citation_journal_title'] = initial_article_data['title']
-    mapped_article_data['citation_volume'] = initial_article_data['volume']
-    # mapped_article_data['coursecode'] = f'{course_id[0:8]}'
-    mapped_article_data['coursecode'] = leganto_course_id    
-    mapped_article_data['external_system_id'] = initial_article_data['requests.requestid']
-    mapped_article_data['reading_list_name'] = leganto_course_title
-    mapped_article_data['section_id'] = leganto_section_id
-    log.debug( f'mapped_article_data, ``{pprint.pformat(mapped_article_data)}``' )
-    return mapped_article_data
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return MAPPERS['article']( initial_article_data, course )
 
 
 ## books ------------------------------------------------------------
 
 def map_books( book_results: list, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str, cdl_checker ) -> list:
-    mapped_books = []
-    for book_result in book_results:
-        mapped_book: dict = map_book( book_result, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker )
-        mapped_books.append( mapped_book )
-    log.debug( f'mapped_books, ``{pprint.pformat(mapped_books)}``' )
-    return mapped_books
-
-def map_book( initial_book_data: dict, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str, cdl_checker ) -> dict:
-    log.debug( f'initial_book_data, ``{pprint.pformat(initial_book_data)}``' )
-    mapped_book_data: dict = MAPPED_CATEGORIES.copy()
-    mapped_book_data['citation_author'] = initial_book_data['bk_author']
-    mapped_book_data['citation_isbn'] = initial_book_data['isbn']
-    mapped_book_data['citation_publication_date'] = str(initial_book_data['bk_year']) if initial_book_data['bk_year'] else ''
-    mapped_book_data['citation_secondary_type'] = 'BK'
-    mapped_book_data['citation_source1'] = cdl.run_book_cdl_check( initial_book_data['facnotes'], initial_book_data['bk_title'], cdl_checker )
-    mapped_book_data['citation_source3'] = map_bruknow_openurl( initial_book_data.get('sfxlink', '') )
-    mapped_book_data['citation_title'] = initial_book_data['bk_title']
-    mapped_book_data['coursecode'] = leganto_course_id
-    mapped_book_data['reading_list_name'] = leganto_course_title
-    mapped_book_data['external_system_id'] = initial_book_data['requests.requestid']
-    mapped_book_data['section_id'] = leganto_section_id
-    log.debug( f'mapped_book_data, ``{pprint.pformat(mapped_book_data)}``' )
-    return mapped_book_data
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, {} )
+    return map_results( 'book', book_results, course )
+
+def map_book( initial_book_data: dict, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str, cdl_checker ) -> Citation_Record:
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, {} )
+    return MAPPERS['book']( initial_book_data, course )
 
 
 ## ebooks -----------------------------------------------------------
 
 def map_ebooks( ebook_results: list, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> list:
-    mapped_ebooks = []
-    for ebook_result in ebook_results:
-        mapped_ebook: dict = map_ebook( ebook_result, course_id, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_ebooks.append( mapped_ebook )
-    return mapped_ebooks
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'ebook', ebook_results, course )
 
-def map_ebook( initial_ebook_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> dict:
+def map_ebook( initial_ebook_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> Citation_Record:
     """ This function maps the data from the database to the format required by the Leganto API. 
         Notes: 
         - the `course_id` is used for building the url for the leganto citation_source4 field (the pdf-url).
         - the `leganto_course_code` is used for the leganto `coursecode` field. """
-    log.debug( f'initial_ebook_data, ``{pprint.pformat(initial_ebook_data)}``' )
-    mapped_ebook_data: dict = MAPPED_CATEGORIES.copy()
-    ourl_parts: dict = parse_openurl( initial_ebook_data['sfxlink'] )
-    mapped_ebook_data['citation_author'] = parse_ebook_author( initial_ebook_data )
-    mapped_ebook_data['citation_doi'] = initial_ebook_data['doi']
-    mapped_ebook_data['citation_end_page'] = str(initial_ebook_data['epage']) if initial_ebook_data['epage'] else parse_end_page_from_ourl( ourl_parts )
-    mapped_ebook_data['citation_isbn'] = initial_ebook_data['isbn']
-    mapped_ebook_data['citation_issn'] = initial_ebook_data['issn']
-    mapped_ebook_data['citation_issue'] = initial_ebook_data['issue']
-    mapped_ebook_data['citation_publication_date'] = str( initial_ebook_data['date'] )
-    mapped_ebook_data['citation_secondary_type'] = 'E_BK'
-    log.debug( 'about to call run_ebook_cdl_check() from map_ebook()' )
-    # mapped_ebook_data['citation_source1'] = cdl.run_article_cdl_check( initial_ebook_data['facnotes'], initial_ebook_data['title'], cdl_checker )
-    mapped_ebook_data['citation_source1'] = cdl.run_ebook_cdl_check( initial_ebook_data['facnotes'], initial_ebook_data['art_url'], initial_ebook_data['title'], cdl_checker )
-    # mapped_ebook_data['citation_source1'] = 'TEMP-ENTRY'
-    mapped_ebook_data['citation_source2'] = initial_ebook_data['art_url']  
-    mapped_ebook_data['citation_source3'] = map_bruknow_openurl( initial_ebook_data.get('sfxlink', '') )  
-    mapped_ebook_data['citation_source4'] = check_pdfs( initial_ebook_data, settings['PDF_DATA'], course_id, settings )
-    mapped_ebook_data['citation_start_page'] = str(initial_ebook_data['spage']) if initial_ebook_data['spage'] else parse_start_page_from_ourl( ourl_parts )
-    mapped_ebook_data['citation_title'] = initial_ebook_data['title'].strip()
-    # mapped_ebook_data['citation_journal_title'] = initial_ebook_data['title']
-    # mapped_ebook_data['citation_title'] = initial_ebook_data['atitle'].strip()
-    # mapped_ebook_data['citation_journal_title'] = initial_ebook_data['title']
-    mapped_ebook_data['citation_volume'] = initial_ebook_data['volume']
-    mapped_ebook_data['coursecode'] = leganto_course_id    
-    mapped_ebook_data['external_system_id'] = initial_ebook_data['requests.requestid']
-    mapped_ebook_data['reading_list_name'] = leganto_course_title
-    mapped_ebook_data['section_id'] = leganto_section_id
-    log.debug( f'mapped_ebook_data, ``{pprint.pformat(mapped_ebook_data)}``' )
-    return mapped_ebook_data
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return MAPPERS['ebook']( initial_ebook_data, course )
 
 
 ## excerpts ---------------------------------------------------------
 
 def map_excerpts( excerpt_results: list, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> list:
-    mapped_articles = []
-    for excerpt_result in excerpt_results:
-        mapped_excerpt: dict = map_excerpt( excerpt_result, course_id, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_articles.append( mapped_excerpt )
-    return mapped_articles
-
-def map_excerpt( initial_excerpt_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> dict:
-    log.debug( f'initial_excerpt_data, ``{pprint.pformat(initial_excerpt_data)}``' )
-    mapped_excerpt_data: dict = MAPPED_CATEGORIES.copy()
-    ourl_parts: dict = parse_openurl( initial_excerpt_data['sfxlink'] )
-    mapped_excerpt_data['citation_author'] = parse_excerpt_author( initial_excerpt_data )
-    mapped_excerpt_data['citation_doi'] = initial_excerpt_data['doi']
-    mapped_excerpt_data['citation_end_page'] = str(initial_excerpt_data['epage']) if initial_excerpt_data['epage'] else parse_end_page_from_ourl( ourl_parts )
-    mapped_excerpt_data['citation_issn'] = initial_excerpt_data['issn']
-    mapped_excerpt_data['citation_issue'] = initial_excerpt_data['issue']
-    mapped_excerpt_data['citation_publication_date'] = str( initial_excerpt_data['date'] )
-    mapped_excerpt_data['citation_secondary_type'] = 'ARTICLE'  # guess
-    mapped_excerpt_data['citation_source1'] = cdl.run_article_cdl_check( initial_excerpt_data['facnotes'], initial_excerpt_data['atitle'], cdl_checker )
-    mapped_excerpt_data['citation_source2'] = initial_excerpt_data['art_url']  
-    mapped_excerpt_data['citation_source3'] = map_bruknow_openurl( initial_excerpt_data.get('sfxlink', '') )  
-    # mapped_excerpt_data['citation_source4'] = check_pdfs( initial_excerpt_data, CSV_DATA, course_id )
-    mapped_excerpt_data['citation_source4'] = check_pdfs( initial_excerpt_data, settings['PDF_DATA'], course_id, settings )
-    mapped_excerpt_data['citation_start_page'] = str(initial_excerpt_data['spage']) if initial_excerpt_data['spage'] else parse_start_page_from_ourl( ourl_parts )
-    mapped_excerpt_data['citation_title'] = f'(EXCERPT) %s' % initial_excerpt_data['atitle'].strip()
-    mapped_excerpt_data['citation_journal_title'] = initial_excerpt_data['title']
-    mapped_excerpt_data['citation_volume'] = initial_excerpt_data['volume']
-    mapped_excerpt_data['coursecode'] = leganto_course_id
-    mapped_excerpt_data['external_system_id'] = initial_excerpt_data['requests.requestid']
-    mapped_excerpt_data['reading_list_name'] = leganto_course_title
-    mapped_excerpt_data['section_id'] = leganto_section_id
-    log.debug( f'mapped_excerpt_data, ``{pprint.pformat(mapped_excerpt_data)}``' )
-    return mapped_excerpt_data
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'excerpt', excerpt_results, course )
+
+def map_excerpt( initial_excerpt_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> Citation_Record:
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return MAPPERS['excerpt']( initial_excerpt_data, course )
 
 
 ## websites ---------------------------------------------------------
 
 def map_websites( website_results: list, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> list:
-    mapped_websites = []
-    for website_result in website_results:
-        mapped_website: dict = map_website( website_result, course_id, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_websites.append( mapped_website )
-    return mapped_websites
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'website', website_results, course )
 
-def map_website( initial_website_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> dict:
+def map_website( initial_website_data: dict, course_id: str, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> Citation_Record:
     """ This function maps the data from the database to the format required by the Leganto API. 
         Notes: 
         - the `course_id` is used for building the url for the leganto citation_source4 field (the pdf-url).
         - the `leganto_course_code` is used for the leganto `coursecode` field. """
-    log.debug( f'initial_website_data, ``{pprint.pformat(initial_website_data)}``' )
-    mapped_website_data: dict = MAPPED_CATEGORIES.copy()
-    ourl_parts: dict = parse_openurl( initial_website_data['sfxlink'] )
-    # mapped_website_data['citation_author'] = parse_ebook_author( initial_website_data )
-    mapped_website_data['citation_author'] = ''
-    mapped_website_data['citation_doi'] = initial_website_data['doi']
-    mapped_website_data['citation_end_page'] = str(initial_website_data['epage']) if initial_website_data['epage'] else parse_end_page_from_ourl( ourl_parts )
-    mapped_website_data['citation_isbn'] = initial_website_data['isbn']
-    mapped_website_data['citation_issn'] = initial_website_data['issn']
-    mapped_website_data['citation_issue'] = initial_website_data['issue']
-    mapped_website_data['citation_publication_date'] = str( initial_website_data['date'] )
-    mapped_website_data['citation_secondary_type'] = 'WS'
-    log.debug( 'about to call run_website_cdl_check() from map_website()' )
-    mapped_website_data['citation_source1'] = cdl.run_ebook_cdl_check( initial_website_data['facnotes'], initial_website_data['art_url'], initial_website_data['title'], cdl_checker )
-    mapped_website_data['citation_source2'] = initial_website_data['art_url']  
-    mapped_website_data['citation_source3'] = map_bruknow_openurl( initial_website_data.get('sfxlink', '') )  
-    mapped_website_data['citation_source4'] = check_pdfs( initial_website_data, settings['PDF_DATA'], course_id, settings )
-    mapped_website_data['citation_start_page'] = str(initial_website_data['spage']) if initial_website_data['spage'] else parse_start_page_from_ourl( ourl_parts )
-    mapped_website_data['citation_title'] = initial_website_data['title'].strip()
-    mapped_website_data['citation_volume'] = initial_website_data['volume']
-    mapped_website_data['coursecode'] = leganto_course_id    
-    mapped_website_data['external_system_id'] = initial_website_data['requests.requestid']
-    mapped_website_data['reading_list_name'] = leganto_course_title
-    mapped_website_data['section_id'] = leganto_section_id
-    log.debug( f'mapped_website_data, ``{pprint.pformat(mapped_website_data)}``' )
-    return mapped_website_data
+    course: dict = make_course_context( course_id, leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return MAPPERS['website']( initial_website_data, course )
 
 
 ## video & audio ----------------------------------------------------
@@ -308,80 +215,108 @@ def map_audio_files( audio_results, leganto_course_id, cdl_checker, leganto_sect
     """ Runs audio mapping. 
         No course_id needed; it's only used to build pdf links.
         Called by build_reading_list.prep_basic_data """
-    mapped_audio_files = []
-    for audio_result in audio_results:
-        mapped_audio_file: dict = map_av( 'audio', audio_result, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_audio_files.append( mapped_audio_file )
-    return mapped_audio_files
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'audio', audio_results, course )
 
 def map_videos( video_results, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings ) -> list:
     """ Runs video mapping. 
         No course_id needed; it's only used to build pdf links.
         Called by build_reading_list.prep_basic_data """
-    mapped_videos = []
-    for video_result in video_results:
-        mapped_video: dict = map_av( 'video', video_result, leganto_course_id, cdl_checker, leganto_section_id, leganto_course_title, settings )
-        mapped_videos.append( mapped_video )
-    return mapped_videos
-
-def map_av( av_type: str, av_result: dict, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> dict:
-    """ Maps audio/video result to leganto format.
-        Called by map_videos() """
-    mapped_av_item: dict = MAPPED_CATEGORIES.copy()
-    mapped_av_item['citation_author'] = av_result.get('author', '')
-    mapped_av_item['citation_publication_date'] = av_result.get( 'year', '' )
-    mapped_av_item['citation_secondary_type'] = 'AR' if av_type == 'audio' else 'VD'
-    mapped_av_item['citation_source1'] = ''
-    mapped_av_item['citation_source2'] = av_result.get('art_url', '')
-    mapped_av_item['citation_source3'] = map_bruknow_openurl( av_result.get('sfxlink', '') ) 
-    mapped_av_item['citation_source4'] = ''
-    mapped_av_item['citation_title'] = av_result['title'].strip()
-    mapped_av_item['coursecode'] = leganto_course_id
-    mapped_av_item['external_system_id'] = av_result.get( 'requests.requestid', '' )
-    mapped_av_item['reading_list_name'] = leganto_course_title
-    mapped_av_item['section_id'] = leganto_section_id
-    log.debug(msg=f'mapped_av_item, ``{pprint.pformat(mapped_av_item)}``')
-    return mapped_av_item
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return map_results( 'video', video_results, course )
+
+def map_av( av_type: str, av_result: dict, leganto_course_id: str, cdl_checker, leganto_section_id: str, leganto_course_title: str, settings: dict ) -> Citation_Record:
+    """ Maps audio/video result to leganto format; `av_type` is 'audio' or 'video'. """
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, cdl_checker, settings )
+    return MAPPERS[av_type]( av_result, course )
 
 
 ## mappers ----------------------------------------------------------
 
 
-def map_empty( leganto_course_id: str, leganto_section_id: str, leganto_course_title: str ) -> dict:
-    mapped_data: dict = MAPPED_CATEGORIES.copy()
-    mapped_data['coursecode'] = leganto_course_id
-    mapped_data['reading_list_name'] = leganto_course_title
-    mapped_data['section_id'] = leganto_section_id
-    return mapped_data
+def map_empty( leganto_course_id: str, leganto_section_id: str, leganto_course_title: str ) -> Citation_Record:
+    course: dict = make_course_context( '', leganto_course_id, leganto_section_id, leganto_course_title, None, {} )
+    return MAPPERS['empty']( {}, course )
+
+
+def make_course_context( course_id: str, leganto_course_id: str, leganto_section_id: str, leganto_course_title: str, cdl_checker, settings: dict ) -> dict:
+    """ Bundles the per-course values the mappers use, so they're gathered once per course rather than passed per row.
+        - the `course_id` (like `HIST1234`) is used for building the pdf-url.
+        - the `leganto_course_id` is used for the leganto `coursecode` field.
+        Called by the map_*() functions, and by citation_pipeline.iter_course_citations() """
+    course: dict = {
+        'course_id': course_id,
+        'leganto_course_id': leganto_course_id,
+        'leganto_section_id': leganto_section_id,
+        'leganto_course_title': leganto_course_title,
+        'cdl_checker': cdl_checker,
+        'settings': settings,
+        }
+    return course
+
+
+def map_results( format_name: str, results: list, course: dict ) -> list:
+    """ Maps a course's results for one format (a FORMAT_SPECS key) to Citation_Records.
+        Called by the map_*s() functions """
+    mapper = MAPPERS[format_name]
+    return [ mapper(result, course) for result in results ]
+
+
+def compile_mapper( format_name: str, spec: tuple ):
+    """ Compiles a FORMAT_SPECS entry into a mapper-function, `mapper( source_row, course ) -> Citation_Record`.
+        Called on import, to build MAPPERS. """
+    field_getters: list = []
+    for ( field, kind, argument ) in spec:
+        if field not in CITATION_FIELD_SET:
+            raise Exception( f'unknown citation field, ``{field}``, in ``{format_name}`` spec' )
+        field_getters.append( (field, make_field_getter(kind, argument)) )
+    field_getters: tuple = tuple( field_getters )
+
+    def mapper( source: dict, course: dict ) -> Citation_Record:
+        record = Citation_Record()
+        derived: dict = {}  # values several fields use (like the parsed openurl); each is computed at most once per row
+        for ( field, getter ) in field_getters:
+            setattr( record, field, getter(source, course, derived) )
+        log.debug( f'mapped {format_name}, ``{record}``' )
+        return record
+
+    return mapper
+
+
+def make_field_getter( kind: str, argument ):
+    """ Returns a `getter( source_row, course, derived ) -> value` for one spec-line; see FORMAT_SPECS for the kinds.
+        Called by compile_mapper() """
+    if kind == 'const':
+        getter = lambda source, course, derived: argument
+    elif kind == 'course':
+        getter = lambda source, course, derived: course[argument]
+    elif kind == 'copy':
+        getter = lambda source, course, derived: source[argument]
+    elif kind == 'copy_or_blank':
+        getter = lambda source, course, derived: source.get( argument, '' )
+    elif kind == 'strip':
+        getter = lambda source, course, derived: source[argument].strip()
+    elif kind == 'str':
+        getter = lambda source, course, derived: str( source[argument] )
+    elif kind == 'str_or_blank':
+        getter = lambda source, course, derived: str( source[argument] ) if source[argument] else ''
+    elif kind == 'page':
+        getter = lambda source, course, derived: get_page( source, derived, argument )
+    elif kind == 'openurl':
+        getter = lambda source, course, derived: getattr( get_openurl(source, derived), argument )
+    elif kind == 'parse':
+        getter = lambda source, course, derived: argument( source )
+    elif kind == 'lookup':
+        getter = lambda source, course, derived: argument( source, course )
+    else:
+        raise Exception( f'unknown field-kind, ``{kind}``' )
+    return getter
 
 
 def map_bruknow_openurl( db_openurl: str ) -> str:
-    """ Converts db-openurl (possibly a fragment), to a valid bruknow-openurl.
-        Called by map_books(), map_articles(), and map_excerpts() """
-    log.debug( f'starting db_openurl, ``{db_openurl}``' )
-    bruknow_openurl_pattern: str = 'https://bruknow.library.brown.edu/discovery/openurl?institution=01BU_INST&vid=01BU_INST:BROWN'
-    new_openurl = ''
-    if db_openurl == '':
-        new_openurl = 'no openurl found'
-    else:
-        ## break ourl out into parts --------------------------------
-        parsed_db_ourl = urllib.parse.urlparse( db_openurl )
-        log.debug( f'parsed_db_ourl, ``{parsed_db_ourl}``' )
-        ## get the query string -------------------------------------
-        query_part: str = parsed_db_ourl.query
-        log.debug( f'query_part, ``{query_part}``' )
-        ## make key-value pairs for urlencode() ---------------------
-        param_dct: dict = dict( urllib.parse.parse_qsl(query_part) )
-        log.debug( f'param_dct, ``{pprint.pformat(param_dct)}``' )
-        if 'url' in param_dct.keys():  # rev-proxy urls can contain the actual sfxlink
-            del( param_dct['url'] )
-        ## get a nice encoded querystring ---------------------------
-        encoded_querystring: str = urllib.parse.urlencode( param_dct, safe=',' )
-        log.debug( f'encoded_querystring, ``{encoded_querystring}``' )
-        ## build bruknow ourl
-        new_openurl = f'%s&%s' % ( bruknow_openurl_pattern, encoded_querystring )
-    log.debug( f'new_openurl, ``{new_openurl}``' )
-    return new_openurl
+    """ Converts db-openurl (possibly a fragment), to a valid bruknow-openurl; see openurl_parser.
+        Called by tests """
+    return openurl_parser.parse( db_openurl ).bruknow_openurl
 
 
 ## parsers ----------------------------------------------------------
@@ -416,23 +351,29 @@ def parse_excerpt_author( initial_excerpt_data: dict ) -> str:
 
 
 def parse_openurl( raw_ourl: str ) -> dict:
-    """ Returns fielded openurl elements.
-        Called by map_article() """
-    log.debug( f'raw_ourl, ``{raw_ourl}``' )
-    ourl_dct = {}
-    if raw_ourl:
-        if raw_ourl[0:43] == 'https://login.revproxy.brown.edu/login?url=':
-            log.debug( 'removing proxy ' )
-            ourl = raw_ourl[43:]
-            log.debug( f'updated ourl, ``{ourl}``' )
-        else:
-            ourl = raw_ourl
-        ourl_section: str = ourl.split( '?' )[1]
-        ourl_dct: dict = urllib.parse.parse_qs( ourl_section )
+    """ Returns fielded openurl elements (a fresh dict, from the cached openurl_parser.parse()).
+        Called by tests """
+    ourl_dct: dict = { key: list(values) for ( key, values ) in openurl_parser.parse( raw_ourl ).params }
     log.debug( f'ourl_dct, ``{pprint.pformat(ourl_dct)}``' )
     return ourl_dct
 
 
+def get_page( source: dict, derived: dict, page_key: str ) -> str:
+    """ Returns the db page (`spage` or `epage`) as a string, falling back to the page in the row's openurl.
+        Called by the `page` field-getters """
+    if source[page_key]:
+        return str( source[page_key] )
+    return getattr( get_openurl(source, derived), page_key )
+
+
+def get_openurl( source: dict, derived: dict ) -> openurl_parser.Parsed_Openurl:
+    """ Returns the row's parsed openurl; looked up at most once per row (via `derived`), and parsed at most once per distinct link.
+        Called by get_page(), and by the `openurl` field-getters """
+    if 'openurl' not in derived:
+        derived['openurl'] = openurl_parser.parse( source.get('sfxlink', '') )
+    return derived['openurl']
+
+
 def parse_start_page_from_ourl( parts: dict ):
     try:
         spage = parts['spage'][0]
@@ -492,3 +433,151 @@ def check_pdfs( db_dict_entry: dict, pdf_data: dict, course_code: str, settings:
             pdf_check_result = repr( possible_matches )
     log.debug( f'pdf_check_result, ``{pdf_check_result}``' )
     return pdf_check_result
+
+
+## format-specs -----------------------------------------------------
+## Each spec-line is ( citation-field, kind, argument ); kinds:
+## - `const`: the argument itself
+## - `course`: a make_course_context() value
+## - `copy`, `copy_or_blank`, `strip`, `str`, `str_or_blank`: the named db-field, as-is, or '' if missing, stripped, str()-ed, or str()-ed if truthy
+## - `page`: the named db page-field (`spage`/`epage`), falling back to the openurl's page
+## - `openurl`: the named openurl_parser.Parsed_Openurl field
+## - `parse`: argument( source_row )
+## - `lookup`: argument( source_row, course )
+## A new format needs only a spec here (and its step-40 results-key in citation_pipeline.FORMAT_RESULTS_KEYS).
+
+
+def get_article_author( source: dict ) -> str:
+    return f'{source["aulast"]}, {source["aufirst"]}'
+
+def get_excerpt_title( source: dict ) -> str:
+    return f'(EXCERPT) %s' % source['atitle'].strip()
+
+def get_track_note( source: dict ) -> str:
+    return f'filename, ``{source["filename"]}``'
+
+def get_article_cdl_link( source: dict, course: dict ) -> str:
+    return cdl.run_article_cdl_check( source['facnotes'], source['atitle'], course['cdl_checker'] )
+
+def get_book_cdl_link( source: dict, course: dict ) -> str:
+    return cdl.run_book_cdl_check( source['facnotes'], source['bk_title'], course['cdl_checker'] )
+
+def get_ebook_cdl_link( source: dict, course: dict ) -> str:
+    return cdl.run_ebook_cdl_check( source['facnotes'], source['art_url'], source['title'], course['cdl_checker'] )
+
+def get_pdf_link( source: dict, course: dict ) -> str:
+    return check_pdfs( source, course['settings']['PDF_DATA'], course['course_id'], course['settings'] )
+
+
+COURSE_FIELD_SPECS: tuple = (
+    ( 'coursecode', 'course', 'leganto_course_id' ),
+    ( 'reading_list_name', 'course', 'leganto_course_title' ),
+    ( 'section_id', 'course', 'leganto_section_id' ),
+    )
+
+AV_FIELD_SPECS: tuple = (
+    ( 'citation_author', 'copy_or_blank', 'author' ),
+    ( 'citation_publication_date', 'copy_or_blank', 'year' ),
+    ( 'citation_source1', 'const', '' ),
+    ( 'citation_source2', 'copy_or_blank', 'art_url' ),
+    ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+    ( 'citation_source4', 'const', '' ),
+    ( 'citation_title', 'strip', 'title' ),
+    ( 'external_system_id', 'copy_or_blank', 'requests.requestid' ),
+    ) + COURSE_FIELD_SPECS
+
+FORMAT_SPECS: dict = {
+    'article': (
+        ( 'citation_author', 'parse', get_article_author ),
+        ( 'citation_doi', 'copy', 'doi' ),
+        ( 'citation_end_page', 'page', 'epage' ),
+        ( 'citation_issn', 'copy', 'issn' ),
+        ( 'citation_issue', 'copy', 'issue' ),
+        ( 'citation_publication_date', 'str', 'date' ),
+        ( 'citation_secondary_type', 'const', 'ARTICLE' ),  # guess
+        ( 'citation_source1', 'lookup', get_article_cdl_link ),
+        ( 'citation_source2', 'copy', 'art_url' ),
+        ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+        ( 'citation_source4', 'lookup', get_pdf_link ),
+        ( 'citation_start_page', 'page', 'spage' ),
+        ( 'citation_title', 'strip', 'atitle' ),
+        ( 'citation_journal_title', 'copy', 'title' ),
+        ( 'citation_volume', 'copy', 'volume' ),
+        ( 'external_system_id', 'copy', 'requests.requestid' ),
+        ) + COURSE_FIELD_SPECS,
+    'audio': ( ('citation_secondary_type', 'const', 'AR'), ) + AV_FIELD_SPECS,
+    'book': (
+        ( 'citation_author', 'copy', 'bk_author' ),
+        ( 'citation_isbn', 'copy', 'isbn' ),
+        ( 'citation_publication_date', 'str_or_blank', 'bk_year' ),
+        ( 'citation_secondary_type', 'const', 'BK' ),
+        ( 'citation_source1', 'lookup', get_book_cdl_link ),
+        ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+        ( 'citation_title', 'copy', 'bk_title' ),
+        ( 'external_system_id', 'copy', 'requests.requestid' ),
+        ) + COURSE_FIELD_SPECS,
+    'ebook': (
+        ( 'citation_author', 'parse', parse_ebook_author ),
+        ( 'citation_doi', 'copy', 'doi' ),
+        ( 'citation_end_page', 'page', 'epage' ),
+        ( 'citation_isbn', 'copy', 'isbn' ),
+        ( 'citation_issn', 'copy', 'issn' ),
+        ( 'citation_issue', 'copy', 'issue' ),
+        ( 'citation_publication_date', 'str', 'date' ),
+        ( 'citation_secondary_type', 'const', 'E_BK' ),
+        ( 'citation_source1', 'lookup', get_ebook_cdl_link ),
+        ( 'citation_source2', 'copy', 'art_url' ),
+        ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+        ( 'citation_source4', 'lookup', get_pdf_link ),
+        ( 'citation_start_page', 'page', 'spage' ),
+        ( 'citation_title', 'strip', 'title' ),
+        ( 'citation_volume', 'copy', 'volume' ),
+        ( 'external_system_id', 'copy', 'requests.requestid' ),
+        ) + COURSE_FIELD_SPECS,
+    'empty': COURSE_FIELD_SPECS,
+    'excerpt': (
+        ( 'citation_author', 'parse', parse_excerpt_author ),
+        ( 'citation_doi', 'copy', 'doi' ),
+        ( 'citation_end_page', 'page', 'epage' ),
+        ( 'citation_issn', 'copy', 'issn' ),
+        ( 'citation_issue', 'copy', 'issue' ),
+        ( 'citation_publication_date', 'str', 'date' ),
+        ( 'citation_secondary_type', 'const', 'ARTICLE' ),  # guess
+        ( 'citation_source1', 'lookup', get_article_cdl_link ),
+        ( 'citation_source2', 'copy', 'art_url' ),
+        ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+        ( 'citation_source4', 'lookup', get_pdf_link ),
+        ( 'citation_start_page', 'page', 'spage' ),
+        ( 'citation_title', 'parse', get_excerpt_title ),
+        ( 'citation_journal_title', 'copy', 'title' ),
+        ( 'citation_volume', 'copy', 'volume' ),
+        ( 'external_system_id', 'copy', 'requests.requestid' ),
+        ) + COURSE_FIELD_SPECS,
+    'track': (
+        ( 'citation_library_note', 'parse', get_track_note ),
+        ( 'citation_secondary_type', 'const', 'AR' ),
+        ( 'citation_title', 'copy', 'tracktitle' ),
+        ( 'external_system_id', 'str', 'trackid' ),
+        ) + COURSE_FIELD_SPECS,
+    'video': ( ('citation_secondary_type', 'const', 'VD'), ) + AV_FIELD_SPECS,
+    'website': (
+        ( 'citation_author', 'const', '' ),
+        ( 'citation_doi', 'copy', 'doi' ),
+        ( 'citation_end_page', 'page', 'epage' ),
+        ( 'citation_isbn', 'copy', 'isbn' ),
+        ( 'citation_issn', 'copy', 'issn' ),
+        ( 'citation_issue', 'copy', 'issue' ),
+        ( 'citation_publication_date', 'str', 'date' ),
+        ( 'citation_secondary_type', 'const', 'WS' ),
+        ( 'citation_source1', 'lookup', get_ebook_cdl_link ),
+        ( 'citation_source2', 'copy', 'art_url' ),
+        ( 'citation_source3', 'openurl', 'bruknow_openurl' ),
+        ( 'citation_source4', 'lookup', get_pdf_link ),
+        ( 'citation_start_page', 'page', 'spage' ),
+        ( 'citation_title', 'strip', 'title' ),
+        ( 'citation_volume', 'copy', 'volume' ),
+        ( 'external_system_id', 'copy', 'requests.requestid' ),
+        ) + COURSE_FIELD_SPECS,
+    }
+
+MAPPERS: dict = { format_name: compile_mapper(format_name, spec) for ( format_name, spec ) in FORMAT_SPECS.items() }  # compiled once, on import
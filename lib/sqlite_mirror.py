@@ -0,0 +1,434 @@
+"""
+Keeps a local, indexed, SQLite copy of the OCRA and CDL tables the pipeline reads, so lookups run at local-disk latency
+  instead of as many small queries against the shared MySQL server.
+
+- `sync` copies each MIRRORED_TABLES table into the file at `LGNT__SQLITE_MIRROR_PATH`.
+    - A table with a primary-key and an auto-updating timestamp column (`ON UPDATE CURRENT_TIMESTAMP`) is synced incrementally:
+      rows changed since the last sync are upserted, and rows no longer in MySQL are deleted.
+    - Other tables (or `--full`, or a changed column-list) are re-copied whole.
+    - Each table is synced in its own transaction, and recorded in the `_mirror_sync` table.
+- With `LGNT__DB_BACKEND=sqlite`, db_stuff.get_db_connection() and get_CDL_db_connection() return a read-only
+  Mirror_Connection, which takes the existing queries unchanged and returns rows as dicts, like pymysql's DictCursor.
+
+Usage:
+    % cd /path/to/leganto_reading_list_code/
+    % python -m lib.sqlite_mirror sync
+    % python -m lib.sqlite_mirror sync --full --tables articles,requests
+"""
+
+import argparse, datetime, decimal, json, logging, os, pprint, re, sqlite3, sys
+
+
+LOG_PATH: str = os.environ['LGNT__LOG_PATH']
+logging.basicConfig(
+    filename=LOG_PATH,
+    level=logging.DEBUG,
+    format='[%(asctime)s] %(levelname)s [%(module)s-%(funcName)s()::%(lineno)d] %(message)s',
+    datefmt='%d/%b/%Y %H:%M:%S' )
+log = logging.getLogger(__name__)
+
+
+MIRROR_PATH: str = os.environ.get( 'LGNT__SQLITE_MIRROR_PATH', '' )
+OCRA_SCHEMA_NAME: str = 'reserves'  # the ocra queries qualify tables, like `reserves.books`; the mirror is attached under this name too
+SYNC_TABLE: str = '_mirror_sync'
+BATCH_SIZE: int = 5000  # rows per fetch/insert during sync
+MIRRORED_TABLES: list = [  # `indexes` are the columns the pipeline's queries join or filter on
+    { 'name': 'banner_courses', 'source': 'ocra', 'indexes': [ ('subject', 'course') ] },
+    { 'name': 'banner_dump', 'source': 'ocra', 'indexes': [ ('inst_bruid',) ] },
+    { 'name': 'classes', 'source': 'ocra', 'indexes': [ ('classid',), ('facultyid',) ] },
+    { 'name': 'instructors', 'source': 'ocra', 'indexes': [ ('facultyid',) ] },
+    { 'name': 'requests', 'source': 'ocra', 'indexes': [ ('classid',), ('requestid',) ] },
+    { 'name': 'articles', 'source': 'ocra', 'indexes': [ ('requestid',) ] },
+    { 'name': 'books', 'source': 'ocra', 'indexes': [ ('requestid',) ] },
+    { 'name': 'tracks', 'source': 'ocra', 'indexes': [ ('trackid',) ] },
+    { 'name': 'tracks2classes', 'source': 'ocra', 'indexes': [ ('classid',), ('trackid',) ] },
+    { 'name': 'cdl_app_item', 'source': 'cdl', 'indexes': [ ('title',) ] },
+    ]
+
+VALUE_PARSERS: dict = {  # date/time and decimal columns are stored as text, and parsed back on read (by declared type), as pymysql returns them
+    'DATETIME': datetime.datetime.fromisoformat,
+    'DATE': datetime.date.fromisoformat,
+    'DECIMAL': decimal.Decimal,
+    }
+
+
+## read side --------------------------------------------------------
+
+
+class Mirror_Connection(object):
+    """ Stands in for a pymysql connection (configured with DictCursor), over the read-only mirror.
+        Usage (like the pymysql connection):
+            with db_connection:
+                with db_connection.cursor() as db_cursor:
+                    db_cursor.execute( sql )
+                    result_set = list( db_cursor.fetchall() ) """
+
+    def __init__( self, mirror_path: str ):
+        self.sqlite_connection = sqlite3.connect( f'file:{mirror_path}?mode=ro', uri=True )  # values are parsed by Mirror_Cursor, not by registered sqlite3 converters
+        self.sqlite_connection.execute( f"ATTACH DATABASE 'file:{mirror_path}?mode=ro' AS {OCRA_SCHEMA_NAME}" )
+        self.table_columns: dict = {}  # table-name -> column-names; for naming duplicate result-columns
+        self.table_column_types: dict = {}  # table-name -> { column-name: declared-type }; for parsing values
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.close()  # pymysql's `with db_connection` closes the connection, too
+        return False
+
+    def cursor( self ):
+        return Mirror_Cursor( self )
+
+    def close( self ) -> None:
+        self.sqlite_connection.close()
+        return
+
+    def get_table_columns( self, table_name: str ) -> list:
+        if table_name not in self.table_columns:
+            table_info: list = list( self.sqlite_connection.execute(f'PRAGMA table_info(`{table_name}`)') )
+            self.table_columns[table_name] = [ row[1] for row in table_info ]
+            self.table_column_types[table_name] = { row[1]: row[2].split(' ')[0].upper() for row in table_info }
+        return self.table_columns[table_name]
+
+    def get_column_type( self, table_name: str, column_name: str ) -> str:
+        self.get_table_columns( table_name )
+        return self.table_column_types[table_name].get( column_name, '' )
+
+    ## end class Mirror_Connection()
+
+
+class Mirror_Cursor(object):
+    """ Runs the pipeline's MySQL-flavored sql against the mirror; rows come back as dicts.
+        `%s` parameters are passed through as sqlite `?` parameters. """
+
+    def __init__( self, mirror_connection: Mirror_Connection ):
+        self.mirror_connection = mirror_connection
+        self.sqlite_cursor = mirror_connection.sqlite_connection.cursor()
+        self.result_keys: list = []
+        self.result_types: list = []  # declared-type of each result-column, or '' where unknown
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, traceback ):
+        self.close()
+        return False
+
+    def execute( self, sql: str, args=None ) -> int:
+        if args is None:
+            self.sqlite_cursor.execute( sql )
+        else:
+            self.sqlite_cursor.execute( sql.replace('%s', '?'), tuple(args) )
+        column_names: list = [ column[0] for column in (self.sqlite_cursor.description or []) ]
+        self.result_keys = make_result_keys( sql, column_names, self.mirror_connection )
+        self.result_types = make_result_types( sql, self.result_keys, self.mirror_connection )
+        return self.sqlite_cursor.rowcount
+
+    def make_row( self, row: tuple ) -> dict:
+        return { key: parse_value(value, column_type) for ( key, value, column_type ) in zip(self.result_keys, row, self.result_types) }
+
+    def fetchone( self ):
+        row = self.sqlite_cursor.fetchone()
+        return self.make_row( row ) if row is not None else None
+
+    def fetchmany( self, size: int = 1 ) -> list:
+        return [ self.make_row(row) for row in self.sqlite_cursor.fetchmany(size) ]
+
+    def fetchall( self ) -> list:
+        return [ self.make_row(row) for row in self.sqlite_cursor.fetchall() ]
+
+    @property
+    def description( self ):
+        return self.sqlite_cursor.description
+
+    @property
+    def rowcount( self ) -> int:
+        return self.sqlite_cursor.rowcount
+
+    def close( self ) -> None:
+        self.sqlite_cursor.close()
+        return
+
+    ## end class Mirror_Cursor()
+
+
+def get_connection() -> Mirror_Connection:
+    """ Returns a read-only connection to the mirror.
+        Called by db_stuff.get_db_connection() and db_stuff.get_CDL_db_connection(), for the `sqlite` backend. """
+    if not MIRROR_PATH:
+        raise Exception( 'LGNT__DB_BACKEND is `sqlite`, but LGNT__SQLITE_MIRROR_PATH is not set' )
+    if not os.path.exists( MIRROR_PATH ):
+        raise Exception( f'no sqlite mirror at ``{MIRROR_PATH}``; run `python -m lib.sqlite_mirror sync` first' )
+    mirror_connection = Mirror_Connection( MIRROR_PATH )
+    log.debug( f'made mirror_connection to, ``{MIRROR_PATH}``' )
+    return mirror_connection
+
+
+def make_result_keys( sql: str, column_names: list, mirror_connection: Mirror_Connection ) -> list:
+    """ Returns the row-dict keys for a result's columns, naming repeats like pymysql's DictCursor does --
+          eg the second `requestid` in `SELECT * FROM reserves.books, reserves.requests ...` becomes `requests.requestid`.
+        sqlite doesn't report a result-column's table, so for repeats the tables are taken from the FROM clause, in order.
+        Called by Mirror_Cursor.execute() """
+    if len( set(column_names) ) == len( column_names ):
+        return column_names
+    column_tables: list = []
+    for table_name in get_from_tables( sql ):
+        column_tables.extend( [table_name] * len(mirror_connection.get_table_columns(table_name)) )
+    if len( column_tables ) != len( column_names ):
+        log.warning( f'could not match repeated result-columns to tables for sql, ``{sql}``; repeats will overwrite' )
+        return column_names
+    result_keys: list = []
+    for ( column_name, table_name ) in zip( column_names, column_tables ):
+        result_keys.append( f'{table_name}.{column_name}' if column_name in result_keys else column_name )
+    return result_keys
+
+
+def make_result_types( sql: str, result_keys: list, mirror_connection: Mirror_Connection ) -> list:
+    """ Returns the declared-type of each result-column, looked up in the FROM-clause tables;
+          '' for a column no FROM-table has (eg `COUNT(*)`), or one whose FROM-tables declare it differently.
+        Called by Mirror_Cursor.execute() """
+    from_tables: list = get_from_tables( sql )
+    result_types: list = []
+    for result_key in result_keys:
+        if '.' in result_key:  # a repeated column, already matched to its table by make_result_keys()
+            ( table_name, column_name ) = result_key.split( '.', 1 )
+            column_types: set = { mirror_connection.get_column_type(table_name, column_name) }
+        else:
+            column_types: set = { mirror_connection.get_column_type(table_name, result_key) for table_name in from_tables } - { '' }
+        result_types.append( column_types.pop() if len(column_types) == 1 else '' )
+    return result_types
+
+
+def get_from_tables( sql: str ) -> list:
+    """ Returns the table-names in a query's FROM clause, in order (without any `reserves.` schema-prefix).
+        Called by make_result_keys() and make_result_types() """
+    table_names: list = []
+    from_match = re.search( r'\bFROM\s+(.+?)(?:\s+WHERE\b|\s+ORDER\b|\s+GROUP\b|\s+LIMIT\b|;|$)', sql, re.IGNORECASE | re.DOTALL )
+    if from_match:
+        for table_reference in from_match.group( 1 ).split( ',' ):
+            table_names.append( table_reference.strip().replace('`', '').split('.')[-1] )
+    return table_names
+
+
+def parse_value( value, column_type: str ):
+    """ Returns a mirror value as pymysql would -- a datetime, date, or Decimal for those declared-types.
+        A value that doesn't parse (eg MySQL's `0000-00-00 00:00:00` zero-date, which pymysql also returns as a string) is returned as stored.
+        Called by Mirror_Cursor.make_row() """
+    if value is None or column_type not in VALUE_PARSERS:
+        return value
+    try:
+        return VALUE_PARSERS[column_type]( str(value) )  # str(): sqlite's numeric affinity can hand back a DECIMAL as a float
+    except ( ValueError, decimal.InvalidOperation ):
+        log.debug( f'unparsed {column_type} value, ``{value}``' )
+        return value
+
+
+## sync side --------------------------------------------------------
+
+
+def sync( full: bool = False, table_names: list = [] ) -> dict:
+    """ Syncs the mirrored tables (or just `table_names`) from MySQL; returns per-table results.
+        Called by if __name__ == '__main__' """
+    from lib import db_stuff  # imported here; db_stuff imports this module for its `sqlite` backend
+    if not MIRROR_PATH:
+        raise Exception( 'LGNT__SQLITE_MIRROR_PATH is not set' )
+    start_time = datetime.datetime.now()
+    table_specs: list = [ spec for spec in MIRRORED_TABLES if not table_names or spec['name'] in table_names ]
+    connection_getters: dict = { 'ocra': db_stuff.get_mysql_db_connection, 'cdl': db_stuff.get_mysql_CDL_db_connection }
+    results: dict = {}
+    mirror_connection: sqlite3.Connection = open_mirror_for_writing( MIRROR_PATH )
+    try:
+        for table_spec in table_specs:
+            source_connection = connection_getters[table_spec['source']]()
+            with source_connection:
+                results[table_spec['name']] = sync_table( source_connection, mirror_connection, table_spec, full )
+        mirror_connection.execute( 'ANALYZE' )  # planner statistics for the new indexes
+    finally:
+        mirror_connection.close()
+    log.info( f'sync results, ``{pprint.pformat(results)}``; elapsed, ``{datetime.datetime.now() - start_time}``' )
+    return results
+
+
+def sync_table( source_connection, mirror_connection: sqlite3.Connection, table_spec: dict, full: bool ) -> dict:
+    """ Syncs one table, incrementally where the table allows it; returns counts.
+        Called by sync() """
+    import pymysql.cursors  # only needed for syncing
+    table_name: str = table_spec['name']
+    with source_connection.cursor() as source_cursor:
+        source_cursor.execute( f'SHOW COLUMNS FROM `{table_name}`' )
+        source_columns: list = list( source_cursor.fetchall() )
+    columns: list = [ (column['Field'], make_sqlite_type(column['Type'])) for column in source_columns ]
+    column_names: list = [ name for ( name, _ ) in columns ]
+    pk_columns: list = [ column['Field'] for column in source_columns if column['Key'] == 'PRI' ]
+    timestamp_columns: list = [ column['Field'] for column in source_columns if 'on update current_timestamp' in column['Extra'].lower() ]
+    previous: dict = get_sync_record( mirror_connection, table_name )
+    incremental: bool = bool(
+        not full and pk_columns and timestamp_columns and previous.get('high_water', '') and previous.get('columns', []) == columns )
+    result: dict = { 'mode': 'incremental' if incremental else 'full', 'rows_written': 0, 'rows_deleted': 0 }
+    mirror_connection.execute( 'BEGIN' )  # one transaction per table, covering the re-create, so readers never see a partial table
+    try:
+        if not incremental:
+            create_mirror_table( mirror_connection, table_name, columns, pk_columns )
+        ## copy rows ------------------------------------------------
+        select_sql: str = f'SELECT * FROM `{table_name}`'
+        select_args: tuple = ()
+        if incremental:
+            select_sql = f'{select_sql} WHERE `{timestamp_columns[0]}` >= %s'  # `>=`: same-second edits are re-copied, harmlessly
+            select_args = ( previous['high_water'], )
+        with source_connection.cursor( pymysql.cursors.SSDictCursor ) as source_cursor:  # unbuffered; rows are streamed in batches
+            source_cursor.execute( select_sql, select_args )
+            while True:
+                rows: list = source_cursor.fetchmany( BATCH_SIZE )
+                if not rows:
+                    break
+                result['rows_written'] += write_rows( mirror_connection, table_name, column_names, rows, replace=incremental )
+        ## drop rows deleted at the source --------------------------
+        if incremental:
+            result['rows_deleted'] = delete_missing_rows( source_connection, mirror_connection, table_name, pk_columns )
+        create_indexes( mirror_connection, table_name, column_names, table_spec['indexes'] )
+        ## record sync ----------------------------------------------
+        high_water: str = ''
+        if timestamp_columns:
+            high_water = mirror_connection.execute( f'SELECT MAX(`{timestamp_columns[0]}`) FROM `{table_name}`' ).fetchone()[0] or ''
+        result['row_count'] = mirror_connection.execute( f'SELECT COUNT(*) FROM `{table_name}`' ).fetchone()[0]
+        save_sync_record( mirror_connection, table_name, result, high_water, columns )
+        mirror_connection.execute( 'COMMIT' )
+    except:
+        mirror_connection.execute( 'ROLLBACK' )
+        log.exception( f'sync of table ``{table_name}`` failed, and was rolled back; traceback follows...' )
+        raise
+    log.debug( f'table_name, ``{table_name}``; result, ``{result}``' )
+    return result
+
+
+def delete_missing_rows( source_connection, mirror_connection: sqlite3.Connection, table_name: str, pk_columns: list ) -> int:
+    """ Deletes mirror rows whose primary-key is no longer in the source table; returns the count deleted.
+        Called by sync_table() """
+    pk_list: str = ', '.join( [f'`{column}`' for column in pk_columns] )
+    mirror_connection.execute( 'DROP TABLE IF EXISTS temp._source_keys' )
+    mirror_connection.execute( f'CREATE TEMP TABLE _source_keys ({pk_list})' )
+    with source_connection.cursor() as source_cursor:
+        source_cursor.execute( f'SELECT {pk_list} FROM `{table_name}`' )
+        key_rows: list = [ tuple(row[column] for column in pk_columns) for row in source_cursor.fetchall() ]
+    placeholders: str = ', '.join( ['?'] * len(pk_columns) )
+    mirror_connection.executemany( f'INSERT INTO temp._source_keys VALUES ({placeholders})', [tuple(to_sqlite_value(value) for value in key_row) for key_row in key_rows] )
+    deleted_count: int = mirror_connection.execute(
+        f'DELETE FROM `{table_name}` WHERE ({pk_list}) NOT IN (SELECT {pk_list} FROM temp._source_keys)' ).rowcount
+    mirror_connection.execute( 'DROP TABLE temp._source_keys' )
+    return deleted_count
+
+
+## mirror-writing helpers -------------------------------------------
+
+
+def open_mirror_for_writing( mirror_path: str ) -> sqlite3.Connection:
+    """ Returns a writable connection to the mirror file, creating it (and its sync-record table) if needed.
+        Called by sync() """
+    mirror_connection = sqlite3.connect( mirror_path, isolation_level=None )  # transactions are begun and committed explicitly, by sync_table()
+    mirror_connection.execute( 'PRAGMA journal_mode=WAL' )  # readers aren't blocked while a sync runs
+    mirror_connection.execute(
+        f'CREATE TABLE IF NOT EXISTS `{SYNC_TABLE}` (table_name TEXT PRIMARY KEY, synced_at TEXT, mode TEXT, high_water TEXT, row_count INTEGER, columns TEXT)' )
+    return mirror_connection
+
+
+def create_mirror_table( mirror_connection: sqlite3.Connection, table_name: str, columns: list, pk_columns: list ) -> None:
+    """ (Re-)creates an empty mirror table; `columns` is a list of ( name, sqlite-type ).
+        Called by sync_table() """
+    column_definitions: list = [ f'`{name}` {sqlite_type}' for ( name, sqlite_type ) in columns ]
+    if pk_columns:
+        column_definitions.append( 'PRIMARY KEY (%s)' % ', '.join([f'`{column}`' for column in pk_columns]) )
+    mirror_connection.execute( f'DROP TABLE IF EXISTS `{table_name}`' )
+    mirror_connection.execute( f'CREATE TABLE `{table_name}` ({", ".join(column_definitions)})' )
+    return
+
+
+def write_rows( mirror_connection: sqlite3.Connection, table_name: str, column_names: list, rows: list, replace: bool = False ) -> int:
+    """ Writes row-dicts to a mirror table; `replace` upserts on the primary-key. Returns the count written.
+        Called by sync_table() """
+    column_list: str = ', '.join( [f'`{name}`' for name in column_names] )
+    placeholders: str = ', '.join( ['?'] * len(column_names) )
+    verb: str = 'INSERT OR REPLACE' if replace else 'INSERT'
+    mirror_connection.executemany(
+        f'{verb} INTO `{table_name}` ({column_list}) VALUES ({placeholders})',
+        [ tuple(to_sqlite_value(row[name]) for name in column_names) for row in rows ] )
+    return len( rows )
+
+
+def create_indexes( mirror_connection: sqlite3.Connection, table_name: str, column_names: list, indexes: list ) -> None:
+    """ Creates the table's lookup-indexes, skipping any whose columns the table doesn't have.
+        Called by sync_table() """
+    for index_columns in indexes:
+        if not set( index_columns ).issubset( column_names ):
+            log.warning( f'table ``{table_name}`` has no column(s) ``{index_columns}``; index skipped' )
+            continue
+        index_name: str = f'idx_{table_name}_{"_".join(index_columns)}'
+        column_list: str = ', '.join( [f'`{column}`' for column in index_columns] )
+        mirror_connection.execute( f'CREATE INDEX IF NOT EXISTS `{index_name}` ON `{table_name}` ({column_list})' )
+    return
+
+
+def get_sync_record( mirror_connection: sqlite3.Connection, table_name: str ) -> dict:
+    """ Returns the table's last sync-record, or {} if it's never been synced.
+        Called by sync_table() """
+    row = mirror_connection.execute( f'SELECT high_water, columns FROM `{SYNC_TABLE}` WHERE table_name = ?', (table_name,) ).fetchone()
+    if row is None:
+        return {}
+    return { 'high_water': row[0], 'columns': [tuple(column) for column in json.loads(row[1])] }
+
+
+def save_sync_record( mirror_connection: sqlite3.Connection, table_name: str, result: dict, high_water: str, columns: list ) -> None:
+    """ Records the table's sync.
+        Called by sync_table() """
+    mirror_connection.execute(
+        f'INSERT OR REPLACE INTO `{SYNC_TABLE}` (table_name, synced_at, mode, high_water, row_count, columns) VALUES (?, ?, ?, ?, ?, ?)',
+        ( table_name, datetime.datetime.now().isoformat(), result['mode'], high_water, result['row_count'], json.dumps(columns) ) )
+    return
+
+
+def make_sqlite_type( mysql_type: str ) -> str:
+    """ Maps a `SHOW COLUMNS` type (eg `int(11)`, `varchar(255)`) to the sqlite column-type that round-trips pymysql's python value.
+        Text compares and sorts case-insensitively, like OCRA's MySQL collation.
+        Called by sync_table() """
+    mysql_type = mysql_type.lower()
+    if 'int' in mysql_type or mysql_type.startswith( 'year' ):
+        sqlite_type = 'INTEGER'
+    elif mysql_type.startswith( ('float', 'double', 'real') ):
+        sqlite_type = 'REAL'
+    elif mysql_type.startswith( ('decimal', 'numeric') ):
+        sqlite_type = 'DECIMAL'
+    elif mysql_type.startswith( ('datetime', 'timestamp') ):
+        sqlite_type = 'DATETIME'
+    elif mysql_type.startswith( 'date' ):
+        sqlite_type = 'DATE'
+    elif 'blob' in mysql_type or 'binary' in mysql_type:
+        sqlite_type = 'BLOB'
+    else:  # char, text, enum, and `time` (stored as its string form)
+        sqlite_type = 'TEXT COLLATE NOCASE'
+    return sqlite_type
+
+
+def to_sqlite_value( value ):
+    """ Returns a value sqlite can store; decimal and date/time values are stored as their string form (see VALUE_PARSERS, above).
+        Called by write_rows() and delete_missing_rows() """
+    if isinstance( value, (datetime.date, datetime.time, datetime.timedelta, decimal.Decimal) ):
+        value = str( value )
+    return value
+
+
+def parse_args() -> dict:
+    """ Parses arguments.
+        Called by if __name__ == '__main__' """
+    parser = argparse.ArgumentParser( description='keeps a local sqlite mirror of the ocra and cdl tables the pipeline reads' )
+    parser.add_argument( 'command', choices=['sync'], help='`sync` updates the mirror from MySQL' )
+    parser.add_argument( '--full', action='store_true', help='re-copy every table whole, rather than incrementally' )
+    parser.add_argument( '--tables', default='', help='comma-separated table-names to sync; default all' )
+    args: dict = vars( parser.parse_args() )
+    return args
+
+
+if __name__ == '__main__':
+    args: dict = parse_args()
+    table_names: list = [ name.strip() for name in args['tables'].split(',') if name.strip() ]
+    results: dict = sync( full=args['full'], table_names=table_names )
+    print( json.dumps(results, sort_keys=True, indent=2) )
+    sys.exit()
@@ -6,12 +6,17 @@ Usage:
 - to run one test:
     - cd to `prep_reading_list_code` directory
     - example: $ python3 ./tests.py SomeTest.test_something
+- to run CDL_Checker_Test without the CDL database:
+    - $ LGNT__DB_BACKEND=fake python3 ./tests.py CDL_Checker_Test
 """
 
-import datetime, json, logging, os, unittest
+import datetime, json, logging, os, tempfile, unittest
+import unittest.mock
 
 import build_reading_list
 from lib import cdl
+from lib import db_stuff
+from lib import fake_ocra
 from lib import gsheet_prepper
 from lib import leganto_final_processor
 from lib import readings_processor
@@ -352,9 +357,48 @@ class Misc_Test( unittest.TestCase ):
     ## end class Misc_Test()
 
 
+CDL_FIXTURE_ROWS: list = [  # `cdl_app_item` rows for CDL_Checker_Test, when run with `LGNT__DB_BACKEND=fake`
+    {'id': 1523, 'alma_item_pid': None, 'alma_mms_id': '991006299729706966', 'author': '', 'barcode': None, 'bib_id': 'b90794643',
+        'created': datetime.datetime(2021, 6, 24, 19, 38, 39, 946705), 'item_file': 'b90794643_b90794643.pdf', 'item_id': 'b90794643',
+        'modified': datetime.datetime(2021, 8, 23, 20, 49, 45, 623634), 'num_copies': 1, 'status': 'ready', 'title': 'Critical encounters in Secondary English : teaching literary theory to adolescents'},
+    {'id': 2058, 'alma_item_pid': '23328680100006966', 'alma_mms_id': '991003807939706966', 'author': 'Lee, Ann Sung-hi.', 'barcode': '31236019077620', 'bib_id': '',
+        'created': datetime.datetime(2021, 10, 23, 22, 34, 3, 371628), 'item_file': '31236019077620.pdf', 'item_id': '23328680100006966',
+        'modified': datetime.datetime(2021, 10, 25, 14, 0, 39, 828365), 'num_copies': 2, 'status': 'ready', 'title': 'Yi Kwang-su and modern Korean literature, Mujŏng /'},
+    {'id': 2903, 'alma_item_pid': '23328680070006966', 'alma_mms_id': '991003807939706966', 'author': 'Lee, Ann Sung-hi.', 'barcode': '31236091503212', 'bib_id': '',
+        'created': datetime.datetime(2022, 8, 25, 18, 12, 42, 107910), 'item_file': '31236091503212.pdf', 'item_id': '23328680070006966',
+        'modified': datetime.datetime(2022, 8, 25, 18, 13, 55, 955326), 'num_copies': 1, 'status': 'ready', 'title': 'Yi Kwang-su and modern Korean literature, Mujŏng /'},
+    {'id': 3101, 'alma_item_pid': None, 'alma_mms_id': '991005857609706966', 'author': 'Blyth, Mark,', 'barcode': None, 'bib_id': 'b68901742',
+        'created': datetime.datetime(2022, 11, 9, 15, 2, 11, 204518), 'item_file': 'i168901742.pdf', 'item_id': 'i168901742',
+        'modified': datetime.datetime(2022, 11, 9, 15, 3, 40, 118262), 'num_copies': 1, 'status': 'ready', 'title': 'Austerity the history of a dangerous idea'},
+    {'id': 3044, 'alma_item_pid': None, 'alma_mms_id': '991003942579706966', 'author': 'Abdelal, Rawi,', 'barcode': None, 'bib_id': 'b42579956',
+        'created': datetime.datetime(2022, 10, 19, 13, 20, 5, 551093), 'item_file': 'i142579956.pdf', 'item_id': 'i142579956',
+        'modified': datetime.datetime(2022, 10, 19, 13, 21, 32, 870154), 'num_copies': 1, 'status': 'ready', 'title': 'Capital rules : the construction of global finance /'},
+    {'id': 2711, 'alma_item_pid': '23267522610006966', 'alma_mms_id': '991000734339706966', 'author': 'Polanyi, Karl,', 'barcode': '31236012296953', 'bib_id': '',
+        'created': datetime.datetime(2022, 5, 16, 17, 44, 52, 30611), 'item_file': '31236012296953.pdf', 'item_id': '23267522610006966',
+        'modified': datetime.datetime(2022, 5, 16, 17, 45, 9, 417309), 'num_copies': 1, 'status': 'ready', 'title': 'The great transformation /'},
+    ]
+
+
 class CDL_Checker_Test( unittest.TestCase ):
 
-    """ Checks cdl-link prep. """
+    """ Checks cdl-link prep.
+        Runs against the live CDL database; or, with `LGNT__DB_BACKEND=fake`, offline against CDL_FIXTURE_ROWS. """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.fixture_dir = None
+        if db_stuff.DB_BACKEND == 'fake':
+            cls.fixture_dir = tempfile.TemporaryDirectory()
+            fixture_path = f'{cls.fixture_dir.name}/cdl_fixture.sqlite3'
+            fake_ocra.build_fixture_db( fixture_path, {'cdl_app_item': CDL_FIXTURE_ROWS} )
+            cls.fixture_path_patch = unittest.mock.patch.object( fake_ocra, 'FIXTURE_PATH', fixture_path )
+            cls.fixture_path_patch.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if cls.fixture_dir:
+            cls.fixture_path_patch.stop()
+            cls.fixture_dir.cleanup()
 
     def setUp(self) -> None:
         self.cdl_checker = CDL_Checker()